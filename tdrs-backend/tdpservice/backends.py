@@ -43,6 +43,33 @@ class DataFilesS3Storage(OverriddenCredentialsS3Storage):
     # Use distinct region for the tdp-datafiles service
     region_name = settings.AWS_S3_DATAFILES_REGION_NAME
 
+    def get_object(self, name):
+        """Return the boto3 object a file of the given name is saved as.
+
+        The key is derived with the private helpers `S3Boto3Storage` saves files with, so that callers
+        don't depend on them.
+        """
+        return self.bucket.Object(self._normalize_name(self._clean_name(name)))
+
+    def get_saved_object(self, fieldfile):
+        """Return the boto3 object a field's file is saved as, or None if it hasn't been saved to storage yet."""
+        if not fieldfile._committed:
+            return None
+        return self.get_object(fieldfile.name)
+
+    def _save(self, name, content):
+        """Upload a file, and record the version s3 gave it as `s3_version_id` on the content saved.
+
+        The file is uploaded by `S3Boto3Storage` as usual, then its version is read back from the object
+        just written.
+        """
+        name = super()._save(name, content)
+        version_id = self.get_object(name).version_id
+
+        # an unversioned bucket has no versions, and a suspended one gives new objects the 'null' version
+        content.s3_version_id = None if version_id == 'null' else version_id
+        return name
+
 
 class StaticFilesS3Storage(OverriddenCredentialsS3Storage):
     """An S3 backed storage provider for Django Admin staticfiles."""
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.15 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_files', '0012_datafile_s3_versioning_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datafile',
+            name='file_size',
+            field=models.PositiveBigIntegerField(help_text='The file size in bytes', null=True),
+        ),
+        migrations.AddField(
+            model_name='datafile',
+            name='file_shasum',
+            field=models.TextField(help_text='The SHA256 checksum of the uploaded file', null=True),
+        ),
+    ]
@@ -19,6 +19,10 @@
 
 def get_file_shasum(file: Union[File, StringIO]) -> str:
     """Derive the SHA256 checksum of a file."""
+    # A file hashed as it was read for something else doesn't need to be read again.
+    if isinstance(file, HashingFile) and file.hexdigest() is not None:
+        return file.hexdigest()
+
     _hash = sha256()
 
     # If the file has the `open` method it needs to be called, otherwise this
@@ -47,6 +51,40 @@ def get_file_shasum(file: Union[File, StringIO]) -> str:
 
     return _hash.hexdigest()
 
+
+class HashingFile(File):
+    """A file that derives its SHA256 checksum from the bytes read from it, as they are read.
+
+    Reading the file for something else, like a virus scan, hashes it in the same read. The hash
+    is only of the whole file once it has been read in order from its start to its end.
+    """
+
+    def __init__(self, file, name=None):
+        super().__init__(file, name)
+        self._hash = sha256()
+        self._bytes_read = 0
+
+    def read(self, *args):
+        """Read from the file, hashing the bytes read."""
+        content = self.file.read(*args)
+        if self._hash is not None:
+            self._hash.update(content.encode('utf-8') if isinstance(content, str) else content)
+            self._bytes_read += len(content)
+        return content
+
+    def seek(self, *args):
+        """Seek in the file, starting the hash over if back at its start, or abandoning it elsewhere."""
+        position = self.file.seek(*args)
+        self._hash = sha256() if position == 0 else None
+        self._bytes_read = 0
+        return position
+
+    def hexdigest(self):
+        """Return the SHA256 checksum of the file if it has been read whole, or else None."""
+        if self._hash is None or self._bytes_read != self.size:
+            return None
+        return self._hash.hexdigest()
+
 def get_s3_upload_path(instance, filename):
     """Produce a unique upload path for S3 files for a given STT and Quarter."""
     return os.path.join(
@@ -152,6 +190,31 @@ class Meta:
                                         null=True
                                         )
 
+    # Derived once, as the file is uploaded, for the tasks that process it later.
+    file_size = models.PositiveBigIntegerField(
+        help_text='The file size in bytes',
+        null=True
+    )
+    file_shasum = models.TextField(
+        help_text='The SHA256 checksum of the uploaded file',
+        null=True
+    )
+
+    def save(self, *args, **kwargs):
+        """Upload a new file before saving, so the version s3 gave it is saved with the rest of the data file.
+
+        The size and checksum of a new file are saved with it too, reusing the checksum derived when it
+        was scanned, if it was.
+        """
+        if self.file and not self.file._committed:
+            content = self.file.file
+            self.file_size = self.file.size
+            self.file_shasum = getattr(content, 'file_shasum', None) or get_file_shasum(content)
+            self.file.save(self.file.name, content, save=False)
+            self.s3_versioning_id = getattr(content, 's3_version_id', self.s3_versioning_id)
+
+        super().save(*args, **kwargs)
+
     @property
     def filename(self):
         """Return the correct filename for this data file."""
@@ -1,10 +1,6 @@
 """S3 client."""
 import boto3
-from botocore.exceptions import ClientError
 from django.conf import settings
-import logging
-
-logger = logging.getLogger()
 
 class S3Client():
     """A client for downloading files from s3 with boto3."""
@@ -18,20 +14,24 @@ def __init__(self):
             region_name=settings.AWS_S3_DATAFILES_REGION_NAME
         )
 
-    def file_download(self, key, path, version_id):
-        """Download a file from s3. Specify the path, file name, and version id."""
+    def get_object(self, key, version_id, byte_range=None):
+        """Get a version of a file from s3, or a `byte_range` of it, with its body left to be streamed."""
         app_name = settings.APP_NAME + '/'
         key = app_name + key
 
-        try:
-            self.client.download_file(
-                settings.AWS_S3_DATAFILES_BUCKET_NAME,
-                key,
-                path,
-                ExtraArgs={'VersionId': version_id}
-            )
-        except ClientError as e:
-            logger.error(e)
+        kwargs = {'Range': byte_range} if byte_range else {}
+        return self.client.get_object(
+            Bucket=settings.AWS_S3_DATAFILES_BUCKET_NAME,
+            Key=key,
+            VersionId=version_id,
+            **kwargs
+        )
 
-        f = open(path, 'r')
-        return f
+    def get_object_size(self, key, version_id):
+        """Get the size in bytes of a version of a file in s3."""
+        app_name = settings.APP_NAME + '/'
+        return self.client.head_object(
+            Bucket=settings.AWS_S3_DATAFILES_BUCKET_NAME,
+            Key=app_name + key,
+            VersionId=version_id
+        )['ContentLength']
@@ -22,6 +22,7 @@ class DataFileSerializer(serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
     ssp = serializers.BooleanField(write_only=True)
     has_error = serializers.SerializerMethodField()
+    num_errors = serializers.SerializerMethodField()
 
     class Meta:
         """Metadata."""
@@ -45,14 +46,21 @@ class Meta:
             's3_location',
             's3_versioning_id',
             'has_error',
+            'num_errors',
         ]
 
         read_only_fields = ("version",)
 
     def get_has_error(self, obj):
         """Return whether the file has an error."""
-        parser_errors = ParserError.objects.filter(file=obj.id)
-        return len(parser_errors) > 0
+        return self.get_num_errors(obj) > 0
+
+    def get_num_errors(self, obj):
+        """Return the number of errors found in the file, as annotated by `DataFileViewSet` if it was."""
+        num_errors = getattr(obj, 'num_errors', None)
+        if num_errors is None:
+            num_errors = ParserError.objects.filter(file=obj.id).count()
+        return num_errors
 
     def create(self, validated_data):
         """Create a new entry with a new version number."""
@@ -83,5 +91,6 @@ def validate_file(self, file):
         """Perform all validation steps on a given file."""
         user = self.context.get('user')
         validate_file_extension(file.name)
-        validate_file_infection(file, file.name, user)
+        # kept on the file so that the data file saving it doesn't hash it again
+        file.file_shasum = validate_file_infection(file, file.name, user)
         return file
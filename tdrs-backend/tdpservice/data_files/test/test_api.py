@@ -1,11 +1,18 @@
 """Tests for DataFiles Application."""
 from unittest.mock import ANY, patch
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
+import factory
 import pytest
 
 from tdpservice.data_files.models import DataFile
+from tdpservice.data_files.test.factories import DataFileFactory
 from tdpservice.email.email_enums import EmailType
+from tdpservice.parsers.test.factories import ParserErrorFactory
+from tdpservice.parsers.models import ParseCheckpoint
+from tdpservice.parsers.progress import get_redis, progress_key, publish, start_progress
 from tdpservice.users.models import AccountApprovalStatusChoices
 
 
@@ -94,6 +101,10 @@ def download_file(self, api_client, data_file_id):
         """Stream a file for download."""
         return api_client.get(f"{self.root_url}{data_file_id}/download/")
 
+    def get_parse_status(self, api_client, data_file_id):
+        """Get the live progress of a data file's parse."""
+        return api_client.get(f"{self.root_url}{data_file_id}/parse_status/")
+
 
 class TestDataFileAPIAsOfaAdmin(DataFileAPITestBase):
     """Test DataFileViewSet as an OFA Admin user."""
@@ -127,6 +138,37 @@ def test_download_data_file_file(self, api_client, data_file_data, user):
         assert response.status_code == status.HTTP_200_OK
         self.assert_data_file_content_matches(response, data_file_id)
 
+    def test_download_data_file_file_range(self, api_client, data_file_data, user):
+        """Test that a file's s3 version is streamed whole, or by range so a download can be resumed."""
+        response = self.post_data_file_file(api_client, data_file_data)
+        data_file = DataFile.objects.get(id=response.data['id'])
+        assert data_file.s3_versioning_id is not None
+        contents = data_file.file.read()
+        url = f"{self.root_url}{data_file.id}/download/"
+
+        response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Accept-Ranges'] == 'bytes'
+        assert int(response['Content-Length']) == len(contents)
+        assert b''.join(response.streaming_content) == contents
+
+        response = api_client.get(url, HTTP_RANGE='bytes=10-19')
+        assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert response['Content-Range'] == f'bytes 10-19/{len(contents)}'
+        assert b''.join(response.streaming_content) == contents[10:20]
+
+        response = api_client.get(url, HTTP_RANGE='bytes=-5')
+        assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert b''.join(response.streaming_content) == contents[-5:]
+
+        response = api_client.get(url, HTTP_RANGE='bytes=0-1,5-6')
+        assert response.status_code == status.HTTP_200_OK
+        assert b''.join(response.streaming_content) == contents
+
+        response = api_client.get(url, HTTP_RANGE=f'bytes={len(contents)}-')
+        assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        assert response['Content-Range'] == f'bytes */{len(contents)}'
+
     def test_create_data_file_file_entry(self, api_client, data_file_data, user):
         """Test ability to create data file metadata registry."""
         response = self.post_data_file_file(api_client, data_file_data)
@@ -210,6 +252,119 @@ def test_download_data_file_file_rejected_for_other_stt(
 
         assert response.status_code == status.HTTP_403_FORBIDDEN
 
+    def test_list_data_files_with_error_counts(self, api_client, user):
+        """Test that listing files counts their errors, in the same number of queries however many files there are."""
+        def list_data_files():
+            with CaptureQueriesContext(connection) as queries:
+                response = api_client.get(self.root_url, {'stt': user.stt.id})
+            assert response.status_code == status.HTTP_200_OK
+            return response, len(queries)
+
+        files = [DataFileFactory(stt=user.stt, user=user, version=version) for version in (1, 2)]
+        ParserErrorFactory.create_batch(3, file=files[0])
+        response, num_queries = list_data_files()
+
+        assert [(f['id'], f['has_error'], f['num_errors']) for f in response.data] == [
+            (files[1].id, False, 0),
+            (files[0].id, True, 3),
+        ]
+
+        DataFileFactory.create_batch(3, stt=user.stt, user=user, version=factory.Sequence(lambda n: n + 3))
+        response, more_files_num_queries = list_data_files()
+
+        assert len(response.data) == 5
+        assert more_files_num_queries == num_queries
+
+    def test_list_data_files_by_cursor(self, api_client, user):
+        """Test that asking for a page size pages through the files from the newest by cursor."""
+        files = DataFileFactory.create_batch(5, stt=user.stt, user=user, version=factory.Sequence(lambda n: n + 1))
+
+        response = api_client.get(self.root_url, {'stt': user.stt.id, 'page_size': 3})
+        assert [f['id'] for f in response.data['results']] == [f.id for f in files[:1:-1]]
+
+        response = api_client.get(response.data['next'])
+        assert [f['id'] for f in response.data['results']] == [f.id for f in files[1::-1]]
+        assert response.data['next'] is None
+
+    def test_list_data_files_not_modified(self, api_client, user):
+        """Test that an unchanged listing is answered with a 304, until a file is added, parsed or has errors saved."""
+        data_file = DataFileFactory(stt=user.stt, user=user)
+        response = api_client.get(self.root_url, {'stt': user.stt.id})
+        etag = response['ETag']
+
+        response = api_client.get(self.root_url, {'stt': user.stt.id}, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+
+        response = api_client.get(self.root_url, {'stt': user.stt.id, 'page_size': 1}, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+
+        ParseCheckpoint.objects.create(file=data_file)
+        response = api_client.get(self.root_url, {'stt': user.stt.id}, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+        etag = response['ETag']
+        ParserErrorFactory(file=data_file)
+        response = api_client.get(self.root_url, {'stt': user.stt.id}, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data[0]['num_errors'] == 1
+        assert response['ETag'] != etag
+
+        etag = response['ETag']
+        DataFileFactory(stt=user.stt, user=user, version=2)
+        response = api_client.get(self.root_url, {'stt': user.stt.id}, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data) == 2
+
+    def test_parse_status_for_own_stt(self, api_client, data_file_data, user):
+        """Test that a Data Analyst can poll the parse progress of their STT's file."""
+        response = self.post_data_file_file(api_client, data_file_data)
+        data_file = DataFile.objects.get(id=response.data['id'])
+        start_progress(data_file, total_lines=10, total_bytes=1570, num_errors=1)
+
+        response = self.get_parse_status(api_client, data_file.id)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['status'] == 'parsing'
+        assert response.data['total_lines'] == 10
+        assert response.data['errors'] == 1
+        assert response.data['lines'] == 0
+        assert 'stt' not in response.data
+
+    def test_parse_status_rejected_for_other_stt(self, api_client, data_file_data, other_stt, user):
+        """Test that a Data Analyst can't poll the parse progress of another STT's file."""
+        response = self.post_data_file_file(api_client, data_file_data)
+        data_file = DataFile.objects.get(id=response.data['id'])
+        data_file.stt = other_stt
+        data_file.save()
+        start_progress(data_file, total_lines=10, total_bytes=1570)
+
+        response = self.get_parse_status(api_client, data_file.id)
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_parse_status_after_progress_expired(self, api_client, data_file_data, user):
+        """Test that access is decided by the file's saved STT when its progress was published again after expiring."""
+        response = self.post_data_file_file(api_client, data_file_data)
+        get_redis().delete(progress_key(response.data['id']))
+        publish(response.data['id'], {'lines': 5})
+
+        response = self.get_parse_status(api_client, response.data['id'])
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['lines'] == 5
+        assert response.data['lines_per_second'] is None
+
+    def test_parse_status_not_found(self, api_client, data_file_data, user):
+        """Test that a file with no published progress is not found."""
+        response = self.post_data_file_file(api_client, data_file_data)
+        get_redis().delete(progress_key(response.data['id']))
+
+        response = self.get_parse_status(api_client, response.data['id'])
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
     def test_data_files_data_upload_ssp(
         self, api_client, data_file_data,
     ):
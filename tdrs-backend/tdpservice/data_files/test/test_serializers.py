@@ -2,7 +2,9 @@
 from django.core.exceptions import ValidationError
 
 import pytest
+from hashlib import sha256
 
+from tdpservice.data_files import models
 from tdpservice.data_files.errors import ImmutabilityError
 from tdpservice.data_files.serializers import DataFileSerializer
 from tdpservice.data_files.validators import (
@@ -76,6 +78,40 @@ def test_created_at(data_file_data, data_analyst):
     assert data_file.av_scans.exists()
 
 
+@pytest.mark.django_db
+def test_file_hashed_once_as_it_is_scanned(data_file_data, data_analyst, mocker):
+    """Test that the file is hashed as it is read for its scan, and its checksum and size saved with it."""
+    get_file_shasum = mocker.spy(models, 'get_file_shasum')
+    create_serializer = DataFileSerializer(
+        context={'user': data_analyst},
+        data=data_file_data
+    )
+    assert create_serializer.is_valid() is True
+    data_file = create_serializer.save()
+
+    contents = data_file.file.read()
+    av_scan = data_file.av_scans.get()
+    assert data_file.file_shasum == av_scan.file_shasum == sha256(contents).hexdigest()
+    assert data_file.file_size == av_scan.file_size == len(contents)
+    assert all(isinstance(call.args[0], models.HashingFile) for call in get_file_shasum.call_args_list)
+
+
+def test_hashing_file_only_hashes_whole_reads(fake_file):
+    """Test that a hashing file's checksum is only of the file read in order from its start."""
+    hashing_file = models.HashingFile(fake_file)
+    contents = fake_file.getvalue().encode('utf-8')
+
+    hashing_file.read(3)
+    assert hashing_file.hexdigest() is None
+    hashing_file.read()
+    assert hashing_file.hexdigest() == sha256(contents).hexdigest()
+
+    hashing_file.seek(3)
+    hashing_file.read()
+    assert hashing_file.hexdigest() is None
+    assert models.get_file_shasum(hashing_file) == sha256(contents).hexdigest()
+
+
 @pytest.mark.django_db
 def test_data_file_still_created_if_av_scan_fails_to_create(
     data_file_data,
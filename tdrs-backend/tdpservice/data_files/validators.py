@@ -5,6 +5,7 @@
 from django.core.exceptions import ValidationError
 from inflection import pluralize
 from django.conf import settings
+from tdpservice.data_files.models import HashingFile, get_file_shasum
 from tdpservice.security.clients import ClamAVClient
 
 logger = logging.getLogger(__name__)
@@ -47,12 +48,17 @@ def validate_file_extension(file_name: str):
 
 
 def validate_file_infection(file, file_name, uploaded_by):
-    """Validate file is not infected by scanning with ClamAV."""
+    """Validate file is not infected by scanning with ClamAV, and return its SHA256 checksum.
+
+    The file is hashed as it is read for the scan, so it is only read once.
+    """
+    hashing_file = HashingFile(file, file_name)
+    hashing_file.seek(0)
     try:
         is_file_clean = True
         if settings.CLAMAV_NEEDED is True:
             logger.debug("CLAMAV_NEEDED noted as True, proceeding with scan.")
-            is_file_clean = ClamAVClient().scan_file(file, file_name, uploaded_by)
+            is_file_clean = ClamAVClient().scan_file(hashing_file, file_name, uploaded_by)
 
     except ClamAVClient.ServiceUnavailable:
         raise ValidationError(
@@ -64,3 +70,5 @@ def validate_file_infection(file, file_name, uploaded_by):
         raise ValidationError(
             'Rejected: uploaded file did not pass security inspection'
         )
+
+    return get_file_shasum(hashing_file)
@@ -1,12 +1,19 @@
 """Check if user is authorized."""
 
+import hashlib
 import logging
+import re
+from botocore.exceptions import ClientError
 from django.http import FileResponse
+from django.shortcuts import get_object_or_404
 from django_filters import rest_framework as filters
 from django.conf import settings
 from django.contrib.auth.models import Group
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from drf_yasg.openapi import Parameter
 from drf_yasg.utils import swagger_auto_schema
+from rest_framework.pagination import CursorPagination
 from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.status import HTTP_400_BAD_REQUEST
@@ -18,14 +25,26 @@
 
 from tdpservice.users.models import AccountApprovalStatusChoices, User
 from tdpservice.data_files.serializers import DataFileSerializer
-from tdpservice.data_files.models import DataFile, get_s3_upload_path
+from tdpservice.data_files.models import DataFile
 from tdpservice.users.permissions import DataFilePermissions, IsApprovedPermission
 from tdpservice.scheduling import sftp_task, parser_task
 from tdpservice.email.helpers.data_file import send_data_submitted_email
 from tdpservice.data_files.s3_client import S3Client
+from tdpservice.parsers.models import ParserError
+from tdpservice.parsers.progress import get_progress
 
 logger = logging.getLogger(__name__)
 
+# a single range of bytes, from the first to the last byte position, or the last given number of bytes
+BYTE_RANGE_PATTERN = re.compile(r'^bytes=(\d+-\d*|-\d+)$')
+
+
+class S3FileResponse(FileResponse):
+    """A response streaming a file from s3 in blocks of a fixed size, as they are read."""
+
+    block_size = 64 * 1024
+
+
 class DataFileFilter(filters.FilterSet):
     """Filters that can be applied to GET requests as query parameters."""
 
@@ -39,6 +58,24 @@ class Meta:
         fields = ['stt', 'quarter', 'year']
 
 
+class DataFileCursorPagination(CursorPagination):
+    """Keyset pagination of data files from the newest, for clients that ask for a `cursor` or `page_size`.
+
+    Other clients get every matching file unpaginated, as they always have.
+    """
+
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Paginate the files only if the client asked for a page of them."""
+        if self.cursor_query_param not in request.query_params and \
+                self.page_size_query_param not in request.query_params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
 class DataFileViewSet(ModelViewSet):
     """Data file views."""
 
@@ -47,7 +84,7 @@ class DataFileViewSet(ModelViewSet):
     parser_classes = [MultiPartParser]
     permission_classes = [DataFilePermissions, IsApprovedPermission]
     serializer_class = DataFileSerializer
-    pagination_class = None
+    pagination_class = DataFileCursorPagination
 
     # TODO: Handle versioning in queryset
     # Ref: https://github.com/raft-tech/TANF-app/issues/1007
@@ -79,13 +116,6 @@ def create(self, request, *args, **kwargs):
             )
             logger.info("Submitted upload task to redis for datafile %s.", data_file_id)
 
-            app_name = settings.APP_NAME + '/'
-            key = app_name + get_s3_upload_path(data_file, '')
-            version_id = self.get_s3_versioning_id(response.data.get('original_filename'), key)
-
-            data_file.s3_versioning_id = version_id
-            data_file.save(update_fields=['s3_versioning_id'])
-
             # Send email to user to notify them of the file upload status
             subject = f"Data Submitted for {data_file.section}"
             email_context = {
@@ -108,28 +138,64 @@ def create(self, request, *args, **kwargs):
 
         return response
 
-    def get_s3_versioning_id(self, file_name, prefix):
-        """Get the version id of the file uploaded to S3."""
-        s3 = S3Client()
-        bucket_name = settings.AWS_S3_DATAFILES_BUCKET_NAME
-        versions = s3.client.list_object_versions(Bucket=bucket_name, Prefix=prefix)
-        for version in versions['Versions']:
-            file_path = version['Key']
-            if file_name in file_path:
-                if version['IsLatest'] and version['VersionId'] != 'null':
-                    return (version['VersionId'])
-        return None
-
     def get_queryset(self):
-        """Apply custom queryset filters."""
-        queryset = super().get_queryset().order_by('-created_at')
+        """Apply custom queryset filters.
+
+        Each file's number of errors is counted in the same query, and its user joined for `submitted_by`,
+        so that listing files takes the same number of queries however many there are.
+        """
+        num_errors = ParserError.objects.filter(
+            file=OuterRef('pk'),
+        ).order_by().values('file').annotate(count=Count('pk')).values('count')
+
+        queryset = super().get_queryset().select_related('user').annotate(
+            num_errors=Coalesce(Subquery(num_errors), 0),
+        ).order_by('-created_at')
+
+        return self.filter_file_type(queryset)
 
+    def filter_file_type(self, queryset):
+        """Filter the files to SSP files or to the rest, by the `file_type` query parameter."""
         if self.request.query_params.get('file_type') == 'ssp-moe':
-            queryset = queryset.filter(section__contains='SSP')
+            return queryset.filter(section__contains='SSP')
+        return queryset.exclude(section__contains='SSP')
+
+    def get_list_etag(self):
+        """Return a weak ETag for the listed files, from one aggregate query over them.
+
+        It changes when a file is added, when a file's parse advances, or when errors are saved for a
+        file, as the chunks of a file parsed in parallel save theirs without advancing its parse. It
+        differs for each page of the listing.
+        """
+        last_error = ParserError.objects.filter(file=OuterRef('pk')).order_by('-id').values('id')[:1]
+        files = self.filter_queryset(self.filter_file_type(DataFile.objects.all()))
+        state = files.annotate(last_error=Subquery(last_error)).aggregate(
+            count=Count('pk'),
+            newest=Max('created_at'),
+            version=Max('version'),
+            parsed=Max('parse_checkpoint__updated_at'),
+            errors=Max('last_error'),
+        )
+        key = ':'.join(str(value) for value in (
+            self.request.get_full_path(),
+            state['count'],
+            state['newest'],
+            state['version'],
+            state['parsed'],
+            state['errors'],
+        ))
+        return f'W/"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+    def list(self, request, *args, **kwargs):
+        """List the files, or respond 304 Not Modified if the client's copy of the listing is still current."""
+        etag = self.get_list_etag()
+        if etag in (tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
         else:
-            queryset = queryset.exclude(section__contains='SSP')
+            response = super().list(request, *args, **kwargs)
 
-        return queryset
+        response['ETag'] = etag
+        return response
 
     def filter_queryset(self, queryset):
         """Only apply filters to the list action."""
@@ -157,17 +223,61 @@ def download(self, request, pk=None):
                 filename=record.original_filename
             )
         else:
-            # If versioning id, then download from s3
-            s3 = S3Client()
-            file_path = record.file.name
-            version_id = record.s3_versioning_id
+            # If versioning id, then stream it from s3, or the range of it the client asked for
+            response = self.stream_s3_file(request, record)
+        return response
 
-            response = FileResponse(
-                FileWrapper(s3.file_download(file_path, record.original_filename, version_id)),
-                filename=record.original_filename
-            )
+    def stream_s3_file(self, request, record):
+        """Stream a version of a file from s3 to the client in blocks, as it is read, or a single range of its bytes.
+
+        Ranges that aren't a single range of bytes are ignored and the whole file is sent, as RFC 7233 allows.
+        """
+        s3 = S3Client()
+        file_path = record.file.name
+        version_id = record.s3_versioning_id
+
+        byte_range = request.headers.get('Range', '')
+        if not BYTE_RANGE_PATTERN.match(byte_range):
+            byte_range = None
+
+        try:
+            s3_object = s3.get_object(file_path, version_id, byte_range)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'InvalidRange':
+                raise
+            response = Response(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f'bytes */{s3.get_object_size(file_path, version_id)}'
+            return response
+
+        response = S3FileResponse(
+            s3_object['Body'],
+            filename=record.original_filename,
+            status=status.HTTP_206_PARTIAL_CONTENT if 'ContentRange' in s3_object else status.HTTP_200_OK
+        )
+        response['Content-Length'] = s3_object['ContentLength']
+        response['Accept-Ranges'] = 'bytes'
+        if 'ContentRange' in s3_object:
+            response['Content-Range'] = s3_object['ContentRange']
         return response
 
+    @action(methods=["get"], detail=True)
+    def parse_status(self, request, pk=None):
+        """Return the live progress of the file's parse from redis.
+
+        Only the file's STT and region are loaded, in a single query, to check the user can see the file.
+        """
+        data_file = get_object_or_404(
+            DataFile.objects.select_related('stt__region').only('id', 'stt__id', 'stt__region__id'),
+            pk=pk,
+        )
+        self.check_object_permissions(request, data_file)
+
+        progress = get_progress(data_file.id)
+        if progress is None:
+            return Response({'detail': 'No parse progress found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(progress)
+
 
 class GetYearList(APIView):
     """Get list of years for which there are data_files."""
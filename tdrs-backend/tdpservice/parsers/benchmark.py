@@ -0,0 +1,152 @@
+"""Synthetic datafile generation and timing for benchmarking parser throughput."""
+
+import functools
+import random
+import resource
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from unittest import mock
+
+from . import parse, util
+from .writers import BulkRecordWriter, ParserErrorWriter
+
+# the record types of each case, and the length of their lines, for each program type
+CASE_RECORD_TYPES = {
+    'TAN': ('T1', 'T2', 'T3'),
+    'SSP': ('M1', 'M2', 'M3'),
+}
+RECORD_LENGTHS = {
+    'T1': 156,
+    'T2': 156,
+    'T3': 156,
+    'M1': 150,
+    'M2': 150,
+    'M3': 150,
+}
+
+
+def generate_header(program_type, year=2020, quarter=4, section='A'):
+    """Return a valid header line for an Active Case Data file of the program type."""
+    return f'HEADER{year}{quarter}{section}06   {program_type}1 N'
+
+
+def generate_trailer(num_lines):
+    """Return a valid trailer line for a file with the given number of records."""
+    return f'TRAILER{num_lines:07d}         '
+
+
+def generate_record_line(record_type, rpt_month_year, case_number, rng):
+    """Return a fixed-width line of the record type filled with random digits after the common fields."""
+    line = f'{record_type}{rpt_month_year}{case_number}'
+    length = RECORD_LENGTHS[record_type]
+    return line + ''.join(rng.choices('0123456789', k=length - len(line)))
+
+
+def generate_datafile_lines(program_type='TAN', num_lines=1000, error_rate=0.0, seed=0):
+    """Yield the lines of a synthetic Active Case Data file with `num_lines` body lines.
+
+    Each case gets one line of each of the program type's record types. A fraction `error_rate` of the
+    body lines are blanked after the case number and truncated, so that they fail preparsing validation.
+    """
+    rng = random.Random(seed)
+    rpt_month_year = 202010
+    record_types = CASE_RECORD_TYPES[program_type]
+
+    yield generate_header(program_type)
+
+    for line_number in range(num_lines):
+        record_type = record_types[line_number % len(record_types)]
+        case_number = f'{line_number // len(record_types):011d}'
+        line = generate_record_line(record_type, rpt_month_year, case_number, rng)
+
+        if rng.random() < error_rate:
+            line = line[:19] + ' ' * rng.randrange(41, len(line) - 19)
+
+        yield line
+
+    yield generate_trailer(num_lines)
+
+
+def write_datafile(file, program_type='TAN', num_lines=1000, error_rate=0.0, seed=0):
+    """Write a synthetic datafile to an open binary file."""
+    for line in generate_datafile_lines(program_type, num_lines, error_rate, seed):
+        file.write(f'{line}\n'.encode())
+
+
+class StageTimer:
+    """Accumulates the time spent in each stage of parsing, excluding time spent in nested stages."""
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self.calls = defaultdict(int)
+        self._nested = [0.0]
+
+    def wrap(self, stage, func):
+        """Return `func` wrapped to add its run time to `stage`."""
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            self._nested.append(0.0)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.totals[stage] += elapsed - self._nested.pop()
+                self._nested[-1] += elapsed
+                self.calls[stage] += 1
+
+        return timed
+
+    @contextmanager
+    def instrument(self):
+        """Time each stage of `parse_datafile_resumable` while the context is active."""
+        stages = [
+            (parse, 'plan_datafile_chunks', 'chunk planning'),
+            (parse, 'complete_datafile', 'case consistency'),
+            (parse, 'validate_header', 'header/trailer validation'),
+            (parse.DocumentStructure, 'get_trailer_errors', 'header/trailer validation'),
+            (parse, 'get_schema', 'schema lookup'),
+            (util.RowSchema, 'parse_line', 'parse_line'),
+            (util.RowSchema, 'run_preparsing_validators_batch', 'validators'),
+            (util.RowSchema, 'run_field_validators_batch', 'validators'),
+            (util.RowSchema, 'run_postparsing_validators_batch', 'validators'),
+            (BulkRecordWriter, 'flush', 'persistence'),
+            (ParserErrorWriter, 'flush', 'persistence'),
+        ]
+
+        patches = [
+            mock.patch.object(target, name, self.wrap(stage, getattr(target, name)))
+            for target, name, stage in stages
+        ]
+
+        for patch in patches:
+            patch.start()
+        try:
+            yield self
+        finally:
+            for patch in reversed(patches):
+                patch.stop()
+
+
+def get_peak_rss():
+    """Return the peak resident set size of this process in kilobytes."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def time_parse(datafile, timer=None):
+    """Parse the datafile as the parse task does, returning the number of errors and the seconds it took.
+
+    The file is parsed with `parse_datafile_resumable`, planning its chunks in one pass and then parsing
+    them in checkpointed transactions. When a `StageTimer` is given, the time spent in each stage is
+    recorded on it.
+    """
+    start = time.perf_counter()
+
+    if timer is None:
+        num_errors = parse.parse_datafile_resumable(datafile)
+    else:
+        with timer.instrument():
+            num_errors = parse.parse_datafile_resumable(datafile)
+
+    return num_errors, time.perf_counter() - start
@@ -0,0 +1,114 @@
+"""Error budgets that stop parsing files too broken to be worth parsing to the end."""
+
+import logging
+from collections import deque
+
+import redis
+from django.conf import settings
+
+from .progress import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class ErrorBudgetExceeded(Exception):
+    """Raised when a datafile has more errors than its budget allows."""
+
+    def __init__(self, line_number, message):
+        super().__init__(message)
+        self.line_number = line_number
+
+
+class ErrorBudget:
+    """Limits the errors of a datafile to `max_errors` in total, and `max_rate` errors per line over a window.
+
+    The rate is measured over the last `window_lines` lines, so a file that starts badly but is
+    otherwise fine isn't rejected, while one that is broken on every line is rejected after a single
+    window. A limit of 0 is no limit. The errors of the other chunks of a file parsed in parallel count
+    towards `max_errors` too, through a `SharedErrorCount`, while the rate is measured over the lines of
+    each chunk.
+    """
+
+    def __init__(self, num_errors=0, max_errors=None, max_rate=None, window_lines=None, shared=None):
+        self.max_errors = settings.PARSER_ERROR_BUDGET_MAX_ERRORS if max_errors is None else max_errors
+        self.max_rate = settings.PARSER_ERROR_BUDGET_MAX_RATE if max_rate is None else max_rate
+        self.window_lines = window_lines or settings.PARSER_ERROR_BUDGET_WINDOW_LINES
+        self.num_errors = num_errors
+        self.shared = shared
+        self.window = deque()
+
+    def check(self, line_number, num_errors):
+        """Raise `ErrorBudgetExceeded` if, with `num_errors` more found by the line, there are too many errors."""
+        total = self.num_errors + num_errors
+        if self.max_errors and self.shared is not None:
+            total += self.shared.get_others(line_number, num_errors)
+        if self.max_errors and total > self.max_errors:
+            raise ErrorBudgetExceeded(
+                line_number, f"Parsing stopped after {total} errors, more than the limit of {self.max_errors}."
+            )
+
+        if not self.max_rate:
+            return
+
+        # the error count at each line of the window, and the line before it
+        self.window.append((line_number, num_errors))
+        if len(self.window) <= self.window_lines:
+            return
+
+        window_start, errors_before_window = self.window.popleft()
+        rate = (num_errors - errors_before_window) / (line_number - window_start)
+        if rate > self.max_rate:
+            raise ErrorBudgetExceeded(
+                line_number,
+                f"Parsing stopped after {rate:.2f} errors per line over lines {window_start + 1} to "
+                f"{line_number}, more than the limit of {self.max_rate}."
+            )
+
+
+def shared_errors_key(datafile_id):
+    """Return the redis key of the hash holding the error count of each chunk of a datafile."""
+    return f'parse_errors:{datafile_id}'
+
+
+def clear_shared_errors(datafile_id):
+    """Clear the error counts shared by the chunks of a datafile, before they are parsed."""
+    try:
+        get_redis().delete(shared_errors_key(datafile_id))
+    except redis.RedisError as e:
+        logger.warning(f"Could not clear the shared error counts of DataFile {datafile_id}: {e}")
+
+
+class SharedErrorCount:
+    """The errors found so far by the other tasks parsing chunks of the same datafile, shared through redis.
+
+    Each task sets its own count in a hash of the datafile's counts, under the first line of its chunk,
+    and sums the others' as it does so. A redelivered chunk overwrites its count rather than adding to
+    it again. Counts are synced every `every` lines, and in between the last known count of the others is
+    used. A failure to reach redis is logged, and the last known count kept.
+    """
+
+    def __init__(self, datafile_id, chunk, every=None):
+        self.key = shared_errors_key(datafile_id)
+        self.chunk = str(chunk)
+        self.every = every or settings.PARSER_PROGRESS_LINES
+        self.synced_at = None
+        self.others = 0
+
+    def get_others(self, line_number, num_errors):
+        """Return the errors of the other chunks, first sharing this chunk's `num_errors` if it's time to sync."""
+        if self.synced_at is not None and line_number - self.synced_at < self.every:
+            return self.others
+        self.synced_at = line_number
+
+        pipeline = get_redis().pipeline(transaction=False)
+        pipeline.hset(self.key, self.chunk, num_errors)
+        pipeline.expire(self.key, settings.PARSER_PROGRESS_TTL)
+        pipeline.hgetall(self.key)
+        try:
+            counts = pipeline.execute()[-1]
+        except redis.RedisError as e:
+            logger.warning(f"Could not share the error count of {self.key} chunk {self.chunk}: {e}")
+            return self.others
+
+        self.others = sum(int(count) for chunk, count in counts.items() if chunk != self.chunk)
+        return self.others
@@ -0,0 +1,172 @@
+"""Reuse of earlier parses of byte-identical datafiles, keyed by the SHA256 checksum of their contents."""
+
+import logging
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from tdpservice.data_files.models import DataFile
+from tdpservice.security.models import ClamAVFileScan
+from .models import ParseCheckpoint, ParserError
+from .progress import finish_progress, start_progress
+from .writers import RECORD_MODELS, get_record_writer, index_records
+
+logger = logging.getLogger(__name__)
+
+
+def get_datafile_shasum(datafile):
+    """Return the checksum of the datafile's contents, or None if it has none.
+
+    The checksum is saved with the datafile as it is uploaded; datafiles uploaded before then fall back to
+    the one taken by their latest clean scan.
+    """
+    if datafile.file_shasum:
+        return datafile.file_shasum
+
+    return datafile.av_scans.filter(
+        result=ClamAVFileScan.Result.CLEAN,
+    ).exclude(
+        file_shasum='INVALID',
+    ).order_by('-scanned_at').values_list('file_shasum', flat=True).first()
+
+
+def find_prior_parse(datafile):
+    """Return the latest other datafile with the same contents and section whose parse completed, if any.
+
+    Versions that have since been superseded are skipped, as their records are deleted once the newer
+    version is parsed.
+    """
+    shasum = get_datafile_shasum(datafile)
+    if shasum is None:
+        return None
+
+    later_versions = DataFile.objects.filter(
+        stt=OuterRef('stt'),
+        year=OuterRef('year'),
+        quarter=OuterRef('quarter'),
+        section=OuterRef('section'),
+        version__gt=OuterRef('version'),
+    ).exclude(id=datafile.id)
+
+    return DataFile.objects.filter(
+        Q(file_shasum=shasum) | Q(av_scans__file_shasum=shasum, av_scans__result=ClamAVFileScan.Result.CLEAN),
+        ~Exists(later_versions),
+        section=datafile.section,
+        parse_checkpoint__status=ParseCheckpoint.Status.COMPLETE,
+    ).exclude(id=datafile.id).order_by('-created_at').first()
+
+
+def is_superseded_by(prior, datafile):
+    """Return whether `prior` is an earlier version of the same submission as `datafile`."""
+    return (
+        (prior.stt_id, prior.year, prior.quarter, prior.section) ==
+        (datafile.stt_id, datafile.year, datafile.quarter, datafile.section) and
+        prior.version < datafile.version
+    )
+
+
+def relink_records(model, prior, datafile):
+    """Move the records of `prior` to `datafile` in a single update, returning the number moved."""
+    num_records = model.objects.filter(datafile=prior).update(datafile=datafile)
+    if num_records:
+        index_records(model, model.objects.filter(datafile=datafile))
+    return num_records
+
+
+def clone_records(model, prior, datafile):
+    """Copy the records of `prior` to `datafile` with the configured record writer.
+
+    Returns a mapping of each original record's primary key to its copy's.
+    """
+    writer = get_record_writer()
+    cloned_ids = {}
+    unsaved = []
+
+    for record in model.objects.filter(datafile=prior).order_by('pk').iterator(chunk_size=writer.batch_size):
+        unsaved.append((record.pk, record))
+        record.pk = None
+        record.datafile = datafile
+        record._state.adding = True
+        writer.add(record)
+
+        # only the primary keys are kept once a batch has been written
+        if not writer.num_unsaved:
+            cloned_ids.update((pk, record.pk) for pk, record in unsaved)
+            unsaved = []
+
+    writer.flush()
+    cloned_ids.update((pk, record.pk) for pk, record in unsaved)
+
+    return cloned_ids
+
+
+def clone_errors(prior, datafile, cloned_ids):
+    """Copy the parser errors of `prior` to `datafile`, returning the number copied.
+
+    `cloned_ids` maps each record content type to the primary keys of its cloned records; errors
+    on record types that weren't cloned keep referring to the same records.
+    """
+    batch_size = settings.PARSER_BULK_CREATE_BATCH_SIZE
+    errors = []
+    num_errors = 0
+
+    for error in ParserError.objects.filter(file=prior).order_by('pk').iterator(chunk_size=batch_size):
+        error.pk = None
+        error.file = datafile
+        if error.content_type_id in cloned_ids:
+            error.object_id = cloned_ids[error.content_type_id].get(error.object_id)
+        errors.append(error)
+
+        if len(errors) >= batch_size:
+            num_errors += len(ParserError.objects.bulk_create(errors))
+            errors = []
+
+    num_errors += len(ParserError.objects.bulk_create(errors))
+    return num_errors
+
+
+def reuse_prior_parse(datafile):
+    """Reuse the parse of an earlier byte-identical datafile instead of parsing this one.
+
+    An earlier version of the same submission hands its records over, as they would be deleted once
+    this version is parsed anyway; records of any other datafile are copied. Its errors and their
+    summary are copied either way. Returns the number of errors, or None when there is no parse to
+    reuse or this datafile's parse has already started.
+    """
+    prior = find_prior_parse(datafile)
+    if prior is None:
+        return None
+
+    with transaction.atomic():
+        checkpoint, created = ParseCheckpoint.objects.select_for_update().get_or_create(file=datafile)
+        if not created:
+            return None
+
+        num_records = 0
+        cloned_ids = {}
+        for model in RECORD_MODELS:
+            if is_superseded_by(prior, datafile):
+                num_records += relink_records(model, prior, datafile)
+            else:
+                model_cloned_ids = clone_records(model, prior, datafile)
+                cloned_ids[ContentType.objects.get_for_model(model).id] = model_cloned_ids
+                num_records += len(model_cloned_ids)
+
+        num_errors = clone_errors(prior, datafile, cloned_ids)
+
+        prior_checkpoint = prior.parse_checkpoint
+        checkpoint.advance(
+            prior_checkpoint.offset,
+            prior_checkpoint.line_number,
+            num_records,
+            num_errors,
+            prior_checkpoint.error_summary,
+        )
+        checkpoint.status = ParseCheckpoint.Status.COMPLETE
+        checkpoint.save()
+
+    start_progress(datafile, None, datafile.file.size, num_errors)
+    finish_progress(datafile.id, num_errors)
+
+    logger.info(f"DataFile {datafile.id} reused the parse of identical DataFile {prior.id}.")
+    return num_errors
@@ -0,0 +1,198 @@
+"""Cross-record validation that every record of a case in a datafile belongs to a case with a family record."""
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+from array import array
+from django.conf import settings
+from tdpservice.search_indexes.models.ssp import SSP_M1, SSP_M2, SSP_M3
+from tdpservice.search_indexes.models.tanf import TANF_T1, TANF_T2, TANF_T3
+from . import util
+from .models import ParserErrorCategoryChoices
+
+# the record type that each case's records need a matching record of
+CASE_RECORD_TYPES = {
+    'T1': 'T1',
+    'T2': 'T1',
+    'T3': 'T1',
+    'M1': 'M1',
+    'M2': 'M1',
+    'M3': 'M1',
+}
+
+FAMILY_RECORD_TYPES = sorted(set(CASE_RECORD_TYPES.values()))
+
+CASE_RECORD_MODELS = {
+    'T1': TANF_T1,
+    'T2': TANF_T2,
+    'T3': TANF_T3,
+    'M1': SSP_M1,
+    'M2': SSP_M2,
+    'M3': SSP_M3,
+}
+
+
+def case_key(family_record_type, rpt_month_year, case_number):
+    """Hash the family record type, RPT_MONTH_YEAR and CASE_NUMBER of a case to a signed 64 bit int in any process."""
+    digest = hashlib.blake2b(f'{family_record_type}:{rpt_month_year}:{case_number}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+class CaseIndex:
+    """The case keys of a datafile's family records, and its other records whose case had none yet.
+
+    Records are added as they're parsed and checked with `get_errors` once the whole file has been,
+    so a family record may come before or after the rest of its case. Most cases start with their
+    family record, so most records are matched as they're added, and only the hashed keys of the
+    family records are held until the end. Once more than `max_keys` keys and unmatched records are
+    held, they are moved to a sqlite database in a temporary file and matched there at the end.
+    """
+
+    def __init__(self, max_keys=None):
+        self.max_keys = max_keys or settings.PARSER_CASE_INDEX_MAX_KEYS
+        self.family_keys = set()
+        # the keys, line numbers, record types and cases of records whose case had no family record yet
+        self.unmatched_keys = array('q')
+        self.unmatched_line_numbers = array('q')
+        self.unmatched_cases = []
+        # the key, record type and line or record id of the last record added, as the children of a
+        # multi-record line are reported once
+        self.last_unmatched = None
+        self.db = None
+        self.db_dir = None
+        self.db_rows = ([], [])
+
+    @property
+    def num_keys(self):
+        """Return the number of keys held in memory."""
+        return len(self.family_keys) + len(self.unmatched_keys)
+
+    def add(self, record_type, rpt_month_year, case_number, line_number=0, record_id=None):
+        """Index a record of a case, found on the given line.
+
+        A saved record whose line isn't known is identified by its `record_id` instead, so that it isn't
+        taken for another child of the line of the record before it.
+        """
+        family_record_type = CASE_RECORD_TYPES.get(record_type)
+        if family_record_type is None:
+            return
+
+        key = case_key(family_record_type, rpt_month_year, case_number)
+        family_rows, unmatched_rows = self.db_rows
+        identity = (key, record_type, line_number or record_id)
+
+        if record_type == family_record_type:
+            if self.db is not None:
+                family_rows.append((key,))
+            else:
+                self.family_keys.add(key)
+        elif identity == self.last_unmatched:
+            # the other children of a multi-record line
+            return
+        elif self.db is not None:
+            self.last_unmatched = identity
+            unmatched_rows.append((key, line_number, record_type, rpt_month_year, case_number))
+        elif key not in self.family_keys:
+            self.last_unmatched = identity
+            self.unmatched_keys.append(key)
+            self.unmatched_line_numbers.append(line_number)
+            self.unmatched_cases.append((record_type, rpt_month_year, case_number))
+
+        if self.db is not None:
+            if len(family_rows) + len(unmatched_rows) >= settings.PARSER_BULK_CREATE_BATCH_SIZE:
+                self.flush()
+        elif self.num_keys > self.max_keys:
+            self.spill()
+
+    def add_record(self, record, line_number=0):
+        """Index a parsed record, found on the given line."""
+        self.add(record.RecordType, record.RPT_MONTH_YEAR, record.CASE_NUMBER, line_number)
+
+    def add_saved_records(self, datafile, record_types=None):
+        """Index the records already saved from a datafile, of the given record types or all of them.
+
+        Records are reported on the line they were parsed from, or on line 0 if they were saved before
+        their line was. Family records are indexed first, so only unmatched records are held.
+        """
+        record_types = sorted(
+            record_types or CASE_RECORD_TYPES, key=lambda record_type: record_type not in FAMILY_RECORD_TYPES
+        )
+        for record_type in record_types:
+            cases = CASE_RECORD_MODELS[record_type].objects.filter(
+                datafile=datafile,
+            ).order_by('pk').values_list('RPT_MONTH_YEAR', 'CASE_NUMBER', 'line_number', 'pk')
+
+            for rpt_month_year, case_number, line_number, pk in cases.iterator(
+                chunk_size=settings.PARSER_BULK_CREATE_BATCH_SIZE
+            ):
+                self.add(record_type, rpt_month_year, case_number, line_number or 0, pk)
+
+    def spill(self):
+        """Move the index to a sqlite database in a temporary file, so it no longer grows in memory."""
+        self.db_dir = tempfile.TemporaryDirectory(prefix='case_index_')
+        self.db = sqlite3.connect(os.path.join(self.db_dir.name, 'case_index.sqlite3'))
+        self.db.execute('PRAGMA journal_mode = OFF')
+        self.db.execute('PRAGMA synchronous = OFF')
+        self.db.execute('CREATE TABLE family (key INTEGER PRIMARY KEY) WITHOUT ROWID')
+        self.db.execute(
+            'CREATE TABLE unmatched (key INTEGER, line_number INTEGER, record_type TEXT, rpt_month_year INTEGER, '
+            'case_number TEXT)'
+        )
+
+        family_rows, unmatched_rows = self.db_rows
+        family_rows.extend((key,) for key in self.family_keys)
+        unmatched_rows.extend(
+            (key, line_number, *case)
+            for key, line_number, case in zip(self.unmatched_keys, self.unmatched_line_numbers, self.unmatched_cases)
+        )
+        self.family_keys = set()
+        self.unmatched_keys = array('q')
+        self.unmatched_line_numbers = array('q')
+        self.unmatched_cases = []
+        self.flush()
+
+    def flush(self):
+        """Insert the rows buffered for the sqlite database."""
+        family_rows, unmatched_rows = self.db_rows
+        self.db.executemany('INSERT OR IGNORE INTO family VALUES (?)', family_rows)
+        self.db.executemany('INSERT INTO unmatched VALUES (?, ?, ?, ?, ?)', unmatched_rows)
+        self.db_rows = ([], [])
+
+    def get_unmatched(self):
+        """Yield the line number, record type, RPT_MONTH_YEAR and CASE_NUMBER of each record with no family record."""
+        if self.db is None:
+            for key, line_number, case in zip(self.unmatched_keys, self.unmatched_line_numbers, self.unmatched_cases):
+                if key not in self.family_keys:
+                    yield (line_number, *case)
+            return
+
+        self.flush()
+        self.db.execute('CREATE INDEX unmatched_line_number ON unmatched (line_number)')
+        yield from self.db.execute(
+            'SELECT line_number, record_type, rpt_month_year, case_number FROM unmatched '
+            'WHERE NOT EXISTS (SELECT 1 FROM family WHERE family.key = unmatched.key) ORDER BY line_number'
+        )
+
+    def get_errors(self, datafile):
+        """Yield the record type and an unsaved `ParserError` for each record of a case with no family record."""
+        for line_number, record_type, rpt_month_year, case_number in self.get_unmatched():
+            family_record_type = CASE_RECORD_TYPES[record_type]
+            yield record_type, util.generate_parser_error(
+                datafile=datafile,
+                line_number=line_number,
+                schema=None,
+                error_category=ParserErrorCategoryChoices.VALUE_CONSISTENCY,
+                error_message=(
+                    f'{record_type} record has no {family_record_type} record for RPT_MONTH_YEAR '
+                    f'{rpt_month_year} and CASE_NUMBER {case_number}.'
+                ),
+                record={'RPT_MONTH_YEAR': rpt_month_year, 'CASE_NUMBER': case_number},
+            )
+
+    def close(self):
+        """Delete the sqlite database, if the index was spilled to one."""
+        if self.db is not None:
+            self.db.close()
+            self.db_dir.cleanup()
+            self.db = None
@@ -0,0 +1,89 @@
+"""`benchmark_parser` command."""
+
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+
+from tdpservice.data_files.models import DataFile
+from tdpservice.stts.models import STT
+from ... import benchmark
+from ...writers import RECORD_WRITERS
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Command class."""
+
+    help = "Measure parser throughput on a synthetic datafile, rolling back everything it saves."
+
+    def add_arguments(self, parser):
+        """Add the size and shape of the synthetic datafile as arguments."""
+        parser.add_argument("--program-type", choices=sorted(benchmark.CASE_RECORD_TYPES), default="TAN")
+        parser.add_argument("--lines", type=int, default=100000, help="Number of body lines to generate.")
+        parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of body lines to make invalid.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--writer", choices=sorted(RECORD_WRITERS), default=settings.PARSER_RECORD_WRITER,
+            help="How parsed records are inserted."
+        )
+
+    def handle(self, *args, **options):
+        """Parse a synthetic datafile end to end, then again with each stage timed."""
+        user = User.objects.order_by("-is_superuser", "id").first()
+        stt = STT.objects.order_by("id").first()
+        if user is None or stt is None:
+            raise CommandError("A user and an STT are needed to create the benchmark datafile.")
+
+        program_type = options["program_type"]
+        section = DataFile.Section.ACTIVE_CASE_DATA if program_type == "TAN" else DataFile.Section.SSP_ACTIVE_CASE_DATA
+
+        # records are only indexed once their transaction commits, and the benchmark's never do
+        with tempfile.TemporaryFile() as rawfile, override_settings(
+            ELASTICSEARCH_DSL_AUTOSYNC=False,
+            PARSER_RECORD_WRITER=options["writer"],
+        ):
+            benchmark.write_datafile(
+                rawfile, program_type, options["lines"], options["error_rate"], options["seed"]
+            )
+            self.stdout.write(
+                f"Generated {options['lines']} {program_type} lines ({rawfile.tell()} bytes), "
+                f"inserting records with the {options['writer']} writer."
+            )
+
+            for timer in [None, benchmark.StageTimer()]:
+                with transaction.atomic():
+                    datafile = DataFile.create_new_version({
+                        "year": 2020,
+                        "quarter": "Q1",
+                        "section": section,
+                        "user": user,
+                        "stt": stt,
+                    })
+                    # parse from the local file without uploading it to storage
+                    datafile.file = File(rawfile, name="benchmark.txt")
+
+                    num_errors, seconds = benchmark.time_parse(datafile, timer)
+                    transaction.set_rollback(True)
+
+                self.report(options["lines"], num_errors, seconds, timer)
+
+    def report(self, num_lines, num_errors, seconds, timer):
+        """Write the throughput of a run, and the time spent in each stage if it was timed."""
+        label = "Timed stages" if timer else "End to end"
+        self.stdout.write(
+            f"{label}: {seconds:.2f}s, {num_lines / seconds:,.0f} lines/sec, {num_errors} errors, "
+            f"peak RSS {benchmark.get_peak_rss() / 1024:,.1f} MB"
+        )
+
+        if timer is None:
+            return
+
+        for stage, total in sorted(timer.totals.items(), key=lambda item: -item[1]):
+            share = 100 * total / seconds
+            self.stdout.write(f"  {stage:<28}{total:8.2f}s {share:5.1f}% {timer.calls[stage]:>10} calls")
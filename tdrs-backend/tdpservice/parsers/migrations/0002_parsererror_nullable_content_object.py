@@ -0,0 +1,30 @@
+# Generated by Django 3.2.15 on 2026-10-17 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('parsers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='parsererror',
+            name='category',
+            field=models.IntegerField(choices=[(1, 'Pre-check'), (2, 'Field value'), (3, 'Value consistency')], default=1),
+        ),
+        migrations.AlterField(
+            model_name='parsererror',
+            name='content_type',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype'),
+        ),
+        migrations.AlterField(
+            model_name='parsererror',
+            name='object_id',
+            field=models.PositiveIntegerField(null=True),
+        ),
+    ]
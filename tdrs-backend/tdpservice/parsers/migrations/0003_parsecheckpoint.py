@@ -0,0 +1,31 @@
+# Generated by Django 3.2.15 on 2026-10-17 18:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_files', '0012_datafile_s3_versioning_id'),
+        ('parsers', '0002_parsererror_nullable_content_object'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParseCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('Parsing', 'Parsing'), ('Complete', 'Complete')], default='Parsing', max_length=16)),
+                ('offset', models.PositiveBigIntegerField(default=0)),
+                ('line_number', models.PositiveIntegerField(default=0)),
+                ('num_records', models.PositiveIntegerField(default=0)),
+                ('num_errors', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('file', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='parse_checkpoint', to='data_files.datafile')),
+            ],
+            options={
+                'db_table': 'parse_checkpoint',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.15 on 2026-10-17 18:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parsers', '0003_parsecheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parsecheckpoint',
+            name='error_summary',
+            field=models.JSONField(default=dict),
+        ),
+    ]
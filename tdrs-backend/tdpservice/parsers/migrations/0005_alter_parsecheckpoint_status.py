@@ -0,0 +1,18 @@
+# Generated by Django 3.2.15 on 2026-10-17 18:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parsers', '0004_parsecheckpoint_error_summary'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='parsecheckpoint',
+            name='status',
+            field=models.CharField(choices=[('Parsing', 'Parsing'), ('Complete', 'Complete'), ('Rejected', 'Rejected')], default='Parsing', max_length=16),
+        ),
+    ]
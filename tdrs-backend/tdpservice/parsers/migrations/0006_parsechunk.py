@@ -0,0 +1,36 @@
+# Generated by Django 3.2.15 on 2026-10-17 19:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_files', '0013_datafile_file_size_file_shasum'),
+        ('parsers', '0005_alter_parsecheckpoint_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='parsecheckpoint',
+            name='status',
+            field=models.CharField(choices=[('Parsing', 'Parsing'), ('Complete', 'Complete'), ('Rejected', 'Rejected'), ('Failed', 'Failed')], default='Parsing', max_length=16),
+        ),
+        migrations.CreateModel(
+            name='ParseChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_line_number', models.PositiveIntegerField()),
+                ('error_summary', models.JSONField(default=dict)),
+                ('file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parse_chunks', to='data_files.datafile')),
+            ],
+            options={
+                'db_table': 'parse_chunk',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='parsechunk',
+            constraint=models.UniqueConstraint(fields=('file', 'first_line_number'), name='unique_parse_chunk'),
+        ),
+    ]
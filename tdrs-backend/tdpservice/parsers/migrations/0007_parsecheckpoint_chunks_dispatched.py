@@ -0,0 +1,18 @@
+# Generated by Django 3.2.15 on 2026-10-17 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parsers', '0006_parsechunk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parsecheckpoint',
+            name='chunks_dispatched',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.15 on 2026-10-17 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parsers', '0007_parsecheckpoint_chunks_dispatched'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='parsererror',
+            index=models.Index(fields=['content_type', 'object_id'], name='parser_error_object_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.15 on 2026-10-17 20:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parsers', '0008_parsererror_object_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='parsererror',
+            index=models.Index(fields=['file', 'id'], name='parser_error_file_id_idx'),
+        ),
+    ]
@@ -4,6 +4,16 @@
 from django.db import models
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from .summary import ErrorSummary
+
+
+class ParserErrorCategoryChoices(models.IntegerChoices):
+    """Enum of the stages of parsing at which an error can be found."""
+
+    PRE_CHECK = 1, "Pre-check"
+    FIELD_VALUE = 2, "Field value"
+    VALUE_CONSISTENCY = 3, "Value consistency"
+
 
 class ParserError(models.Model):
     """Model representing a parser error."""
@@ -12,6 +22,12 @@ class Meta:
         """Meta for ParserError."""
 
         db_table = "parser_error"
+        indexes = [
+            # to find the errors of records as they are deleted
+            models.Index(fields=["content_type", "object_id"], name="parser_error_object_idx"),
+            # to find the latest error saved for each file when listing files
+            models.Index(fields=["file", "id"], name="parser_error_file_id_idx"),
+        ]
 
     id = models.AutoField(primary_key=True)
     file = models.ForeignKey(
@@ -24,15 +40,21 @@ class Meta:
     column_number = models.IntegerField(null=False)
     item_number = models.IntegerField(null=False)
     field_name = models.TextField(null=False, max_length=128)
-    category = models.IntegerField(null=False, default=1)
+    category = models.IntegerField(
+        null=False,
+        default=ParserErrorCategoryChoices.PRE_CHECK,
+        choices=ParserErrorCategoryChoices.choices
+    )
     rpt_month_year = models.IntegerField(null=True,  blank=False)
     case_number = models.TextField(null=True, max_length=128)
 
     error_message = models.TextField(null=True, max_length=512)
     error_type = models.TextField(max_length=128)         # out of range, pre-parsing, etc.
 
-    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
-    object_id = models.PositiveIntegerField()
+    # errors found before a line could be parsed into a record, or for the document
+    # as a whole, have no record to refer to
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True)
+    object_id = models.PositiveIntegerField(null=True)
     content_object = GenericForeignKey()
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -54,3 +76,83 @@ def __str__(self):
     def _get_error_message(self):
         """Return the error message."""
         return self.error_message
+
+
+class ParseCheckpoint(models.Model):
+    """Durable progress of parsing a datafile, so that an interrupted parse can resume where it stopped."""
+
+    class Meta:
+        """Meta for ParseCheckpoint."""
+
+        db_table = "parse_checkpoint"
+
+    class Status(models.TextChoices):
+        """Enum of the states a datafile's parse can be in."""
+
+        PARSING = "Parsing"
+        COMPLETE = "Complete"
+        REJECTED = "Rejected"
+        FAILED = "Failed"
+
+    file = models.OneToOneField(
+        "data_files.DataFile",
+        on_delete=models.CASCADE,
+        related_name="parse_checkpoint",
+    )
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PARSING)
+
+    # the position just after the last line whose records and errors have been committed
+    offset = models.PositiveBigIntegerField(default=0)
+    line_number = models.PositiveIntegerField(default=0)
+
+    num_records = models.PositiveIntegerField(default=0)
+    num_errors = models.PositiveIntegerField(default=0)
+    # an `ErrorSummary` of the errors committed so far
+    error_summary = models.JSONField(default=dict)
+    # whether the file's chunks have been sent to be parsed by their own tasks
+    chunks_dispatched = models.BooleanField(default=False)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def advance(self, offset, line_number, num_records, num_errors, error_summary=None):
+        """Record that the lines up to `offset` have been committed, with their records and errors."""
+        self.offset = offset
+        self.line_number = line_number
+        self.num_records += num_records
+        self.num_errors += num_errors
+        if error_summary:
+            self.error_summary = ErrorSummary().merge(self.error_summary).merge(error_summary).as_dict()
+        self.save()
+
+    def __str__(self):
+        """Return a string representation of the model."""
+        return f"ParseCheckpoint for file {self.file_id} at line {self.line_number}"
+
+
+class ParseChunk(models.Model):
+    """A chunk of a datafile parsed by its own task, committed in the same transaction as its records and errors.
+
+    It keeps the summary of the chunk's errors that the task returned, so a redelivered task returns it
+    again rather than saving the chunk's records a second time.
+    """
+
+    class Meta:
+        """Meta for ParseChunk."""
+
+        db_table = "parse_chunk"
+        constraints = [
+            models.UniqueConstraint(fields=("file", "first_line_number"), name="unique_parse_chunk"),
+        ]
+
+    file = models.ForeignKey(
+        "data_files.DataFile",
+        on_delete=models.CASCADE,
+        related_name="parse_chunks",
+    )
+    first_line_number = models.PositiveIntegerField()
+    # the `ErrorSummary` of the chunk's errors, flagged as rejected if they exceeded the file's budget
+    error_summary = models.JSONField(default=dict)
+
+    def __str__(self):
+        """Return a string representation of the model."""
+        return f"ParseChunk for file {self.file_id} from line {self.first_line_number}"
@@ -1,44 +1,448 @@
 """Convert raw uploaded Datafile into a parsed model, and accumulate/return any errors."""
 
 
-import os
-from . import schema_defs, validators, util
+from contextlib import closing
+from django.conf import settings
+from django.db import transaction
+from types import MappingProxyType
+from . import schema_defs, util
+from .budget import ErrorBudget, ErrorBudgetExceeded
+from .case_consistency import CaseIndex
+from .models import ParseCheckpoint, ParserError, ParserErrorCategoryChoices
+from .progress import ParseProgress, finish_progress, start_progress
+from .spool import open_datafile, spool_datafile
+from .summary import ErrorSummary, summarize
+from .validators import as_text
+from .writers import ParserErrorWriter, delete_records, get_record_writer
 from tdpservice.data_files.models import DataFile
 
 
-def parse_datafile(datafile):
-    """Parse and validate Datafile header/trailer, then select appropriate schema and parse/validate all lines."""
-    rawfile = datafile.file
-    errors = {}
+class DocumentStructure:
+    """Tracks the header, trailer and header/trailer counts of a datafile as its lines stream past."""
+
+    def __init__(self, datafile):
+        self.datafile = datafile
+        self.counts = {'HEADER': 0, 'TRAILER': 0}
+        self.header = None
+        self.header_errors = []
+        self.section = None
+        self.schema_options = None
+        self.document_error = None
+        self.last_line = None
+        self.last_line_number = 0
+
+    @property
+    def program_type(self):
+        """Return the program type of a valid header."""
+        return self.header['program_type'] if self.header else None
+
+    def is_body_line(self, line_number, line):
+        """Account for a line of the file, returning whether it is a body line that should be parsed."""
+        self.last_line = line
+        self.last_line_number = line_number
+        self.document_error = count_header_trailer(line, self.counts)
+
+        if line_number == 1:
+            self.header, self.header_errors = validate_header(as_text(line).strip(), self.datafile)
+            if self.header:
+                self.section = self.header['type']
+                self.schema_options = get_schema_options(self.program_type)
+            return False
+
+        # keep counting headers and trailers after a bad header, but don't parse records for it
+        return self.schema_options is not None and not is_header_or_trailer(line)
+
+    def get_errors(self):
+        """Return the unsaved `ParserError`s that prevent any of the file's records from being kept."""
+        if self.document_error is None and self.counts['HEADER'] == 0:
+            self.document_error = 'No headers found.'
+
+        if self.document_error is not None:
+            return [generate_document_error(self.datafile, self.last_line_number, self.document_error)]
+
+        return self.header_errors
+
+    def get_trailer_errors(self):
+        """Parse and validate the trailer, which is always the last line of the file."""
+        generate_error = util.make_generate_parser_error(self.datafile, self.last_line_number)
+        trailer, trailer_is_valid, trailer_errors = schema_defs.trailer.parse_and_validate(
+            as_text(self.last_line),
+            generate_error
+        )
+        return trailer_errors
+
+
+class BodyLineBatch:
+    """Buffers body lines so that each schema's lines are validated together, a column of values at a time."""
+
+    def __init__(
+        self, datafile, section, schema_options, record_writer, error_writer, batch_size=None, case_index=None,
+        budget=None,
+    ):
+        self.datafile = datafile
+        self.section = section
+        self.schema_options = schema_options
+        self.record_writer = record_writer
+        self.error_writer = error_writer
+        self.batch_size = batch_size or settings.PARSER_VALIDATION_BATCH_LINES
+        self.case_index = case_index
+        self.budget = budget
+        self.lines = []
+
+    def add(self, line_number, line):
+        """Buffer a body line, parsing the buffer once `batch_size` lines are held."""
+        self.lines.append((line_number, line))
+
+        if len(self.lines) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Parse and validate the buffered lines, passing their records and errors to the writers in line order."""
+        if not self.lines:
+            return
+
+        parse_datafile_body_lines(
+            self.lines,
+            self.datafile,
+            self.section,
+            self.schema_options,
+            self.record_writer,
+            self.error_writer,
+            self.case_index,
+            self.budget,
+        )
+        self.lines = []
+
+
+def plan_datafile_chunks(datafile, chunk_lines, rawfile=None):
+    """Validate a Datafile's structure and split its body into chunks of `chunk_lines` lines.
+
+    Nothing is parsed beyond the header and trailer. Each chunk is returned as a tuple of the byte
+    offset of its first line, its first line number, its number of lines and its number of bytes,
+    so that chunks can be parsed independently with `parse_datafile_chunk`. The file is read from
+    `rawfile` if it has already been spooled.
+    """
+    structure = DocumentStructure(datafile)
+    chunks = []
+    offset = 0
+    line_number = 0
+
+    with open_datafile(datafile, rawfile) as rawfile:
+        rawfile.seek(0)
+
+        for rawline in iter(rawfile.readline, b''):
+            line_number += 1
+            structure.is_body_line(line_number, read_line(rawline))
+
+            if structure.document_error:
+                break
+
+            if line_number > 1 and (line_number - 2) % chunk_lines == 0:
+                chunks.append([offset, line_number, 0, 0])
+
+            if chunks:
+                chunks[-1][2] += 1
+                chunks[-1][3] += len(rawline)
+
+            offset += len(rawline)
+
+    return structure, [tuple(chunk) for chunk in chunks]
+
+
+def parse_datafile_chunk(
+    datafile,
+    program_type,
+    section,
+    offset,
+    first_line_number,
+    num_lines,
+    num_bytes=None,
+    checkpoint=None,
+    error_summary=None,
+    case_index=None,
+    rawfile=None,
+    shared_errors=None,
+):
+    """Parse and validate a chunk of a Datafile's body planned by `plan_datafile_chunks`.
+
+    Errors are saved with their absolute line number in the file, and the number of errors is returned.
+    When a `ParseCheckpoint` is given it is advanced past the chunk in the same transaction as the
+    chunk's records and errors, along with a summary of the errors. Otherwise the errors can be
+    summarized in the given `ErrorSummary`. The chunk's records are added to `case_index`, if given,
+    so that their cases can be checked once the whole file has been parsed.
+
+    The chunk is read from `rawfile` if the file has already been spooled. Otherwise its `num_bytes`
+    bytes, or the rest of the file if they aren't known, are spooled on their own.
+
+    If the errors exceed the file's `ErrorBudget` the rest of the chunk is skipped. The errors found
+    so far are saved along with one explaining why parsing stopped, then `ErrorBudgetExceeded` is raised.
+    Errors are checked against the budget as each line's are found. The errors of the file's other
+    chunks count towards it too when they are shared through `shared_errors`.
+    """
+    record_writer = get_record_writer()
+    error_writer = ParserErrorWriter(record_writer, summary=error_summary)
+    budget = ErrorBudget(checkpoint.num_errors if checkpoint is not None else 0, shared=shared_errors)
+    batch = BodyLineBatch(
+        datafile,
+        section,
+        get_schema_options(program_type),
+        record_writer,
+        error_writer,
+        case_index=case_index,
+        budget=budget,
+    )
+    progress = ParseProgress(datafile.id)
+    budget_exceeded = None
+    line_number = first_line_number - 1
+    bytes_read = 0
+
+    end = offset + num_bytes if num_bytes is not None else None
+
+    with transaction.atomic(), open_datafile(datafile, rawfile, offset, end) as rawfile:
+        rawfile.seek(offset)
+
+        try:
+            for line_number in range(first_line_number, first_line_number + num_lines):
+                rawline = rawfile.readline()
+                bytes_read += len(rawline)
+                line = read_line(rawline)
+
+                if not is_header_or_trailer(line):
+                    batch.add(line_number, line)
+
+                progress.update(line_number - first_line_number + 1, bytes_read, record_writer, error_writer)
+
+            batch.flush()
+        except ErrorBudgetExceeded as e:
+            budget_exceeded = e
+            error_writer.add(generate_document_error(datafile, e.line_number, str(e)))
+
+        error_writer.flush()
+        record_writer.flush()
+
+        if checkpoint is not None:
+            checkpoint.advance(
+                rawfile.tell(), line_number, record_writer.num_created, error_writer.num_created, error_writer.summary
+            )
+
+    progress.update(num_lines, bytes_read, record_writer, error_writer, force=True)
+
+    if budget_exceeded is not None:
+        raise budget_exceeded
+
+    return error_writer.num_created
+
+
+def parse_datafile_resumable(datafile, checkpoint_lines=None):
+    """Parse a Datafile in transactions of `checkpoint_lines` lines, resuming from its `ParseCheckpoint`.
+
+    The file's structure is validated before any records are saved, as records committed by earlier
+    transactions can't be rolled back. Each transaction locks and advances the checkpoint, so a parse
+    interrupted by a worker restart picks up after the last committed line rather than starting over or
+    saving duplicate records, and a parse redelivered while the first is still running skips the chunks
+    the first has committed. A file whose errors exceed its `ErrorBudget` is rejected part way through.
+    The cases of the records are checked once the last chunk is committed, from the records this parse
+    saw or, if some of the chunks were committed by an earlier parse, from all of the saved records.
+    The file is spooled once and read locally throughout. Returns the number of errors found.
+    """
+    with spool_datafile(datafile) as rawfile:
+        chunk_lines = checkpoint_lines or settings.PARSER_CHECKPOINT_LINES
+        structure, chunks = plan_datafile_chunks(datafile, chunk_lines, rawfile)
+        checkpoint = start_datafile(datafile, structure, chunks)
+
+        if checkpoint.status == ParseCheckpoint.Status.PARSING:
+            with closing(CaseIndex()) as case_index:
+                checkpoint, parsed_every_chunk = parse_remaining_chunks(
+                    datafile, structure, chunks, case_index, rawfile
+                )
+                if checkpoint.status == ParseCheckpoint.Status.PARSING:
+                    checkpoint = complete_datafile(datafile, case_index if parsed_every_chunk else None)
+
+    finish_progress(datafile.id, checkpoint.num_errors, checkpoint.status.lower())
+
+    return checkpoint.num_errors
+
+
+def start_datafile(datafile, structure, chunks):
+    """Return the datafile's `ParseCheckpoint`, creating it with the errors in the file's structure if it's new.
+
+    A file with structure errors is complete as soon as they are saved, as none of its records are kept.
+    """
+    with transaction.atomic():
+        checkpoint, created = ParseCheckpoint.objects.select_for_update().get_or_create(file=datafile)
+
+        if created:
+            structure_errors = structure.get_errors()
+            errors = ParserError.objects.bulk_create(structure_errors or structure.get_trailer_errors())
+            error_summary = summarize(structure_errors) if structure_errors else summarize(errors, 'TRAILER')
+            checkpoint.advance(chunks[0][0] if chunks else 0, 1, 0, len(errors), error_summary)
+            start_progress(datafile, sum(chunk[2] for chunk in chunks), datafile.file.size, len(errors))
+
+            if structure_errors:
+                checkpoint.status = ParseCheckpoint.Status.COMPLETE
+                checkpoint.save()
+
+    return checkpoint
+
+
+def parse_remaining_chunks(datafile, structure, chunks, case_index, rawfile):
+    """Parse each chunk past the datafile's checkpoint in its own transaction.
+
+    The checkpoint is locked and read again in each chunk's transaction, so chunks committed by another
+    parse of the same file, before or during this one, are skipped, and parsing stops once that parse
+    has finished the file. The file is rejected as soon as its errors exceed its budget. Returns the
+    checkpoint and whether every chunk was parsed by this parse, so that `case_index` holds all of the
+    file's records.
+    """
+    parsed_every_chunk = True
+
+    for offset, first_line_number, num_lines, num_bytes in chunks:
+        with transaction.atomic():
+            checkpoint = ParseCheckpoint.objects.select_for_update().get(file=datafile)
+            if checkpoint.status != ParseCheckpoint.Status.PARSING:
+                return checkpoint, parsed_every_chunk
+            if first_line_number <= checkpoint.line_number:
+                parsed_every_chunk = False
+                continue
+
+            try:
+                parse_datafile_chunk(
+                    datafile,
+                    structure.program_type,
+                    structure.section,
+                    offset,
+                    first_line_number,
+                    num_lines,
+                    num_bytes,
+                    checkpoint,
+                    case_index=case_index,
+                    rawfile=rawfile,
+                )
+            except ErrorBudgetExceeded:
+                reject_datafile(datafile, checkpoint)
+                return checkpoint, parsed_every_chunk
+
+    return ParseCheckpoint.objects.get(file=datafile), parsed_every_chunk
+
+
+def complete_datafile(datafile, case_index=None):
+    """Save the errors of any records without a family record for their case, and mark the parse complete.
+
+    The records are looked up in `case_index`, or, if none is given because some of the records were
+    saved by an earlier parse, all of the records saved from the file are checked. Returns the
+    datafile's checkpoint, which is left as it is if another parse of the file has already finished it.
+    """
+    with transaction.atomic():
+        checkpoint = ParseCheckpoint.objects.select_for_update().get(file=datafile)
+        if checkpoint.status != ParseCheckpoint.Status.PARSING:
+            return checkpoint
+
+        error_summary = ErrorSummary()
+        if case_index is None:
+            num_errors = check_saved_cases(datafile, error_summary)
+        else:
+            error_writer = ParserErrorWriter(summary=error_summary)
+            add_case_errors(datafile, case_index, error_writer)
+            error_writer.flush()
+            num_errors = error_writer.num_created
 
-    document_is_valid, document_error = validators.validate_single_header_trailer(rawfile)
-    if not document_is_valid:
-        errors['document'] = [document_error]
-        return errors
+        checkpoint.advance(checkpoint.offset, checkpoint.line_number, 0, num_errors, error_summary)
+        checkpoint.status = ParseCheckpoint.Status.COMPLETE
+        checkpoint.save()
 
-    # get header line
-    rawfile.seek(0)
-    header_line = rawfile.readline().decode().strip()
+    return checkpoint
 
-    # get trailer line
-    rawfile.seek(0)
-    rawfile.seek(-2, os.SEEK_END)
-    while rawfile.read(1) != b'\n':
-        rawfile.seek(-2, os.SEEK_CUR)
 
-    trailer_line = rawfile.readline().decode().strip('\n')
+def check_saved_cases(datafile, error_summary=None):
+    """Save an error for each record already saved from a Datafile without a family record for its case.
 
-    # parse header, trailer
-    header, header_is_valid, header_errors = schema_defs.header.parse_and_validate(header_line)
-    if not header_is_valid:
-        errors['header'] = header_errors
-        return errors
+    For files whose chunks were parsed by separate tasks, which each only see their own records. The
+    errors are counted in `error_summary` if given, and the number saved is returned.
+    """
+    with closing(CaseIndex()) as case_index:
+        case_index.add_saved_records(datafile)
+        error_writer = ParserErrorWriter(summary=error_summary)
+        add_case_errors(datafile, case_index, error_writer)
+        error_writer.flush()
+
+    return error_writer.num_created
+
+
+def add_case_errors(datafile, case_index, error_writer):
+    """Add an error for each record in the `CaseIndex` without a family record for its case."""
+    for record_type, error in case_index.get_errors(datafile):
+        error_writer.add(error, record_type=record_type)
+
+
+def reject_datafile(datafile, checkpoint):
+    """Mark a Datafile whose errors exceeded its budget as rejected, deleting any records already saved from it."""
+    with transaction.atomic():
+        checkpoint.status = ParseCheckpoint.Status.REJECTED
+        checkpoint.save()
+        delete_records([datafile.id])
+
+
+# the HEADER and TRAILER prefixes for str and bytes lines
+STRUCTURE_PREFIXES = {
+    str: ('HEADER', 'TRAILER'),
+    bytes: (b'HEADER', b'TRAILER'),
+}
+
+
+def read_line(rawline):
+    """Strip the line ending from a raw line, keeping it as bytes if it is ASCII and decoding it otherwise.
 
-    trailer, trailer_is_valid, trailer_errors = schema_defs.trailer.parse_and_validate(trailer_line)
-    if not trailer_is_valid:
-        errors['trailer'] = trailer_errors
+    Datafiles are fixed width ASCII by spec, so lines are normally parsed as bytes, converting only the
+    field slices that are needed. Lines with other characters fall back to being parsed as str, so that
+    slices line up with characters rather than bytes.
+    """
+    line = rawline.strip(b'\r\n')
+    return line if line.isascii() else line.decode()
+
+
+def is_header_or_trailer(line):
+    """Return whether a str or bytes line is a HEADER or TRAILER."""
+    return line.startswith(STRUCTURE_PREFIXES[type(line)])
+
+
+def count_header_trailer(line, counts):
+    """Count HEADER and TRAILER lines, returning a document error once either is seen more than once."""
+    header_prefix, trailer_prefix = STRUCTURE_PREFIXES[type(line)]
+    if line.startswith(header_prefix):
+        counts['HEADER'] += 1
+    elif line.startswith(trailer_prefix):
+        counts['TRAILER'] += 1
+
+    if counts['HEADER'] > 1:
+        return 'Multiple headers found.'
+
+    if counts['TRAILER'] > 1:
+        return 'Multiple trailers found.'
+
+    return None
+
+
+def generate_document_error(datafile, line_number, error_message):
+    """Build an unsaved `ParserError` for an error with the structure of the file as a whole."""
+    return util.generate_parser_error(
+        datafile=datafile,
+        line_number=line_number,
+        schema=None,
+        error_category=ParserErrorCategoryChoices.PRE_CHECK,
+        error_message=error_message,
+    )
+
+
+def validate_header(header_line, datafile):
+    """Parse and validate the header line, and ensure the file section matches the upload section.
+
+    Returns the parsed header, or the unsaved `ParserError`s explaining why it is invalid.
+    """
+    generate_error = util.make_generate_parser_error(datafile, 1)
+    header, header_is_valid, header_errors = schema_defs.header.parse_and_validate(header_line, generate_error)
+    if not header_is_valid:
+        return None, header_errors
 
-    # ensure file section matches upload section
     section_names = {
         'TAN': {
             'A': DataFile.Section.ACTIVE_CASE_DATA,
@@ -58,126 +462,148 @@ def parse_datafile(datafile):
     section = header['type']
 
     if datafile.section != section_names.get(program_type, {}).get(section):
-        errors['document'] = ['Section does not match.']
-        return errors
-
-    line_errors = parse_datafile_lines(datafile, program_type, section)
+        return None, [generate_document_error(datafile, 1, 'Section does not match.')]
 
-    errors = errors | line_errors
+    return header, []
 
-    return errors
 
+def validate_body_lines(lines, datafile, section, schema_options):
+    """Parse and validate a batch of (line number, line) body lines, grouped by schema.
 
-def parse_datafile_lines(datafile, program_type, section):
-    """Parse lines with appropriate schema and return errors."""
-    errors = {}
-    rawfile = datafile.file
-
-    rawfile.seek(0)
-    line_number = 0
-    schema_options = get_schema_options(program_type)
+    Returns a list of each line's (record, is valid, errors) results, or None for lines with no schema.
+    """
+    schemas = get_section_schemas(section, schema_options)
+    lines_by_schema = {}
+    for i, (line_number, line) in enumerate(lines):
+        lines_by_schema.setdefault(get_schema(line, schemas), []).append(i)
 
-    for rawline in rawfile:
-        line_number += 1
-        line = rawline.decode().strip('\r\n')
-
-        if line.startswith('HEADER') or line.startswith('TRAILER'):
+    results = [None] * len(lines)
+    for schema, positions in lines_by_schema.items():
+        if schema is None:
             continue
 
-        schema = get_schema(line, section, schema_options)
-
-        if isinstance(schema, util.MultiRecordRowSchema):
-            records = parse_multi_record_line(line, schema)
-
-            record_number = 0
-            for r in records:
-                record_number += 1
-                record, record_is_valid, record_errors = r
-                if not record_is_valid:
-                    line_errors = errors.get(line_number, {})
-                    line_errors[record_number] = record_errors
-                    errors[line_number] = line_errors
+        schema_results = schema.parse_and_validate_batch(
+            [lines[i][1] for i in positions],
+            [util.make_generate_parser_error(datafile, lines[i][0]) for i in positions]
+        )
+        if not isinstance(schema, util.MultiRecordRowSchema):
+            schema_results = [[r] for r in schema_results]
+
+        for i, line_results in zip(positions, schema_results):
+            results[i] = line_results
+
+    return results
+
+
+def parse_datafile_body_lines(
+    lines, datafile, section, schema_options, record_writer, error_writer, case_index=None, budget=None
+):
+    """Parse a batch of (line number, line) body lines, buffering their records and errors in the writers.
+
+    Lines are grouped by schema so that each schema validates its lines together, then their records and
+    errors are passed to the writers in line order, and the records to the `CaseIndex` if given. The
+    errors are checked against the `ErrorBudget`, if given, as each line's are added, raising
+    `ErrorBudgetExceeded` at the line that exceeded it.
+    """
+    results = validate_body_lines(lines, datafile, section, schema_options)
+
+    for (line_number, line), line_results in zip(lines, results):
+        if line_results is None:
+            error_writer.add(util.generate_parser_error(
+                datafile=datafile,
+                line_number=line_number,
+                schema=None,
+                error_category=ParserErrorCategoryChoices.PRE_CHECK,
+                error_message='No schema selected.',
+            ), record_type=as_text(line[:2]))
         else:
-            record_is_valid, record_errors = parse_datafile_line(line, schema)
-            if not record_is_valid:
-                errors[line_number] = record_errors
-
-    return errors
-
-
-def parse_multi_record_line(line, schema):
-    """Parse and validate a datafile line using MultiRecordRowSchema."""
-    if schema:
-        records = schema.parse_and_validate(line)
-
-        for r in records:
-            record, record_is_valid, record_errors = r
-
-            if record:
-                record.save()
-
-        return records
-
-    return [(None, False, ['No schema selected.'])]
+            for record, record_is_valid, record_errors in line_results:
+                if record:
+                    record.datafile = datafile
+                    record.line_number = line_number
+                    record_writer.add(record)
+                    if case_index is not None:
+                        case_index.add_record(record, line_number)
+                error_writer.add_all(record_errors, record, as_text(line[:2]))
+
+        if budget is not None:
+            budget.check(line_number, error_writer.summary.num_errors)
+
+
+# The schema for each record type, by program type and section. Closed case (T4/T5, M4/M5), aggregate
+# (T6, M6), stratum (T7, M7) and tribal schemas are added here as they are defined.
+SCHEMA_DEFS = {
+    'TAN': {
+        'A': {
+            'T1': schema_defs.tanf.t1,
+            'T2': schema_defs.tanf.t2,
+            'T3': schema_defs.tanf.t3,
+        },
+        'C': {
+            # 'T4': schema_options.t4,
+            # 'T5': schema_options.t5,
+        },
+        'G': {
+            # 'T6': schema_options.t6,
+        },
+        'S': {
+            # 'T7': schema_options.t7,
+        },
+    },
+    'SSP': {
+        'A': {
+            'M1': schema_defs.ssp.m1,
+            'M2': schema_defs.ssp.m2,
+            'M3': schema_defs.ssp.m3,
+        },
+        'C': {
+            # 'M4': schema_options.m4,
+            # 'M5': schema_options.m5,
+        },
+        'G': {
+            # 'M6': schema_options.m6,
+        },
+        'S': {
+            # 'M7': schema_options.m7,
+        },
+    },
+    # tribal?
+}
 
 
-def parse_datafile_line(line, schema):
-    """Parse and validate a datafile line and save any errors to the model."""
-    if schema:
-        record, record_is_valid, record_errors = schema.parse_and_validate(line)
+def build_schema_registry(defs):
+    """Freeze `SCHEMA_DEFS` into read only mappings, built once rather than per file or per line.
 
-        if record:
-            record.save()
+    Each record type is keyed both by its str and its raw two byte prefix, so a schema can be looked up
+    directly from a line's first two characters whether or not the line has been decoded.
+    """
+    return MappingProxyType({
+        program_type: MappingProxyType({
+            section: MappingProxyType({
+                key: schema
+                for record_type, schema in schemas.items()
+                for key in (record_type, record_type.encode())
+            })
+            for section, schemas in sections.items()
+        })
+        for program_type, sections in defs.items()
+    })
 
-        return record_is_valid, record_errors
 
-    return (False, ['No schema selected.'])
+SCHEMA_REGISTRY = build_schema_registry(SCHEMA_DEFS)
+NO_SCHEMAS = MappingProxyType({})
 
 
 def get_schema_options(program_type):
     """Return the allowed schema options."""
-    match program_type:
-        case 'TAN':
-            return {
-                'A': {
-                    'T1': schema_defs.tanf.t1,
-                    'T2': schema_defs.tanf.t2,
-                    'T3': schema_defs.tanf.t3,
-                },
-                'C': {
-                    # 'T4': schema_options.t4,
-                    # 'T5': schema_options.t5,
-                },
-                'G': {
-                    # 'T6': schema_options.t6,
-                },
-                'S': {
-                    # 'T7': schema_options.t7,
-                },
-            }
-        case 'SSP':
-            return {
-                'A': {
-                    'M1': schema_defs.ssp.m1,
-                    'M2': schema_defs.ssp.m2,
-                    'M3': schema_defs.ssp.m3,
-                },
-                'C': {
-                    # 'M4': schema_options.m4,
-                    # 'M5': schema_options.m5,
-                },
-                'G': {
-                    # 'M6': schema_options.m6,
-                },
-                'S': {
-                    # 'M7': schema_options.m7,
-                },
-            }
-        # case tribal?
-    return None
+    return SCHEMA_REGISTRY.get(program_type, None)
+
+
+def get_section_schemas(section, schema_options):
+    """Return the schema for each record type of a section."""
+    return schema_options.get(section, NO_SCHEMAS)
 
 
-def get_schema(line, section, schema_options):
-    """Return the appropriate schema for the line."""
-    line_type = line[0:2]
-    return schema_options.get(section, {}).get(line_type, None)
+def get_schema(line, schemas):
+    """Return the appropriate schema for the line, from its section's schemas."""
+    return schemas.get(line[0:2], None)
@@ -0,0 +1,127 @@
+"""Live parse progress, published to redis so it can be polled without querying the database."""
+
+import functools
+import logging
+import time
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# the counters each parse task adds to as it goes
+PROGRESS_COUNTERS = ('lines', 'records', 'errors', 'bytes')
+
+
+@functools.lru_cache(maxsize=None)
+def get_redis():
+    """Return a client for the redis server that parse progress is published to."""
+    return redis.Redis.from_url(settings.REDIS_URI, socket_timeout=5, decode_responses=True)
+
+
+def progress_key(datafile_id):
+    """Return the redis key of the hash holding a datafile's parse progress."""
+    return f'parse_progress:{datafile_id}'
+
+
+def publish(datafile_id, counters=None, **fields):
+    """Add to a datafile's progress counters and set its other fields, in a single round trip.
+
+    Fields that are None are left unset. Progress is informational, so a failure to reach redis is
+    logged rather than failing the parse.
+    """
+    key = progress_key(datafile_id)
+    pipeline = get_redis().pipeline(transaction=False)
+
+    for name, amount in (counters or {}).items():
+        if amount:
+            pipeline.hincrby(key, name, amount)
+    fields = {name: value for name, value in fields.items() if value is not None}
+    pipeline.hset(key, mapping={**fields, 'updated_at': time.time()})
+    pipeline.expire(key, settings.PARSER_PROGRESS_TTL)
+
+    try:
+        pipeline.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not publish parse progress for DataFile {datafile_id}: {e}")
+
+
+def start_progress(datafile, total_lines, total_bytes, num_errors=0):
+    """Reset a datafile's progress as its parse starts, counting any errors found in its structure."""
+    key = progress_key(datafile.id)
+    try:
+        get_redis().delete(key)
+    except redis.RedisError as e:
+        logger.warning(f"Could not reset parse progress for DataFile {datafile.id}: {e}")
+
+    publish(
+        datafile.id,
+        {'errors': num_errors},
+        status='parsing',
+        total_lines=total_lines,
+        total_bytes=total_bytes,
+        started_at=time.time(),
+    )
+
+
+def finish_progress(datafile_id, num_errors, status='complete'):
+    """Mark a datafile's parse as complete, or rejected, with its final number of errors."""
+    publish(datafile_id, status=status, errors=num_errors)
+
+
+def get_progress(datafile_id):
+    """Return a datafile's parse progress, or None if none has been published or redis can't be reached.
+
+    The rate is None if it isn't known when the parse started, as when its progress expired part way
+    through and was published again from then on.
+    """
+    try:
+        progress = get_redis().hgetall(progress_key(datafile_id))
+    except redis.RedisError as e:
+        logger.warning(f"Could not read parse progress for DataFile {datafile_id}: {e}")
+        return None
+
+    if not progress:
+        return None
+
+    progress = {
+        name: value if name == 'status' else float(value) if '.' in value else int(value)
+        for name, value in progress.items()
+    }
+    for name in PROGRESS_COUNTERS:
+        progress.setdefault(name, 0)
+
+    if 'started_at' in progress:
+        elapsed = progress['updated_at'] - progress['started_at']
+        progress['lines_per_second'] = round(progress['lines'] / elapsed) if elapsed > 0 else 0
+    else:
+        progress['lines_per_second'] = None
+
+    return progress
+
+
+class ParseProgress:
+    """Publishes the progress of one parse task every `every` lines, as the increase since it last published.
+
+    Counters are added to rather than set, so the chunks of a file parsed in parallel can publish to the
+    same hash.
+    """
+
+    def __init__(self, datafile_id, every=None):
+        self.datafile_id = datafile_id
+        self.every = every or settings.PARSER_PROGRESS_LINES
+        self.published = dict.fromkeys(PROGRESS_COUNTERS, 0)
+
+    def update(self, lines, bytes_read, record_writer, error_writer, force=False):
+        """Publish the lines and bytes read and records and errors found so far, if `every` lines have passed."""
+        if not force and lines - self.published['lines'] < self.every:
+            return
+
+        counts = {
+            'lines': lines,
+            'records': record_writer.num_created + record_writer.num_unsaved,
+            'errors': error_writer.num_created + len(error_writer.unsaved_errors),
+            'bytes': bytes_read,
+        }
+        publish(self.datafile_id, {name: counts[name] - self.published[name] for name in PROGRESS_COUNTERS})
+        self.published = counts
@@ -0,0 +1,90 @@
+"""Local, memory-mapped copies of datafiles for the parser to read instead of reading from S3."""
+
+import io
+import logging
+import mmap
+import shutil
+import tempfile
+from boto3.s3.transfer import TransferConfig
+from contextlib import contextmanager, nullcontext
+from django.conf import settings
+from tdpservice.backends import DataFilesS3Storage
+
+logger = logging.getLogger(__name__)
+
+# the size of the blocks copied to the spool from anything but a multipart download
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def get_s3_object(fieldfile):
+    """Return the boto3 object of a file saved in S3 storage, or None if it isn't."""
+    storage = fieldfile.storage
+    if not isinstance(storage, DataFilesS3Storage):
+        return None
+    return storage.get_saved_object(fieldfile)
+
+
+def copy_range(source, spool, start, end):
+    """Copy the bytes of a file object from `start` up to `end`, or its end, to the same position in the spool."""
+    source.seek(start)
+    spool.seek(start)
+    remaining = None if end is None else end - start
+
+    while remaining is None or remaining > 0:
+        block = source.read(COPY_BUFFER_SIZE if remaining is None else min(COPY_BUFFER_SIZE, remaining))
+        if not block:
+            break
+        spool.write(block)
+        if remaining is not None:
+            remaining -= len(block)
+
+
+def download(fieldfile, spool, start=0, end=None):
+    """Copy the bytes of a datafile's file from `start` up to `end`, or its end, to the same position in the spool.
+
+    A whole file in S3 is fetched with a managed, multipart download and a range of it with one ranged
+    GET. Files that haven't been saved to storage yet are copied as they are.
+    """
+    s3_object = get_s3_object(fieldfile)
+
+    if s3_object is None:
+        # a file that is already open belongs to whoever opened it, so only one opened here is closed
+        with fieldfile.open('rb') if fieldfile.closed else nullcontext(fieldfile) as source:
+            copy_range(source, spool, start, end)
+    elif start == 0 and end is None:
+        s3_object.download_fileobj(spool, Config=TransferConfig(
+            multipart_chunksize=settings.PARSER_SPOOL_MULTIPART_CHUNK_SIZE,
+            max_concurrency=settings.PARSER_SPOOL_MAX_CONCURRENCY,
+        ))
+    elif end is None or end > start:
+        byte_range = f'bytes={start}-{"" if end is None else end - 1}'
+        spool.seek(start)
+        shutil.copyfileobj(s3_object.get(Range=byte_range)['Body'], spool, COPY_BUFFER_SIZE)
+
+
+@contextmanager
+def spool_datafile(datafile, start=0, end=None):
+    """Download a datafile's file to local scratch space once and map it into memory, for parsing.
+
+    Yields a read only `mmap` of the file, which can be sought, read and read by line like the file
+    itself. Only the bytes from `start` up to `end` are downloaded when given, at the same offsets they
+    have in the file, so that the offsets of its lines are unchanged. The spool is deleted on exit.
+    """
+    with tempfile.TemporaryFile(prefix='datafile_', dir=settings.PARSER_SPOOL_DIR) as spool:
+        download(datafile.file, spool, start, end)
+        spool.flush()
+        size = spool.seek(0, io.SEEK_END)
+        logger.debug(f"Spooled bytes {start} to {size} of DataFile {datafile.id}.")
+
+        # an empty file can't be mapped
+        if not size:
+            yield io.BytesIO()
+            return
+
+        with mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+
+
+def open_datafile(datafile, rawfile=None, start=0, end=None):
+    """Return a context manager for an already spooled `rawfile`, or for spooling the datafile if none is given."""
+    return nullcontext(rawfile) if rawfile is not None else spool_datafile(datafile, start, end)
@@ -0,0 +1,92 @@
+"""Bounded summaries of the parser errors found in a datafile."""
+
+from django.conf import settings
+
+
+class ErrorSummary:
+    """Exact counts of parser errors per record type, field and error type, keeping only the first few as samples.
+
+    The errors themselves are saved as they're found, so a summary stays the same size however many
+    errors a file has.
+    """
+
+    def __init__(self, max_samples=None):
+        self.max_samples = settings.PARSER_ERROR_SUMMARY_SAMPLES if max_samples is None else max_samples
+        self.buckets = {}
+        self.num_errors = 0
+
+    def add(self, error, record_type=''):
+        """Count a `ParserError` found on a line of the record type, keeping it as a sample if its bucket has room."""
+        key = (record_type, error.field_name, error.error_type)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = {'count': 0, 'samples': []}
+
+        bucket['count'] += 1
+        self.num_errors += 1
+        if len(bucket['samples']) < self.max_samples:
+            bucket['samples'].append({'row_number': error.row_number, 'error_message': error.error_message})
+
+    def add_all(self, errors, record_type=''):
+        """Count each of the `ParserError`s found on a line of the record type."""
+        for error in errors:
+            self.add(error, record_type)
+
+    def merge(self, summary):
+        """Add the counts and samples of another summary, or of a summary's `as_dict()`, to this one.
+
+        Samples are kept in line order, so merging the summaries of a file's chunks in any order keeps
+        the first errors of each bucket.
+        """
+        if isinstance(summary, ErrorSummary):
+            summary = summary.as_dict()
+
+        for other in summary.get('buckets', []):
+            key = (other['record_type'], other['field_name'], other['error_type'])
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = {'count': 0, 'samples': []}
+
+            bucket['count'] += other['count']
+            samples = sorted(bucket['samples'] + other['samples'], key=lambda sample: sample['row_number'])
+            bucket['samples'] = samples[:self.max_samples]
+
+        self.num_errors += summary.get('num_errors', 0)
+        return self
+
+    def as_dict(self):
+        """Return the summary as JSON serializable data, with the largest buckets first."""
+        return {
+            'num_errors': self.num_errors,
+            'buckets': [
+                {
+                    'record_type': record_type,
+                    'field_name': field_name,
+                    'error_type': error_type,
+                    **bucket,
+                }
+                for (record_type, field_name, error_type), bucket in sorted(
+                    self.buckets.items(), key=lambda item: -item[1]['count']
+                )
+            ],
+        }
+
+    def describe(self, max_buckets=10):
+        """Return a one line description of the largest buckets, for logging."""
+        buckets = self.as_dict()['buckets']
+        described = [
+            f"{bucket['count']} x {' '.join(filter(None, [bucket['record_type'], bucket['field_name']])) or 'file'}"
+            f" ({bucket['error_type']})"
+            for bucket in buckets[:max_buckets]
+        ]
+        if len(buckets) > max_buckets:
+            described.append(f"{len(buckets) - max_buckets} more kinds")
+
+        return f"{self.num_errors} errors: {', '.join(described)}" if described else "no errors"
+
+
+def summarize(errors, record_type=''):
+    """Return a summary of the `ParserError`s as a dict."""
+    summary = ErrorSummary()
+    summary.add_all(errors, record_type)
+    return summary.as_dict()
@@ -0,0 +1,62 @@
+"""Tests for the parsing errors API."""
+
+import csv
+import io
+import pytest
+import zipfile
+from rest_framework import status
+from .factories import ParserErrorFactory
+
+
+@pytest.fixture
+def parser_errors():
+    """Create errors for two rows of one file, and another file's error."""
+    first = ParserErrorFactory.create(row_number=3, error_message='third row error')
+    ParserErrorFactory.create(file=first.file, row_number=2, error_message='second row error')
+    ParserErrorFactory.create(row_number=1, error_message='other file error')
+    return first.file
+
+
+@pytest.fixture
+def api_client(api_client, ofa_admin):
+    """Provide an API client that is logged in as an approved OFA admin."""
+    api_client.login(username=ofa_admin.username, password='test_password')
+    return api_client
+
+
+@pytest.mark.django_db
+def test_list_parsing_errors_is_paginated(api_client, parser_errors):
+    """Test that the JSON listing is paginated rather than returning every error at once."""
+    response = api_client.get(f'/v1/parsing/parsing_errors/?file={parser_errors.id}')
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['count'] == 2
+    assert [e['error_message'] for e in response.data['results']] == ['second row error', 'third row error']
+
+
+@pytest.mark.django_db
+def test_export_parsing_errors_csv(api_client, parser_errors):
+    """Test that errors for a file are streamed as csv, in file order."""
+    response = api_client.get(f'/v1/parsing/parsing_errors/export/?file={parser_errors.id}&export_format=csv')
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.streaming
+    rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    assert rows[0][3] == 'error_message'
+    assert [row[3] for row in rows[1:]] == ['second row error', 'third row error']
+
+
+@pytest.mark.django_db
+def test_export_parsing_errors_xlsx(api_client, parser_errors):
+    """Test that errors for a file are exported as an xlsx report, in file order."""
+    response = api_client.get(f'/v1/parsing/parsing_errors/export/?file={parser_errors.id}')
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Content-Disposition'] == 'attachment; filename="parsing_errors.xlsx"'
+
+    workbook = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+    worksheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+
+    assert worksheet.index('second row error') < worksheet.index('third row error')
+    assert 'other file error' not in worksheet
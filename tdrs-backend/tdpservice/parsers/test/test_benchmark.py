@@ -0,0 +1,74 @@
+"""Test the synthetic datafiles and stage timing used to benchmark the parser."""
+
+import io
+import pytest
+from django.core.files import File
+from .. import benchmark
+from ..models import ParserErrorCategoryChoices
+from tdpservice.data_files.models import DataFile
+from tdpservice.search_indexes.models.tanf import TANF_T1, TANF_T2, TANF_T3
+from tdpservice.search_indexes.models.ssp import SSP_M1, SSP_M2, SSP_M3
+
+
+def create_benchmark_datafile(stt_user, stt, program_type, num_lines, error_rate=0.0):
+    """Create a DataFile for a synthetic file, without uploading it to storage."""
+    rawfile = io.BytesIO()
+    benchmark.write_datafile(rawfile, program_type, num_lines, error_rate)
+
+    datafile = DataFile.create_new_version({
+        'quarter': '4',
+        'year': 2020,
+        'section': 'Active Case Data' if program_type == 'TAN' else 'SSP Active Case Data',
+        'user': stt_user,
+        'stt': stt
+    })
+    datafile.file = File(rawfile, name='benchmark.txt')
+    return datafile
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('program_type,models', [
+    ('TAN', (TANF_T1, TANF_T2, TANF_T3)),
+    ('SSP', (SSP_M1, SSP_M2, SSP_M3)),
+])
+def test_generated_datafile_parses_without_errors(stt_user, stt, program_type, models):
+    """Test that a generated file with no error rate is entirely valid."""
+    datafile = create_benchmark_datafile(stt_user, stt, program_type, 30)
+
+    num_errors, seconds = benchmark.time_parse(datafile)
+
+    assert num_errors == 0
+    assert [model.objects.count() for model in models] == [10, 10, 20]
+
+
+@pytest.mark.django_db
+def test_generated_datafile_error_rate(stt_user, stt):
+    """Test that a generated file has about `error_rate` of its lines fail validation.
+
+    The cases of T1 lines that fail are also missing their family record.
+    """
+    datafile = create_benchmark_datafile(stt_user, stt, 'TAN', 300, error_rate=0.1)
+
+    num_errors, seconds = benchmark.time_parse(datafile)
+    num_case_errors = datafile.parser_errors.filter(category=ParserErrorCategoryChoices.VALUE_CONSISTENCY).count()
+
+    assert 15 < num_errors - num_case_errors < 45
+    assert datafile.parser_errors.count() == num_errors
+
+
+@pytest.mark.django_db
+def test_stage_timer_times_each_stage(stt_user, stt):
+    """Test that an instrumented parse records time against each stage, and removes its instrumentation."""
+    datafile = create_benchmark_datafile(stt_user, stt, 'TAN', 30)
+    timer = benchmark.StageTimer()
+
+    benchmark.time_parse(datafile, timer)
+
+    assert timer.calls['schema lookup'] == 30
+    assert timer.calls['parse_line'] == 42
+    assert timer.calls['chunk planning'] == 1
+    assert set(timer.totals) == {
+        'chunk planning', 'header/trailer validation', 'schema lookup', 'parse_line', 'validators', 'persistence',
+        'case consistency',
+    }
+    assert not hasattr(benchmark.util.RowSchema.parse_line, '__wrapped__')
@@ -0,0 +1,134 @@
+"""Test the error budgets that stop parsing broken files early."""
+
+import pytest
+from tdpservice.search_indexes.models.tanf import TANF_T1, TANF_T2, TANF_T3
+from .. import parse
+from ..budget import ErrorBudget, ErrorBudgetExceeded, SharedErrorCount, clear_shared_errors
+from ..models import ParseCheckpoint, ParserError
+from .test_benchmark import create_benchmark_datafile
+
+
+def test_budget_max_errors():
+    """Test that the budget is exceeded once there are more errors than the maximum, counting earlier ones."""
+    budget = ErrorBudget(num_errors=3, max_errors=5, max_rate=0)
+    budget.check(10, 2)
+
+    with pytest.raises(ErrorBudgetExceeded) as e:
+        budget.check(11, 3)
+
+    assert e.value.line_number == 11
+    assert str(e.value) == 'Parsing stopped after 6 errors, more than the limit of 5.'
+
+
+def test_budget_max_rate_over_window():
+    """Test that the rate is only measured once a full window of lines has been seen."""
+    budget = ErrorBudget(max_errors=0, max_rate=0.5, window_lines=4)
+
+    # a bad start is forgiven once the window moves past it
+    for line_number, num_errors in [(2, 1), (3, 2), (4, 2), (5, 2), (6, 2), (7, 2), (8, 2)]:
+        budget.check(line_number, num_errors)
+
+    with pytest.raises(ErrorBudgetExceeded) as e:
+        for line_number, num_errors in [(9, 3), (10, 4), (11, 5)]:
+            budget.check(line_number, num_errors)
+
+    assert e.value.line_number == 11
+    assert 'over lines 8 to 11' in str(e.value)
+
+
+def test_budget_without_limits():
+    """Test that a budget with no limits is never exceeded."""
+    budget = ErrorBudget(max_errors=0, max_rate=0)
+    for line_number in range(1, 100):
+        budget.check(line_number, line_number * 2)
+
+
+@pytest.fixture
+def budget_settings(settings):
+    """Parse in small checkpoints and batches, with a small error budget."""
+    settings.PARSER_CHECKPOINT_LINES = 20
+    settings.PARSER_VALIDATION_BATCH_LINES = 5
+    settings.PARSER_ERROR_BUDGET_MAX_ERRORS = 20
+    return settings
+
+
+@pytest.mark.django_db
+def test_parse_rejects_file_over_budget(stt_user, stt, budget_settings):
+    """Test that parsing stops once the budget is exceeded, keeping the errors but none of the records."""
+    datafile = create_benchmark_datafile(stt_user, stt, 'TAN', 300, error_rate=0.5)
+
+    num_errors = parse.parse_datafile_resumable(datafile)
+
+    checkpoint = ParseCheckpoint.objects.get(file=datafile)
+    assert checkpoint.status == ParseCheckpoint.Status.REJECTED
+    assert num_errors == checkpoint.num_errors == ParserError.objects.filter(file=datafile).count()
+    assert num_errors < 150
+
+    last_error = ParserError.objects.filter(file=datafile).order_by('row_number', 'id').last()
+    assert last_error.error_message.startswith('Parsing stopped after')
+    assert last_error.error_message.endswith('errors, more than the limit of 20.')
+    assert last_error.row_number < 300
+
+    for model in (TANF_T1, TANF_T2, TANF_T3):
+        assert not model.objects.filter(datafile=datafile).exists()
+
+
+@pytest.mark.django_db
+def test_parse_within_budget(stt_user, stt, budget_settings):
+    """Test that a file with fewer errors than its budget is parsed to the end."""
+    budget_settings.PARSER_ERROR_BUDGET_MAX_RATE = 0.5
+    datafile = create_benchmark_datafile(stt_user, stt, 'TAN', 300, error_rate=0.02)
+
+    parse.parse_datafile_resumable(datafile)
+
+    assert ParseCheckpoint.objects.get(file=datafile).status == ParseCheckpoint.Status.COMPLETE
+    assert TANF_T1.objects.filter(datafile=datafile).exists()
+
+
+@pytest.mark.django_db
+def test_parse_stops_at_the_line_over_budget(stt_user, stt, budget_settings):
+    """Test that errors are checked against the budget line by line, not once a batch of lines is validated."""
+    budget_settings.PARSER_VALIDATION_BATCH_LINES = 1000
+    datafile = create_benchmark_datafile(stt_user, stt, 'TAN', 300, error_rate=0.5)
+
+    parse.parse_datafile_resumable(datafile)
+
+    errors = ParserError.objects.filter(file=datafile).order_by('row_number', 'id')
+    stop_line = errors.last().row_number
+    line_errors = errors.exclude(error_message__startswith='Parsing stopped after')
+    assert line_errors.filter(row_number__lt=stop_line).count() <= 20
+    assert line_errors.filter(row_number__lte=stop_line).count() > 20
+
+
+def test_shared_error_count(settings):
+    """Test that chunks share their error counts, each overwriting its own, and sync every `every` lines."""
+    clear_shared_errors(0)
+    first = SharedErrorCount(0, 2, every=10)
+    second = SharedErrorCount(0, 12, every=10)
+
+    assert first.get_others(2, 3) == 0
+    assert second.get_others(12, 4) == 3
+    # a redelivered chunk replaces its count
+    assert SharedErrorCount(0, 2).get_others(2, 1) == 4
+    # between syncs the last known count is used
+    assert second.get_others(15, 5) == 3
+    assert second.get_others(22, 5) == 1
+
+
+@pytest.mark.django_db
+def test_parse_chunk_counts_other_chunks_errors(stt_user, stt, budget_settings):
+    """Test that a chunk stops once the errors of the file's other chunks exceed the file's budget."""
+    datafile = create_benchmark_datafile(stt_user, stt, 'TAN', 30)
+    structure, chunks = parse.plan_datafile_chunks(datafile, 10)
+    ParseCheckpoint.objects.create(file=datafile)
+    clear_shared_errors(datafile.id)
+    SharedErrorCount(datafile.id, chunks[0][1]).get_others(chunks[0][1], 21)
+
+    with pytest.raises(ErrorBudgetExceeded) as e:
+        parse.parse_datafile_chunk(
+            datafile, structure.program_type, structure.section, *chunks[1],
+            shared_errors=SharedErrorCount(datafile.id, chunks[1][1]),
+        )
+
+    assert e.value.line_number == chunks[1][1]
+    assert str(e.value) == 'Parsing stopped after 21 errors, more than the limit of 20.'
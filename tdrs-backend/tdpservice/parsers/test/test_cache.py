@@ -0,0 +1,131 @@
+"""Test reusing the parse of a byte-identical datafile."""
+
+import pytest
+from tdpservice.search_indexes.models.tanf import TANF_T1, TANF_T2, TANF_T3
+from tdpservice.security.models import ClamAVFileScan
+from .. import parse
+from ..cache import find_prior_parse, reuse_prior_parse
+from ..models import ParseCheckpoint, ParserError
+from .factories import ParserErrorFactory
+from .test_parse import create_test_datafile, get_parser_errors
+
+
+def scan(datafile, shasum):
+    """Record a clean scan of the datafile's contents with the given checksum."""
+    ClamAVFileScan.objects.create(
+        file_name=datafile.original_filename or 'test.txt',
+        file_size=datafile.file.size,
+        file_shasum=shasum,
+        result=ClamAVFileScan.Result.CLEAN,
+        uploaded_by=datafile.user,
+        data_file=datafile,
+    )
+
+
+def create_scanned_datafile(filename, stt_user, stt, shasum):
+    """Create a datafile from a test file along with a clean scan of it."""
+    datafile = create_test_datafile(filename, stt_user, stt)
+    scan(datafile, shasum)
+    return datafile
+
+
+@pytest.fixture
+def parsed_datafile(stt_user, stt):
+    """Return a parsed small_tanf_section1 datafile, with an error found on one of its T1 records."""
+    datafile = create_scanned_datafile('small_tanf_section1.txt', stt_user, stt, 'abc')
+    parse.parse_datafile_resumable(datafile)
+    ParserErrorFactory.create(
+        file=datafile,
+        row_number=2,
+        error_message='T1 error',
+        content_object=TANF_T1.objects.filter(datafile=datafile).first(),
+    )
+    return datafile
+
+
+@pytest.mark.django_db
+def test_reuse_relinks_records_of_earlier_version(parsed_datafile, stt_user, stt):
+    """Test that a resubmitted identical file takes over the records of its earlier version."""
+    num_records = TANF_T1.objects.filter(datafile=parsed_datafile).count()
+    resubmitted = create_scanned_datafile('small_tanf_section1.txt', stt_user, stt, 'abc')
+
+    assert find_prior_parse(resubmitted) == parsed_datafile
+    num_errors = reuse_prior_parse(resubmitted)
+
+    assert num_errors == ParserError.objects.filter(file=parsed_datafile).count()
+    assert get_parser_errors(resubmitted) == get_parser_errors(parsed_datafile)
+    assert TANF_T1.objects.filter(datafile=resubmitted).count() == num_records
+    assert not TANF_T1.objects.filter(datafile=parsed_datafile).exists()
+
+    for error in ParserError.objects.filter(file=resubmitted, content_type__isnull=False):
+        assert error.content_object.datafile == resubmitted
+
+    checkpoint = ParseCheckpoint.objects.get(file=resubmitted)
+    assert checkpoint.status == ParseCheckpoint.Status.COMPLETE
+    assert checkpoint.num_errors == num_errors
+
+
+@pytest.mark.django_db
+def test_reuse_clones_records_of_other_submissions(parsed_datafile, stt_user, stt):
+    """Test that an identical file for another submission gets its own copies of the records."""
+    other = create_scanned_datafile('small_tanf_section1.txt', stt_user, stt, 'abc')
+    other.year = 2023
+    other.save()
+
+    reuse_prior_parse(other)
+
+    for model in (TANF_T1, TANF_T2, TANF_T3):
+        originals = model.objects.filter(datafile=parsed_datafile).order_by('pk')
+        copies = model.objects.filter(datafile=other).order_by('pk')
+        assert [r.CASE_NUMBER for r in copies] == [r.CASE_NUMBER for r in originals]
+
+    assert get_parser_errors(other) == get_parser_errors(parsed_datafile)
+    for error in ParserError.objects.filter(file=other, content_type__isnull=False):
+        assert error.content_object.datafile == other
+
+
+@pytest.mark.django_db
+def test_reuse_by_checksum_saved_at_upload(stt_user, stt):
+    """Test that the checksum saved with a datafile finds its prior parse without a scan of either file."""
+    prior = create_test_datafile('small_tanf_section1.txt', stt_user, stt)
+    prior.file_shasum = 'abc'
+    prior.save()
+    parse.parse_datafile_resumable(prior)
+
+    resubmitted = create_test_datafile('small_tanf_section1.txt', stt_user, stt)
+    resubmitted.file_shasum = 'abc'
+    resubmitted.save()
+
+    assert not resubmitted.av_scans.exists()
+    assert find_prior_parse(resubmitted) == prior
+    assert reuse_prior_parse(resubmitted) == ParserError.objects.filter(file=prior).count()
+    assert TANF_T1.objects.filter(datafile=resubmitted).exists()
+
+
+@pytest.mark.django_db
+def test_reuse_of_scanned_prior_by_saved_checksum(parsed_datafile, stt_user, stt):
+    """Test that a datafile with a saved checksum reuses an older parse known only by its scan."""
+    resubmitted = create_test_datafile('small_tanf_section1.txt', stt_user, stt)
+    resubmitted.file_shasum = 'abc'
+    resubmitted.save()
+
+    assert find_prior_parse(resubmitted) == parsed_datafile
+
+
+@pytest.mark.django_db
+def test_no_reuse_of_different_contents(parsed_datafile, stt_user, stt):
+    """Test that a file with a different checksum, or none at all, is parsed."""
+    different = create_scanned_datafile('small_tanf_section1.txt', stt_user, stt, 'def')
+    assert reuse_prior_parse(different) is None
+
+    unscanned = create_test_datafile('small_tanf_section1.txt', stt_user, stt)
+    assert reuse_prior_parse(unscanned) is None
+
+
+@pytest.mark.django_db
+def test_no_reuse_of_superseded_version(parsed_datafile, stt_user, stt):
+    """Test that a version whose records have been replaced by a later version isn't reused."""
+    create_scanned_datafile('small_correct_file', stt_user, stt, 'def')
+    resubmitted = create_scanned_datafile('small_tanf_section1.txt', stt_user, stt, 'abc')
+
+    assert find_prior_parse(resubmitted) is None
@@ -0,0 +1,159 @@
+"""Test the cross-record check that every case's records have a family record."""
+
+import io
+import pytest
+from django.core.files import File
+from tdpservice.data_files.models import DataFile
+from tdpservice.search_indexes.models.tanf import TANF_T1, TANF_T2
+from .. import benchmark, parse
+from ..case_consistency import CaseIndex
+from ..models import ParseCheckpoint, ParserError, ParserErrorCategoryChoices
+
+CASE_RECORDS = [
+    ('T2', 202010, '1', 2),
+    ('T1', 202010, '1', 3),
+    ('T1', 202010, '2', 4),
+    ('T3', 202010, '2', 5),
+    ('T2', 202011, '2', 6),
+    ('M2', 202010, '1', 7),
+    ('T5', 202010, '3', 8),
+    ('T3', 202010, '3', 9),
+]
+
+
+@pytest.mark.parametrize('max_keys', [100, 2])
+def test_case_index_unmatched(settings, max_keys):
+    """Test that records are matched to family records before or after them, in memory or spilled to disk."""
+    settings.PARSER_BULK_CREATE_BATCH_SIZE = 2
+    case_index = CaseIndex(max_keys)
+    for record in CASE_RECORDS:
+        case_index.add(*record)
+
+    assert (case_index.db is not None) == (max_keys == 2)
+    assert list(case_index.get_unmatched()) == [
+        (6, 'T2', 202011, '2'),
+        (7, 'M2', 202010, '1'),
+        (9, 'T3', 202010, '3'),
+    ]
+
+    db_dir = case_index.db_dir
+    case_index.close()
+    assert case_index.db is None
+    if db_dir is not None:
+        with pytest.raises(FileNotFoundError):
+            open(f'{db_dir.name}/case_index.sqlite3')
+
+
+def create_datafile(stt_user, stt, lines):
+    """Create a DataFile for an Active Case Data file with the given body lines."""
+    rawfile = io.BytesIO()
+    rawfile.write(f'{benchmark.generate_header("TAN")}\n'.encode())
+    rawfile.writelines(f'{line}\n'.encode() for line in lines)
+    rawfile.write(f'{benchmark.generate_trailer(len(lines))}\n'.encode())
+
+    datafile = DataFile.create_new_version({
+        'quarter': '4',
+        'year': 2020,
+        'section': 'Active Case Data',
+        'user': stt_user,
+        'stt': stt
+    })
+    datafile.file = File(rawfile, name='cases.txt')
+    return datafile
+
+
+@pytest.fixture
+def missing_t1_datafile(stt_user, stt):
+    """Return a datafile of 30 cases whose second case has no T1 record, and whose last T1 comes after its T2."""
+    lines = list(benchmark.generate_datafile_lines('TAN', 90))[1:-1]
+    del lines[3]
+    lines[-3], lines[-2] = lines[-2], lines[-3]
+    return create_datafile(stt_user, stt, lines)
+
+
+def get_case_errors(datafile):
+    """Return the row, case and message of the datafile's case consistency errors."""
+    return list(ParserError.objects.filter(
+        file=datafile, category=ParserErrorCategoryChoices.VALUE_CONSISTENCY,
+    ).order_by('row_number', 'id').values_list('row_number', 'case_number', 'error_message'))
+
+
+EXPECTED_CASE_ERRORS = [
+    (5, '00000000001', 'T2 record has no T1 record for RPT_MONTH_YEAR 202010 and CASE_NUMBER 00000000001.'),
+    (6, '00000000001', 'T3 record has no T1 record for RPT_MONTH_YEAR 202010 and CASE_NUMBER 00000000001.'),
+]
+
+
+@pytest.mark.django_db
+def test_parse_datafile_case_errors(missing_t1_datafile):
+    """Test that a parse reports the records of cases with no T1 record."""
+    num_errors = parse.parse_datafile_resumable(missing_t1_datafile)
+
+    assert num_errors == 2
+    assert get_case_errors(missing_t1_datafile) == EXPECTED_CASE_ERRORS
+
+
+@pytest.mark.django_db
+def test_parse_resumable_case_errors_across_checkpoints(missing_t1_datafile, settings):
+    """Test that cases are checked across checkpoints and spilled to disk, once the last chunk is committed."""
+    settings.PARSER_CASE_INDEX_MAX_KEYS = 10
+    num_errors = parse.parse_datafile_resumable(missing_t1_datafile, 4)
+
+    checkpoint = ParseCheckpoint.objects.get(file=missing_t1_datafile)
+    assert checkpoint.status == ParseCheckpoint.Status.COMPLETE
+    assert num_errors == checkpoint.num_errors == 2
+    assert checkpoint.error_summary['buckets'][0]['error_type'] == 'Value consistency'
+    assert get_case_errors(missing_t1_datafile) == EXPECTED_CASE_ERRORS
+
+
+@pytest.mark.django_db
+def test_parse_resumed_reports_records_of_earlier_chunks(missing_t1_datafile, mocker):
+    """Test that a resumed parse reports the records of chunks committed before the restart."""
+    parse_datafile_chunk = parse.parse_datafile_chunk
+
+    def interrupt_second_chunk(datafile, program_type, section, offset, first_line_number, *args, **kwargs):
+        if first_line_number == 6:
+            raise ConnectionError('worker lost')
+        return parse_datafile_chunk(datafile, program_type, section, offset, first_line_number, *args, **kwargs)
+
+    mocker.patch.object(parse, 'parse_datafile_chunk', interrupt_second_chunk)
+    with pytest.raises(ConnectionError):
+        parse.parse_datafile_resumable(missing_t1_datafile, 4)
+    assert ParseCheckpoint.objects.get(file=missing_t1_datafile).line_number == 5
+
+    mocker.stopall()
+    num_errors = parse.parse_datafile_resumable(missing_t1_datafile, 4)
+
+    assert num_errors == ParseCheckpoint.objects.get(file=missing_t1_datafile).num_errors == 2
+    assert get_case_errors(missing_t1_datafile) == EXPECTED_CASE_ERRORS
+
+
+@pytest.mark.django_db
+def test_check_saved_cases(missing_t1_datafile):
+    """Test that the cases of records already saved are checked, reporting each on the line it was parsed from."""
+    parse.parse_datafile_resumable(missing_t1_datafile)
+    ParserError.objects.all().delete()
+    TANF_T1.objects.filter(CASE_NUMBER='00000000002').delete()
+
+    assert parse.check_saved_cases(missing_t1_datafile) == 4
+    assert get_case_errors(missing_t1_datafile) == EXPECTED_CASE_ERRORS + [
+        (8, '00000000002', 'T2 record has no T1 record for RPT_MONTH_YEAR 202010 and CASE_NUMBER 00000000002.'),
+        (9, '00000000002', 'T3 record has no T1 record for RPT_MONTH_YEAR 202010 and CASE_NUMBER 00000000002.'),
+    ]
+
+
+@pytest.mark.django_db
+def test_check_saved_cases_reports_each_orphan_record(missing_t1_datafile):
+    """Test that saved records of the same case and type are each reported, on their line if it was saved."""
+    parse.parse_datafile_resumable(missing_t1_datafile)
+    ParserError.objects.all().delete()
+    t2 = TANF_T2.objects.filter(datafile=missing_t1_datafile, CASE_NUMBER='00000000001').get()
+    for line_number in (99, None, None):
+        TANF_T2.objects.create(**{
+            **{field.attname: getattr(t2, field.attname) for field in TANF_T2._meta.concrete_fields},
+            'id': None,
+            'line_number': line_number,
+        })
+
+    assert parse.check_saved_cases(missing_t1_datafile) == 5
+    assert [row for row, case_number, error_message in get_case_errors(missing_t1_datafile)] == [0, 0, 5, 6, 99]
@@ -3,7 +3,8 @@
 
 import pytest
 from pathlib import Path
-from .. import parse
+from .. import parse, schema_defs
+from ..models import ParseCheckpoint, ParserError
 from tdpservice.data_files.models import DataFile
 from tdpservice.search_indexes.models.tanf import TANF_T1, TANF_T2, TANF_T3
 from tdpservice.search_indexes.models.ssp import SSP_M1, SSP_M2, SSP_M3
@@ -26,6 +27,12 @@ def create_test_datafile(filename, stt_user, stt, section='Active Case Data'):
     return datafile
 
 
+def get_parser_errors(datafile):
+    """Return the (row number, error message) of each error saved for the datafile, in file order."""
+    errors = ParserError.objects.filter(file=datafile).order_by('row_number', 'id')
+    return list(errors.values_list('row_number', 'error_message'))
+
+
 @pytest.fixture
 def test_datafile(stt_user, stt):
     """Fixture for small_correct_file."""
@@ -35,13 +42,15 @@ def test_datafile(stt_user, stt):
 @pytest.mark.django_db
 def test_parse_small_correct_file(test_datafile):
     """Test parsing of small_correct_file."""
-    errors = parse.parse_datafile(test_datafile)
+    num_errors = parse.parse_datafile_resumable(test_datafile)
 
-    assert errors == {}
+    assert num_errors == 0
+    assert get_parser_errors(test_datafile) == []
     assert TANF_T1.objects.count() == 1
 
     # spot check
     t1 = TANF_T1.objects.all().first()
+    assert t1.datafile == test_datafile
     assert t1.RPT_MONTH_YEAR == 202010
     assert t1.CASE_NUMBER == '11111111112'
     assert t1.COUNTY_FIPS_CODE == '230'
@@ -59,10 +68,11 @@ def test_parse_section_mismatch(test_datafile):
     """Test parsing of small_correct_file where the DataFile section doesn't match the rawfile section."""
     test_datafile.section = 'Closed Case Data'
     test_datafile.save()
-    errors = parse.parse_datafile(test_datafile)
-    assert errors == {
-        'document': ['Section does not match.']
-    }
+    num_errors = parse.parse_datafile_resumable(test_datafile)
+    assert num_errors == 1
+    assert get_parser_errors(test_datafile) == [
+        (1, 'Section does not match.'),
+    ]
 
 
 @pytest.mark.django_db
@@ -70,10 +80,11 @@ def test_parse_wrong_program_type(test_datafile):
     """Test parsing of small_correct_file where the DataFile program type doesn't match the rawfile."""
     test_datafile.section = 'SSP Active Case Data'
     test_datafile.save()
-    errors = parse.parse_datafile(test_datafile)
-    assert errors == {
-        'document': ['Section does not match.']
-    }
+    num_errors = parse.parse_datafile_resumable(test_datafile)
+    assert num_errors == 1
+    assert get_parser_errors(test_datafile) == [
+        (1, 'Section does not match.'),
+    ]
 
 
 @pytest.fixture
@@ -88,14 +99,27 @@ def test_parse_big_file(test_big_file):
     expected_t1_record_count = 815
     expected_t2_record_count = 882
     expected_t3_record_count = 1376
-    errors = parse.parse_datafile(test_big_file)
+    num_errors = parse.parse_datafile_resumable(test_big_file)
 
-    assert errors == {}
+    assert num_errors == 0
+    assert ParserError.objects.count() == 0
     assert TANF_T1.objects.count() == expected_t1_record_count
     assert TANF_T2.objects.count() == expected_t2_record_count
     assert TANF_T3.objects.count() == expected_t3_record_count
 
 
+@pytest.mark.django_db
+def test_parse_big_file_copy_writer(test_big_file, settings):
+    """Test that copying records into their tables saves the same records as inserting them."""
+    settings.PARSER_RECORD_WRITER = 'copy'
+    num_errors = parse.parse_datafile_resumable(test_big_file)
+
+    assert num_errors == 0
+    assert TANF_T1.objects.filter(datafile=test_big_file).count() == 815
+    assert TANF_T2.objects.filter(datafile=test_big_file).count() == 882
+    assert TANF_T3.objects.filter(datafile=test_big_file).count() == 1376
+
+
 @pytest.fixture
 def bad_test_file(stt_user, stt):
     """Fixture for bad_TANF_S2."""
@@ -105,10 +129,11 @@ def bad_test_file(stt_user, stt):
 @pytest.mark.django_db
 def test_parse_bad_test_file(bad_test_file):
     """Test parsing of bad_TANF_S2."""
-    errors = parse.parse_datafile(bad_test_file)
-    assert errors == {
-        'header': ['Value length 24 does not match 23.'],
-    }
+    num_errors = parse.parse_datafile_resumable(bad_test_file)
+    assert num_errors == 1
+    assert get_parser_errors(bad_test_file) == [
+        (1, 'Value length 24 does not match 23.'),
+    ]
 
 
 @pytest.fixture
@@ -120,10 +145,11 @@ def bad_file_missing_header(stt_user, stt):
 @pytest.mark.django_db
 def test_parse_bad_file_missing_header(bad_file_missing_header):
     """Test parsing of bad_missing_header."""
-    errors = parse.parse_datafile(bad_file_missing_header)
-    assert errors == {
-        'document': ['No headers found.'],
-    }
+    num_errors = parse.parse_datafile_resumable(bad_file_missing_header)
+    assert num_errors == 1
+    assert get_parser_errors(bad_file_missing_header) == [
+        (1, 'No headers found.'),
+    ]
 
 
 @pytest.fixture
@@ -135,10 +161,15 @@ def bad_file_multiple_headers(stt_user, stt):
 @pytest.mark.django_db
 def test_parse_bad_file_multiple_headers(bad_file_multiple_headers):
     """Test parsing of bad_two_headers."""
-    errors = parse.parse_datafile(bad_file_multiple_headers)
-    assert errors == {
-        'document': ['Multiple headers found.'],
-    }
+    num_errors = parse.parse_datafile_resumable(bad_file_multiple_headers)
+    assert num_errors == 1
+    assert get_parser_errors(bad_file_multiple_headers) == [
+        (9, 'Multiple headers found.'),
+    ]
+
+    # no records are saved from a file whose structure is invalid
+    assert TANF_T1.objects.count() == 0
+    assert TANF_T2.objects.count() == 0
 
 
 @pytest.fixture
@@ -150,10 +181,11 @@ def big_bad_test_file(stt_user, stt):
 @pytest.mark.django_db
 def test_parse_big_bad_test_file(big_bad_test_file):
     """Test parsing of bad_TANF_S1."""
-    errors = parse.parse_datafile(big_bad_test_file)
-    assert errors == {
-        'document': ['Multiple trailers found.'],
-    }
+    num_errors = parse.parse_datafile_resumable(big_bad_test_file)
+    assert num_errors == 1
+    assert get_parser_errors(big_bad_test_file) == [
+        (7204, 'Multiple trailers found.'),
+    ]
 
 
 @pytest.fixture
@@ -165,11 +197,12 @@ def bad_trailer_file(stt_user, stt):
 @pytest.mark.django_db
 def test_parse_bad_trailer_file(bad_trailer_file):
     """Test parsing bad_trailer_1."""
-    errors = parse.parse_datafile(bad_trailer_file)
-    assert errors == {
-        'trailer': ['Value length 11 does not match 23.'],
-        2: ['Value length 7 does not match 156.'],
-    }
+    num_errors = parse.parse_datafile_resumable(bad_trailer_file)
+    assert num_errors == 2
+    assert get_parser_errors(bad_trailer_file) == [
+        (2, 'Value length 7 does not match 156.'),
+        (3, 'Value length 11 does not match 23.'),
+    ]
 
 
 @pytest.fixture
@@ -181,15 +214,31 @@ def bad_trailer_file_2(stt_user, stt):
 @pytest.mark.django_db
 def test_parse_bad_trailer_file2(bad_trailer_file_2):
     """Test parsing bad_trailer_2."""
-    errors = parse.parse_datafile(bad_trailer_file_2)
-    assert errors == {
-        'trailer': [
-            'Value length 7 does not match 23.',
-            'T1trash does not start with TRAILER.'
-        ],
-        2: ['Value length 117 does not match 156.'],
-        3: ['Value length 7 does not match 156.']
-    }
+    num_errors = parse.parse_datafile_resumable(bad_trailer_file_2)
+    assert num_errors == 4
+    # the trailer is validated with the file's structure, before its line is parsed as a record
+    assert get_parser_errors(bad_trailer_file_2) == [
+        (2, 'Value length 117 does not match 156.'),
+        (3, 'Value length 7 does not match 23.'),
+        (3, 'T1trash does not start with TRAILER.'),
+        (3, 'Value length 7 does not match 156.'),
+    ]
+
+
+@pytest.mark.django_db
+def test_parse_bad_trailer_file2_line_by_line(bad_trailer_file_2, settings):
+    """Test that validating bad_trailer_2 line by line gives the same errors as validating in batches."""
+    settings.PARSER_VALIDATION_BATCH_LINES = 1
+    num_errors = parse.parse_datafile_resumable(bad_trailer_file_2)
+
+    assert num_errors == 4
+    # the trailer is validated with the file's structure, before its line is parsed as a record
+    assert get_parser_errors(bad_trailer_file_2) == [
+        (2, 'Value length 117 does not match 156.'),
+        (3, 'Value length 7 does not match 23.'),
+        (3, 'T1trash does not start with TRAILER.'),
+        (3, 'Value length 7 does not match 156.'),
+    ]
 
 
 @pytest.fixture
@@ -201,10 +250,11 @@ def empty_file(stt_user, stt):
 @pytest.mark.django_db
 def test_parse_empty_file(empty_file):
     """Test parsing of empty_file."""
-    errors = parse.parse_datafile(empty_file)
-    assert errors == {
-        'document': ['No headers found.'],
-    }
+    num_errors = parse.parse_datafile_resumable(empty_file)
+    assert num_errors == 1
+    assert get_parser_errors(empty_file) == [
+        (0, 'No headers found.'),
+    ]
 
 
 @pytest.fixture
@@ -220,11 +270,12 @@ def test_parse_small_ssp_section1_datafile(small_ssp_section1_datafile):
     expected_m2_record_count = 6
     expected_m3_record_count = 8
 
-    errors = parse.parse_datafile(small_ssp_section1_datafile)
+    num_errors = parse.parse_datafile_resumable(small_ssp_section1_datafile)
 
-    assert errors == {
-        'trailer': ['Value length 15 does not match 23.']
-    }
+    assert num_errors == 1
+    assert get_parser_errors(small_ssp_section1_datafile) == [
+        (20, 'Value length 15 does not match 23.'),
+    ]
     assert SSP_M1.objects.count() == expected_m1_record_count
     assert SSP_M2.objects.count() == expected_m2_record_count
     assert SSP_M3.objects.count() == expected_m3_record_count
@@ -243,16 +294,17 @@ def test_parse_ssp_section1_datafile(ssp_section1_datafile):
     expected_m2_record_count = 9373
     expected_m3_record_count = 16764
 
-    errors = parse.parse_datafile(ssp_section1_datafile)
-
-    assert errors == {
-        'trailer': ['Value length 14 does not match 23.'],
-        12430: ['Value length 30 does not match 150.'],
-        15573: ['Value length 30 does not match 150.'],
-        15615: ['Value length 30 does not match 150.'],
-        16004: ['Value length 30 does not match 150.'],
-        19681: ['Value length 30 does not match 150.']
-    }
+    num_errors = parse.parse_datafile_resumable(ssp_section1_datafile)
+
+    assert num_errors == 6
+    assert get_parser_errors(ssp_section1_datafile)[:-1] == [
+        (12430, 'Value length 30 does not match 150.'),
+        (15573, 'Value length 30 does not match 150.'),
+        (15615, 'Value length 30 does not match 150.'),
+        (16004, 'Value length 30 does not match 150.'),
+        (19681, 'Value length 30 does not match 150.'),
+    ]
+    assert get_parser_errors(ssp_section1_datafile)[-1][1] == 'Value length 14 does not match 23.'
     assert SSP_M1.objects.count() == expected_m1_record_count
     assert SSP_M2.objects.count() == expected_m2_record_count
     assert SSP_M3.objects.count() == expected_m3_record_count
@@ -265,9 +317,9 @@ def small_tanf_section1_datafile(stt_user, stt):
 @pytest.mark.django_db
 def test_parse_tanf_section1_datafile(small_tanf_section1_datafile):
     """Test parsing of small_tanf_section1_datafile and validate T2 model data."""
-    errors = parse.parse_datafile(small_tanf_section1_datafile)
+    num_errors = parse.parse_datafile_resumable(small_tanf_section1_datafile)
 
-    assert errors == {}
+    assert num_errors == 0
     assert TANF_T2.objects.count() == 5
 
     t2_models = TANF_T2.objects.all()
@@ -287,9 +339,9 @@ def test_parse_tanf_section1_datafile(small_tanf_section1_datafile):
 @pytest.mark.django_db
 def test_parse_tanf_section1_datafile_obj_counts(small_tanf_section1_datafile):
     """Test parsing of small_tanf_section1_datafile in general."""
-    errors = parse.parse_datafile(small_tanf_section1_datafile)
+    num_errors = parse.parse_datafile_resumable(small_tanf_section1_datafile)
 
-    assert errors == {}
+    assert num_errors == 0
     assert TANF_T1.objects.count() == 5
     assert TANF_T2.objects.count() == 5
     assert TANF_T3.objects.count() == 6
@@ -297,9 +349,9 @@ def test_parse_tanf_section1_datafile_obj_counts(small_tanf_section1_datafile):
 @pytest.mark.django_db
 def test_parse_tanf_section1_datafile_t3s(small_tanf_section1_datafile):
     """Test parsing of small_tanf_section1_datafile and validate T3 model data."""
-    errors = parse.parse_datafile(small_tanf_section1_datafile)
+    num_errors = parse.parse_datafile_resumable(small_tanf_section1_datafile)
 
-    assert errors == {}
+    assert num_errors == 0
     assert TANF_T3.objects.count() == 6
 
     t3_models = TANF_T3.objects.all()
@@ -316,3 +368,162 @@ def test_parse_tanf_section1_datafile_t3s(small_tanf_section1_datafile):
     assert t3_6.FAMILY_AFFILIATION == 1
     assert t3_6.GENDER == 2
     assert t3_6.EDUCATION_LEVEL == '98'
+
+
+@pytest.mark.django_db
+def test_parse_big_file_in_chunks(test_big_file):
+    """Test that parsing ADS.E2J.FTP1.TS06 chunk by chunk produces the same records as parsing the whole file."""
+    structure, chunks = parse.plan_datafile_chunks(test_big_file, 500)
+
+    assert structure.get_errors() == []
+    assert structure.get_trailer_errors() == []
+    assert len(chunks) == 6
+    assert chunks[0][1] == 2
+    assert sum(num_lines for offset, first_line_number, num_lines, num_bytes in chunks) == 2644
+    assert chunks[-1][0] + chunks[-1][3] == test_big_file.file.size
+    for chunk, next_chunk in zip(chunks, chunks[1:]):
+        assert chunk[0] + chunk[3] == next_chunk[0]
+
+    num_errors = 0
+    for chunk in chunks:
+        num_errors += parse.parse_datafile_chunk(test_big_file, structure.program_type, structure.section, *chunk)
+
+    assert num_errors == 0
+    assert ParserError.objects.count() == 0
+    assert TANF_T1.objects.count() == 815
+    assert TANF_T2.objects.count() == 882
+    assert TANF_T3.objects.count() == 1376
+
+
+@pytest.mark.django_db
+def test_parse_chunk_reports_absolute_line_numbers(bad_trailer_file_2):
+    """Test that chunk errors are saved with their line number in the whole file."""
+    structure, chunks = parse.plan_datafile_chunks(bad_trailer_file_2, 1)
+
+    assert chunks == [(24, 2, 1, 118), (142, 3, 1, 7)]
+    assert [(e.row_number, e.error_message) for e in structure.get_trailer_errors()] == [
+        (3, 'Value length 7 does not match 23.'),
+        (3, 'T1trash does not start with TRAILER.'),
+    ]
+
+    num_errors = parse.parse_datafile_chunk(
+        bad_trailer_file_2, structure.program_type, structure.section, *chunks[1]
+    )
+    assert num_errors == 1
+    assert get_parser_errors(bad_trailer_file_2) == [(3, 'Value length 7 does not match 156.')]
+
+
+@pytest.mark.django_db
+def test_plan_chunks_stops_on_structure_errors(bad_file_multiple_headers):
+    """Test that planning reports document errors without producing chunks to parse."""
+    structure, chunks = parse.plan_datafile_chunks(bad_file_multiple_headers, 5)
+
+    assert [e.error_message for e in structure.get_errors()] == ['Multiple headers found.']
+
+
+def test_schema_registry_is_built_once_and_read_only():
+    """Test that schema options are shared, immutable, and looked up by str or bytes record type."""
+    schema_options = parse.get_schema_options('TAN')
+    schemas = parse.get_section_schemas('A', schema_options)
+
+    assert parse.get_schema_options('TAN') is schema_options
+    assert parse.get_schema('T1201', schemas) is schema_defs.tanf.t1
+    assert parse.get_schema(b'T3201', schemas) is schema_defs.tanf.t3
+    assert parse.get_schema('M1201', schemas) is None
+    assert parse.get_section_schemas('C', schema_options) == {}
+    assert parse.get_schema_options('TRIBAL') is None
+
+    with pytest.raises(TypeError):
+        schemas['T4'] = schema_defs.tanf.t1
+
+
+@pytest.mark.parametrize('rawline,line', [
+    (b'T1202010\r\n', b'T1202010'),
+    (b'T1202010', b'T1202010'),
+    ('T12020\u00e9\n'.encode(), 'T12020\u00e9'),
+])
+def test_read_line_keeps_ascii_lines_as_bytes(rawline, line):
+    """Test that ASCII lines are parsed as bytes, and lines with other characters fall back to str."""
+    assert parse.read_line(rawline) == line
+
+
+@pytest.mark.django_db
+def test_parse_resumable_checkpoints_each_transaction(test_big_file):
+    """Test that a resumable parse saves every record in the file, and completes its checkpoint."""
+    num_errors = parse.parse_datafile_resumable(test_big_file, 500)
+
+    assert num_errors == 0
+    assert TANF_T1.objects.count() == 815
+    assert TANF_T2.objects.count() == 882
+    assert TANF_T3.objects.count() == 1376
+
+    checkpoint = ParseCheckpoint.objects.get(file=test_big_file)
+    assert checkpoint.status == ParseCheckpoint.Status.COMPLETE
+    assert checkpoint.line_number == 2645
+    assert checkpoint.num_records == 815 + 882 + 1376
+    assert checkpoint.offset == test_big_file.file.size
+
+
+@pytest.mark.django_db
+def test_parse_resumable_resumes_from_checkpoint(test_big_file, mocker):
+    """Test that a parse interrupted part way through resumes after its last checkpoint without duplicates."""
+    parse_datafile_chunk = parse.parse_datafile_chunk
+
+    def interrupt_third_chunk(datafile, program_type, section, offset, first_line_number, *args, **kwargs):
+        if first_line_number == 1002:
+            raise ConnectionError('worker lost')
+        return parse_datafile_chunk(datafile, program_type, section, offset, first_line_number, *args, **kwargs)
+
+    mocker.patch.object(parse, 'parse_datafile_chunk', interrupt_third_chunk)
+    with pytest.raises(ConnectionError):
+        parse.parse_datafile_resumable(test_big_file, 500)
+
+    checkpoint = ParseCheckpoint.objects.get(file=test_big_file)
+    assert checkpoint.status == ParseCheckpoint.Status.PARSING
+    assert checkpoint.line_number == 1001
+    records_before_restart = TANF_T1.objects.count()
+
+    mocker.stopall()
+    num_errors = parse.parse_datafile_resumable(test_big_file, 500)
+
+    assert num_errors == 0
+    assert 0 < records_before_restart < 815
+    assert TANF_T1.objects.count() == 815
+    assert TANF_T2.objects.count() == 882
+    assert TANF_T3.objects.count() == 1376
+    assert ParseCheckpoint.objects.get(file=test_big_file).num_records == 815 + 882 + 1376
+
+
+@pytest.mark.django_db
+def test_parse_resumable_redelivered_while_running(test_big_file, mocker):
+    """Test that a parse redelivered while the first is still running doesn't save any chunk's records twice."""
+    parse_datafile_chunk = parse.parse_datafile_chunk
+    redelivered = []
+
+    def redeliver_after_second_chunk(datafile, program_type, section, offset, first_line_number, *args, **kwargs):
+        num_errors = parse_datafile_chunk(datafile, program_type, section, offset, first_line_number, *args, **kwargs)
+        if first_line_number == 502 and not redelivered:
+            redelivered.append(parse.parse_datafile_resumable(test_big_file, 500))
+        return num_errors
+
+    mocker.patch.object(parse, 'parse_datafile_chunk', redeliver_after_second_chunk)
+    num_errors = parse.parse_datafile_resumable(test_big_file, 500)
+
+    assert redelivered == [num_errors]
+    assert TANF_T1.objects.count() == 815
+    assert TANF_T2.objects.count() == 882
+    assert TANF_T3.objects.count() == 1376
+
+    checkpoint = ParseCheckpoint.objects.get(file=test_big_file)
+    assert checkpoint.status == ParseCheckpoint.Status.COMPLETE
+    assert checkpoint.num_records == 815 + 882 + 1376
+
+
+@pytest.mark.django_db
+def test_parse_resumable_saves_structure_errors_once(bad_file_multiple_headers):
+    """Test that structure errors are saved before any records, and not again when the parse is redelivered."""
+    assert parse.parse_datafile_resumable(bad_file_multiple_headers, 2) == 1
+    assert parse.parse_datafile_resumable(bad_file_multiple_headers, 2) == 1
+
+    assert get_parser_errors(bad_file_multiple_headers) == [(9, 'Multiple headers found.')]
+    assert TANF_T1.objects.count() == 0
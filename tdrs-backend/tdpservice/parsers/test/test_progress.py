@@ -0,0 +1,89 @@
+"""Test the live parse progress published to redis."""
+
+import pytest
+import redis
+from .. import parse
+from ..models import ParseCheckpoint
+from ..progress import ParseProgress, get_progress, get_redis, progress_key, publish, start_progress
+from ..writers import BulkRecordWriter, ParserErrorWriter
+from .test_parse import create_test_datafile
+
+
+@pytest.fixture
+def datafile(stt_user, stt):
+    """Return a datafile with no parse progress left over from an earlier test run."""
+    datafile = create_test_datafile('small_tanf_section1.txt', stt_user, stt)
+    get_redis().delete(progress_key(datafile.id))
+    return datafile
+
+
+@pytest.mark.django_db
+def test_progress_publishes_every_n_lines(datafile):
+    """Test that progress is only published once `every` lines have been read since it was last published."""
+    start_progress(datafile, total_lines=10, total_bytes=1000)
+    progress = ParseProgress(datafile.id, every=4)
+    record_writer = BulkRecordWriter()
+    error_writer = ParserErrorWriter(record_writer)
+
+    for line in range(1, 4):
+        progress.update(line, line * 100, record_writer, error_writer)
+    assert get_progress(datafile.id)['lines'] == 0
+
+    progress.update(4, 400, record_writer, error_writer)
+    assert get_progress(datafile.id)['lines'] == 4
+    assert get_progress(datafile.id)['bytes'] == 400
+
+    progress.update(5, 500, record_writer, error_writer, force=True)
+    assert get_progress(datafile.id)['lines'] == 5
+
+
+@pytest.mark.django_db
+def test_progress_adds_up_across_tasks(datafile):
+    """Test that chunks of a file parsed in parallel add to the same counters."""
+    start_progress(datafile, total_lines=20, total_bytes=2000, num_errors=1)
+    record_writer = BulkRecordWriter()
+    error_writer = ParserErrorWriter(record_writer)
+
+    for _ in range(2):
+        ParseProgress(datafile.id).update(10, 1000, record_writer, error_writer, force=True)
+
+    progress = get_progress(datafile.id)
+    assert progress['lines'] == 20
+    assert progress['bytes'] == 2000
+    assert progress['errors'] == 1
+    assert progress['status'] == 'parsing'
+
+
+@pytest.mark.django_db
+def test_parse_publishes_progress(datafile):
+    """Test that a resumable parse publishes its progress through to completion."""
+    num_errors = parse.parse_datafile_resumable(datafile)
+
+    progress = get_progress(datafile.id)
+    assert progress['status'] == 'complete'
+    assert progress['errors'] == num_errors
+    assert progress['records'] == ParseCheckpoint.objects.get(file=datafile).num_records
+    assert progress['lines'] == progress['total_lines']
+
+
+def test_publish_ignores_redis_errors(mocker):
+    """Test that progress that can't be published doesn't fail the parse."""
+    execute = mocker.patch('redis.client.Pipeline.execute', side_effect=redis.ConnectionError)
+    publish(1, {'lines': 1})
+    execute.assert_called_once()
+
+
+def test_get_progress_ignores_redis_errors(mocker):
+    """Test that progress that can't be read is reported as not found rather than failing the request."""
+    mocker.patch('redis.Redis.hgetall', side_effect=redis.ConnectionError)
+    assert get_progress(1) is None
+
+
+@pytest.mark.django_db
+def test_get_progress_published_again_after_expiring(datafile):
+    """Test that progress published after the hash expired is returned without a rate."""
+    publish(datafile.id, {'lines': 5, 'errors': 1})
+
+    progress = get_progress(datafile.id)
+    assert progress['lines'] == 5
+    assert progress['lines_per_second'] is None
@@ -0,0 +1,68 @@
+"""Test spooling datafiles to local, memory-mapped files for parsing."""
+
+import io
+import mmap
+import pytest
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from ..spool import spool_datafile
+from .test_parse import create_test_datafile
+
+
+@pytest.fixture
+def saved_datafile(stt_user, stt):
+    """Return a datafile saved to S3 storage."""
+    return create_test_datafile('small_correct_file', stt_user, stt)
+
+
+@pytest.mark.django_db
+def test_spool_whole_file(saved_datafile):
+    """Test that a whole file is downloaded once and read by line from the mapped spool."""
+    contents = saved_datafile.file.read()
+
+    with spool_datafile(saved_datafile) as rawfile:
+        assert isinstance(rawfile, mmap.mmap)
+        assert rawfile[:] == contents
+        assert list(iter(rawfile.readline, b'')) == contents.splitlines(keepends=True)
+
+    assert rawfile.closed
+
+
+@pytest.mark.django_db
+def test_spool_range_keeps_offsets(saved_datafile):
+    """Test that a range of a file is downloaded to the offsets it has in the file."""
+    contents = saved_datafile.file.read()
+    start, end = 24, 142
+
+    with spool_datafile(saved_datafile, start, end) as rawfile:
+        assert len(rawfile) == end
+        assert rawfile[start:end] == contents[start:end]
+
+        rawfile.seek(start)
+        assert rawfile.readline() == contents[start:end].splitlines(keepends=True)[0]
+
+
+@pytest.mark.django_db
+def test_spool_unsaved_and_empty_files(saved_datafile):
+    """Test that a file not yet saved to storage is copied as is, and that an empty file can be spooled."""
+    saved_datafile.file = File(io.BytesIO(b'HEADER\nTRAILER\n'), name='unsaved.txt')
+    with spool_datafile(saved_datafile, 7) as rawfile:
+        assert rawfile[:] == b'\0' * 7 + b'TRAILER\n'
+    assert not saved_datafile.file.closed
+
+    saved_datafile.file = File(io.BytesIO(b''), name='empty.txt')
+    with spool_datafile(saved_datafile) as rawfile:
+        assert rawfile.readline() == b''
+
+
+@pytest.mark.django_db
+def test_spool_closes_file_from_other_storage(saved_datafile, tmp_path):
+    """Test that a file saved to storage other than S3 is copied, and closed once it has been."""
+    storage = FileSystemStorage(location=tmp_path)
+    saved_datafile.file.name = storage.save('local.txt', ContentFile(b'HEADER\nTRAILER\n'))
+    saved_datafile.file.storage = storage
+
+    with spool_datafile(saved_datafile) as rawfile:
+        assert rawfile[:] == b'HEADER\nTRAILER\n'
+    assert saved_datafile.file.closed
@@ -0,0 +1,76 @@
+"""Test the bounded summaries of parser errors."""
+
+import pytest
+from .. import parse
+from ..models import ParseCheckpoint, ParserError
+from ..summary import ErrorSummary
+from .test_parse import create_test_datafile
+
+
+def make_error(row_number, field_name='CASE_NUMBER', error_type='Field value'):
+    """Return an unsaved parser error."""
+    return ParserError(
+        row_number=row_number,
+        field_name=field_name,
+        error_type=error_type,
+        error_message=f'row {row_number} error',
+    )
+
+
+def test_summary_counts_every_error_but_caps_samples():
+    """Test that each bucket counts all of its errors, but keeps only the first few."""
+    summary = ErrorSummary(max_samples=2)
+    for row_number in range(1, 6):
+        summary.add(make_error(row_number), 'T1')
+    summary.add(make_error(6, field_name='ZIP_CODE'), 'T1')
+    summary.add(make_error(7, field_name=''), 'T2')
+
+    result = summary.as_dict()
+
+    assert result['num_errors'] == 7
+    assert [(b['record_type'], b['field_name'], b['count']) for b in result['buckets']] == [
+        ('T1', 'CASE_NUMBER', 5),
+        ('T1', 'ZIP_CODE', 1),
+        ('T2', '', 1),
+    ]
+    assert result['buckets'][0]['samples'] == [
+        {'row_number': 1, 'error_message': 'row 1 error'},
+        {'row_number': 2, 'error_message': 'row 2 error'},
+    ]
+
+
+def test_summary_merge_keeps_first_samples():
+    """Test that merging chunk summaries in any order keeps the errors from the earliest lines."""
+    later = ErrorSummary(max_samples=2)
+    later.add_all([make_error(10), make_error(11)], 'T1')
+    earlier = ErrorSummary(max_samples=2)
+    earlier.add_all([make_error(1), make_error(2)], 'T1')
+
+    merged = ErrorSummary(max_samples=2).merge(later).merge(earlier.as_dict()).as_dict()
+
+    assert merged['num_errors'] == 4
+    assert merged['buckets'][0]['count'] == 4
+    assert [s['row_number'] for s in merged['buckets'][0]['samples']] == [1, 2]
+
+
+def test_summary_describe():
+    """Test that the description for logs names the largest buckets."""
+    summary = ErrorSummary()
+    assert summary.describe() == 'no errors'
+
+    summary.add_all([make_error(1), make_error(2)], 'T1')
+    summary.add(make_error(3, field_name='', error_type='Pre-check'))
+    assert summary.describe() == '3 errors: 2 x T1 CASE_NUMBER (Field value), 1 x file (Pre-check)'
+    assert summary.describe(max_buckets=1) == '3 errors: 2 x T1 CASE_NUMBER (Field value), 1 more kinds'
+
+
+@pytest.mark.django_db
+def test_parse_saves_error_summary(stt_user, stt):
+    """Test that a resumable parse saves a summary of the errors it finds on its checkpoint."""
+    datafile = create_test_datafile('bad_trailer_2.txt', stt_user, stt)
+    num_errors = parse.parse_datafile_resumable(datafile)
+
+    error_summary = ParseCheckpoint.objects.get(file=datafile).error_summary
+    assert error_summary['num_errors'] == num_errors
+    assert sum(bucket['count'] for bucket in error_summary['buckets']) == num_errors
+    assert {bucket['record_type'] for bucket in error_summary['buckets']} == {'T1', 'TRAILER'}
@@ -1,7 +1,8 @@
 """Test the methods of RowSchema to ensure parsing and validation work in all individual cases."""
 
 import pytest
-from ..util import MultiRecordRowSchema, RowSchema, Field, value_is_empty
+from .. import validators
+from ..util import MultiRecordRowSchema, RowSchema, Field, make_error_message, value_is_empty
 
 
 def passing_validator():
@@ -96,6 +97,61 @@ class TestModel:
     assert record.fifth == 1
 
 
+def test_parse_line_skips_empty_and_non_numeric_values():
+    """Test that parse_line leaves out blank, '#' filled, and non-numeric number fields."""
+    line = '   ##12ab'
+    schema = RowSchema(
+        model=dict,
+        fields=[
+            Field(name='blank', type='string', startIndex=0, endIndex=3),
+            Field(name='hashes', type='number', startIndex=3, endIndex=5),
+            Field(name='number', type='number', startIndex=5, endIndex=7),
+            Field(name='not_a_number', type='number', startIndex=7, endIndex=9),
+        ]
+    )
+
+    record = schema.parse_line(line)
+
+    assert record == {'number': 12}
+
+
+def test_parse_line_recompiles_when_fields_change():
+    """Test that the compiled extractor picks up fields added after the schema was first used."""
+    line = '12345'
+    schema = RowSchema(
+        model=dict,
+        fields=[
+            Field(name='first', type='string', startIndex=0, endIndex=2),
+        ]
+    )
+
+    assert schema.parse_line(line) == {'first': '12'}
+
+    schema.add_fields([('second', 3, 2, 5, 'number')])
+    assert schema.parse_line(line) == {'first': '12', 'second': 345}
+
+    schema.fields = [Field(name='third', type='string', startIndex=4, endIndex=5)]
+    assert schema.parse_line(line) == {'third': '5'}
+
+
+def test_parse_line_parses_bytes_like_str():
+    """Test that parse_line converts only the field slices of an ASCII bytes line, matching a str line."""
+    schema = RowSchema(
+        model=dict,
+        fields=[
+            Field(name='first', type='string', startIndex=0, endIndex=3),
+            Field(name='blank', type='string', startIndex=3, endIndex=5),
+            Field(name='hashes', type='number', startIndex=5, endIndex=7),
+            Field(name='number', type='number', startIndex=7, endIndex=9),
+        ]
+    )
+
+    record = schema.parse_line(b'abc  ##12')
+
+    assert record == {'first': 'abc', 'number': 12}
+    assert record == schema.parse_line('abc  ##12')
+
+
 def test_run_field_validators_returns_valid_with_dict():
     """Test that run_field_validators can validate all fields against parsed data dict."""
     instance = {
@@ -414,3 +470,170 @@ def test_multi_record_schema_parses_and_validates():
     assert r3_record == {'fourth': '5'}
     assert r3_is_valid is False
     assert r3_errors == ['Value is not valid.']
+
+
+def test_parse_and_validate_batch_matches_parse_and_validate():
+    """Test that validating a batch of lines column-wise gives the same results as validating each line."""
+    lines = ['12345', '1234', '   45', '12x45', '123  ']
+    schema = RowSchema(
+        model=dict,
+        preparsing_validators=[
+            validators.hasLength(5),
+        ],
+        postparsing_validators=[
+            lambda record: (False, 'No second.') if 'second' not in record else (True, None),
+        ],
+        fields=[
+            Field(name='first', type='string', startIndex=0, endIndex=3, required=True, validators=[
+                validators.matches('123'),
+                validators.startsWith('1'),
+            ]),
+            Field(name='second', type='number', startIndex=3, endIndex=5, required=True, validators=[
+                validators.between(0, 50),
+            ]),
+        ]
+    )
+
+    assert schema.parse_and_validate_batch(lines, [make_error_message] * len(lines)) == [
+        schema.parse_and_validate(line) for line in lines
+    ]
+
+
+def test_multi_record_schema_parses_and_validates_batch():
+    """Test that MultiRecordRowSchema validates a batch of lines with each of its schemas."""
+    lines = ['12345', '1234']
+    schema = MultiRecordRowSchema(
+        schemas=[
+            RowSchema(
+                model=dict,
+                preparsing_validators=[validators.hasLength(5)],
+                fields=[Field(name='first', type='string', startIndex=0, endIndex=3)],
+            ),
+            RowSchema(
+                model=dict,
+                preparsing_validators=[validators.hasLength(5)],
+                fields=[Field(name='second', type='string', startIndex=3, endIndex=5)],
+                quiet_preparser_errors=True,
+            ),
+        ]
+    )
+
+    assert schema.parse_and_validate_batch(lines, [make_error_message] * len(lines)) == [
+        schema.parse_and_validate(line) for line in lines
+    ]
+
+
+def test_multi_record_schema_parses_common_fields_once(mocker):
+    """Test that the fields every schema shares are parsed once per line and set on each of its records."""
+    schema = MultiRecordRowSchema(
+        schemas=[
+            RowSchema(
+                model=dict,
+                fields=[
+                    Field(name='type', type='string', startIndex=0, endIndex=2),
+                    Field(name='case', type='number', startIndex=2, endIndex=4),
+                    Field(name='first', type='string', startIndex=4, endIndex=6),
+                ],
+            ),
+            RowSchema(
+                model=dict,
+                fields=[
+                    Field(name='type', type='string', startIndex=0, endIndex=2),
+                    Field(name='case', type='number', startIndex=2, endIndex=4),
+                    Field(name='second', type='string', startIndex=6, endIndex=8),
+                ],
+            ),
+        ]
+    )
+    assert [field.name for field in schema.common_fields] == ['type', 'case']
+
+    get_common_values = mocker.spy(schema, 'get_common_values')
+    records = [record for record, is_valid, errors in schema.parse_and_validate(b'T3123456')]
+
+    assert records == [
+        {'type': 'T3', 'case': 12, 'first': '34'},
+        {'type': 'T3', 'case': 12, 'second': '56'},
+    ]
+    assert get_common_values.call_count == 1
+
+
+@pytest.mark.parametrize('line_type', [str, bytes])
+def test_multi_record_schema_skips_blank_slots(line_type):
+    """Test that records whose optional slot of the line is blank are left out, with or without batching."""
+    schema = MultiRecordRowSchema(
+        schemas=[
+            RowSchema(
+                model=dict,
+                preparsing_validators=[validators.notEmpty(2, 4)],
+                fields=[
+                    Field(name='type', type='string', startIndex=0, endIndex=2),
+                    Field(name='first', type='string', startIndex=2, endIndex=4),
+                ],
+            ),
+            RowSchema(
+                model=dict,
+                quiet_preparser_errors=True,
+                preparsing_validators=[validators.notEmpty(4, 6)],
+                fields=[
+                    Field(name='type', type='string', startIndex=0, endIndex=2),
+                    Field(name='second', type='string', startIndex=4, endIndex=6),
+                ],
+            ),
+        ]
+    )
+    assert schema.optional_slots == [None, (4, 6)]
+
+    lines = [line if line_type is str else line.encode() for line in ['T31234', 'T312  ', 'T3  56']]
+    expected = [
+        [({'type': 'T3', 'first': '12'}, True, []), ({'type': 'T3', 'second': '34'}, True, [])],
+        [({'type': 'T3', 'first': '12'}, True, [])],
+        [
+            (None, False, ['T3  56 contains blanks between positions 2 and 4.']),
+            ({'type': 'T3', 'second': '56'}, True, []),
+        ],
+    ]
+
+    assert schema.parse_and_validate_batch(lines, [make_error_message] * len(lines)) == expected
+    if line_type is str:
+        assert [schema.parse_and_validate(line) for line in lines] == expected
+
+
+@pytest.mark.parametrize('non_ascii_first', [False, True])
+def test_multi_record_schema_batch_of_mixed_line_types(non_ascii_first):
+    """Test that a batch of ASCII bytes lines and decoded non-ASCII str lines parses each with its own extractor."""
+    schema = MultiRecordRowSchema(
+        schemas=[
+            RowSchema(
+                model=dict,
+                fields=[
+                    Field(name='type', type='string', startIndex=0, endIndex=2),
+                    Field(name='month', type='number', startIndex=2, endIndex=4),
+                    Field(name='first', type='string', startIndex=4, endIndex=6),
+                ],
+            ),
+            RowSchema(
+                model=dict,
+                fields=[
+                    Field(name='type', type='string', startIndex=0, endIndex=2),
+                    Field(name='month', type='number', startIndex=2, endIndex=4),
+                    Field(name='second', type='string', startIndex=6, endIndex=8),
+                ],
+            ),
+        ]
+    )
+    lines = [b'T3109834', 'T311ñ856']
+    expected = [
+        [
+            ({'type': 'T3', 'month': 10, 'first': '98'}, True, []),
+            ({'type': 'T3', 'month': 10, 'second': '34'}, True, []),
+        ],
+        [
+            ({'type': 'T3', 'month': 11, 'first': 'ñ8'}, True, []),
+            ({'type': 'T3', 'month': 11, 'second': '56'}, True, []),
+        ],
+    ]
+    if non_ascii_first:
+        lines.reverse()
+        expected.reverse()
+
+    assert schema.parse_and_validate_batch(lines, [make_error_message] * len(lines)) == expected
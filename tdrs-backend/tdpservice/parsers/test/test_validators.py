@@ -1,5 +1,6 @@
 """Tests for generic validator functions."""
 
+import pytest
 from .. import validators
 
 
@@ -201,3 +202,33 @@ def test_notEmpty_returns_invalid_substring():
 
     assert is_valid is False
     assert error == "111  333 contains blanks between positions 3 and 5."
+
+
+@pytest.mark.parametrize('validator,values,expected', [
+    (validators.matches('TEST'), ['TEST', 'test', 'TEST'], [(1, 'test does not match TEST.')]),
+    (validators.oneOf([17, 24]), [17, 36, 24], [(1, '36 is not in [17, 24].')]),
+    (validators.between(0, 10), [11, 5, '12'], [
+        (0, '11 is not between 0 and 10.'),
+        (2, '12 is not between 0 and 10.'),
+    ]),
+    (validators.hasLength(3), ['abc', 'ab'], [(1, 'Value length 2 does not match 3.')]),
+    (validators.contains('es'), ['test', 'tast'], [(1, 'tast does not contain es.')]),
+    (validators.startsWith('T'), ['Test', 'test'], [(1, 'test does not start with T.')]),
+    (validators.notEmpty(), ['  ', 'a '], [(0, '   contains blanks between positions 0 and 2.')]),
+    (lambda value: (value > 0, None if value > 0 else 'not positive'), [1, 0], [(1, 'not positive')]),
+])
+def test_validate_column_matches_validating_each_value(validator, values, expected):
+    """Test `validate_column` finds the same failures as running the validator against each value."""
+    assert validators.validate_column(validator, values) == expected
+    assert [(i, validator(value)[1]) for i, value in enumerate(values) if not validator(value)[0]] == expected
+
+
+@pytest.mark.parametrize('validator,values,expected', [
+    (validators.hasLength(3), [b'abc', b'ab'], [(1, 'Value length 2 does not match 3.')]),
+    (validators.startsWith('T'), [b'T1', b'M1'], [(1, 'M1 does not start with T.')]),
+    (validators.contains('1'), [b'T1', b'TT'], [(1, 'TT does not contain 1.')]),
+    (validators.notEmpty(1, 3), [b'T12', b'T  '], [(1, 'T   contains blanks between positions 1 and 3.')]),
+])
+def test_validate_column_of_bytes_lines(validator, values, expected):
+    """Test that preparsing validators accept raw bytes lines, and report errors for them as str."""
+    assert validators.validate_column(validator, values) == expected
@@ -0,0 +1,197 @@
+"""Test the buffered record writers used by the parser."""
+
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from ..models import ParserError
+from django_elasticsearch_dsl.registries import registry
+from ..writers import BulkRecordWriter, CopyRecordWriter, ParserErrorWriter, delete_records, get_record_writer
+from tdpservice.search_indexes.models.ssp import SSP_M1, SSP_M2
+from tdpservice.data_files.test.factories import DataFileFactory
+from .factories import ParserErrorFactory
+
+
+def make_m1(case_number):
+    """Return an unsaved M1 record."""
+    return SSP_M1(RecordType='M1', RPT_MONTH_YEAR=202010, CASE_NUMBER=case_number)
+
+
+def make_m2(case_number):
+    """Return an unsaved M2 record."""
+    return SSP_M2(RecordType='M2', RPT_MONTH_YEAR=202010, CASE_NUMBER=case_number)
+
+
+@pytest.mark.django_db
+def test_writer_buffers_until_flush():
+    """Test that records are only inserted when the writer is flushed."""
+    writer = BulkRecordWriter(batch_size=10)
+    writer.add(make_m1('1'))
+    writer.add(make_m2('1'))
+
+    assert SSP_M1.objects.count() == 0
+    assert writer.num_unsaved == 2
+
+    writer.flush()
+
+    assert SSP_M1.objects.count() == 1
+    assert SSP_M2.objects.count() == 1
+    assert writer.num_unsaved == 0
+    assert writer.num_created == 2
+
+
+@pytest.mark.django_db
+def test_writer_flushes_at_batch_size():
+    """Test that the writer flushes on its own once batch_size records are buffered."""
+    writer = BulkRecordWriter(batch_size=3)
+
+    for case_number in range(4):
+        writer.add(make_m1(str(case_number)))
+
+    assert SSP_M1.objects.count() == 3
+    assert writer.num_unsaved == 1
+
+    writer.flush()
+    assert SSP_M1.objects.count() == 4
+
+
+@pytest.mark.django_db
+def test_writer_flush_uses_one_insert_per_model(django_assert_num_queries):
+    """Test that a flush issues a single INSERT per model rather than one per record."""
+    writer = BulkRecordWriter(batch_size=1000)
+
+    for case_number in range(50):
+        writer.add(make_m1(str(case_number)))
+        writer.add(make_m2(str(case_number)))
+
+    # SAVEPOINT + INSERT M1 + INSERT M2 + RELEASE SAVEPOINT
+    with django_assert_num_queries(4):
+        writer.flush()
+
+    assert writer.num_created == 100
+
+
+@pytest.mark.django_db
+def test_error_writer_links_errors_to_saved_records():
+    """Test that errors are saved after, and refer to, the records they were found on."""
+    record_writer = BulkRecordWriter(batch_size=10)
+    error_writer = ParserErrorWriter(record_writer, batch_size=10)
+
+    m1 = make_m1('1')
+    record_writer.add(m1)
+    error_writer.add(ParserError(
+        row_number=2,
+        column_number=1,
+        item_number=1,
+        field_name='CASE_NUMBER',
+        error_message='Value is not valid.',
+        content_type=ContentType.objects.get_for_model(SSP_M1),
+    ), m1)
+    error_writer.add(ParserError(row_number=3, column_number=0, item_number=0, field_name=''))
+
+    error_writer.flush()
+
+    assert error_writer.num_created == 2
+    assert SSP_M1.objects.count() == 1
+
+    record_error, line_error = ParserError.objects.order_by('row_number')
+    assert record_error.content_object == SSP_M1.objects.get()
+    assert line_error.content_object is None
+
+
+@pytest.mark.django_db
+def test_copy_writer_inserts_records():
+    """Test that records copied into their tables read back the same, with their primary keys set."""
+    writer = CopyRecordWriter(batch_size=10)
+    m1 = SSP_M1(RecordType='M1', RPT_MONTH_YEAR=202010, CASE_NUMBER='tab\there\\', COUNTY_FIPS_CODE=None)
+    writer.add(m1)
+    writer.add(make_m2('1'))
+    writer.flush()
+
+    assert writer.num_created == 2
+    saved = SSP_M1.objects.get()
+    assert saved.pk == m1.pk
+    assert saved.CASE_NUMBER == 'tab\there\\'
+    assert saved.COUNTY_FIPS_CODE is None
+    assert SSP_M2.objects.get().CASE_NUMBER == '1'
+
+
+@pytest.mark.django_db
+def test_copy_writer_allocates_primary_keys_for_errors():
+    """Test that errors refer to the records they were found on when records are copied."""
+    record_writer = CopyRecordWriter(batch_size=10)
+    error_writer = ParserErrorWriter(record_writer, batch_size=10)
+
+    records = [make_m1(str(case_number)) for case_number in range(3)]
+    for record in records:
+        record_writer.add(record)
+        error_writer.add(ParserError(
+            row_number=1,
+            column_number=1,
+            item_number=1,
+            field_name='CASE_NUMBER',
+            content_type=ContentType.objects.get_for_model(SSP_M1),
+        ), record)
+    error_writer.flush()
+
+    errors = ParserError.objects.order_by('id')
+    assert [error.content_object.CASE_NUMBER for error in errors] == ['0', '1', '2']
+
+
+def test_get_record_writer(settings):
+    """Test that the configured kind of record writer is used."""
+    settings.PARSER_RECORD_WRITER = 'copy'
+    assert type(get_record_writer()) is CopyRecordWriter
+
+    settings.PARSER_RECORD_WRITER = 'orm'
+    assert type(get_record_writer()) is BulkRecordWriter
+
+
+@pytest.mark.django_db
+def test_delete_records_unindexes_and_keeps_errors(settings, mocker):
+    """Test that deleting a datafile's records removes their indexed documents, and unlinks but keeps their errors."""
+    settings.ELASTICSEARCH_DSL_AUTOSYNC = True
+    datafile, other = DataFileFactory.create(), DataFileFactory.create()
+    record = SSP_M1.objects.create(RecordType='M1', RPT_MONTH_YEAR=202010, CASE_NUMBER='1', datafile=datafile)
+    other_record = SSP_M1.objects.create(RecordType='M1', RPT_MONTH_YEAR=202010, CASE_NUMBER='2', datafile=other)
+    error = ParserErrorFactory.create(file=datafile, content_object=record)
+    other_error = ParserErrorFactory.create(file=other, content_object=other_record)
+
+    searches = {
+        document: mocker.patch.object(document, 'search')
+        for document in registry.get_documents([SSP_M1])
+    }
+    assert searches
+
+    assert delete_records([datafile.id]) == 1
+
+    assert list(SSP_M1.objects.values_list('CASE_NUMBER', flat=True)) == ['2']
+    error.refresh_from_db()
+    assert (error.content_type, error.object_id, error.content_object) == (None, None, None)
+    other_error.refresh_from_db()
+    assert other_error.content_object == other_record
+    for search in searches.values():
+        search.return_value.filter.assert_called_once_with('terms', datafile=[datafile.id])
+        search.return_value.filter.return_value.delete.assert_called_once_with()
+
+
+@pytest.mark.django_db
+def test_writer_indexes_records_once_committed(settings, mocker, django_capture_on_commit_callbacks):
+    """Test that flushed records are indexed when their transaction commits, and not if it's rolled back."""
+    settings.ELASTICSEARCH_DSL_AUTOSYNC = True
+    updates = [mocker.patch.object(document, 'update') for document in registry.get_documents([SSP_M1])]
+    writer = BulkRecordWriter(batch_size=10)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        with transaction.atomic():
+            writer.add(make_m1('1'))
+            writer.flush()
+            transaction.set_rollback(True)
+
+        writer.add(make_m1('2'))
+        writer.flush()
+        for update in updates:
+            update.assert_not_called()
+
+    for update in updates:
+        update.assert_called_once()
+        assert [record.CASE_NUMBER for record in update.call_args.args[0]] == ['2']
@@ -1,14 +1,104 @@
 """Utility file for functions shared between all parsers even preparser."""
 
+from functools import lru_cache
+from django.contrib.contenttypes.models import ContentType
+from .models import ParserError, ParserErrorCategoryChoices
+from .validators import validate_column
 
-def value_is_empty(value, length):
-    """Handle 'empty' values as field inputs."""
-    empty_values = [
+
+@lru_cache(maxsize=None)
+def get_empty_values(length, line_type=str):
+    """Return the values that represent an empty field of the given length, as str or bytes."""
+    values = (
         ' '*length,  # '     '
         '#'*length,  # '#####'
-    ]
+    )
+    return values if line_type is str else tuple(value.encode() for value in values)
+
+
+def value_is_empty(value, length):
+    """Handle 'empty' values as field inputs."""
+    return value is None or value in get_empty_values(length)
+
+
+def make_error_message(schema, error_category, error_message, record=None, field=None):
+    """Return only the error message, for validating without recording a `ParserError`."""
+    return error_message
+
+
+def generate_parser_error(datafile, line_number, schema, error_category, error_message, record=None, field=None):
+    """Build an unsaved `ParserError` for an error found on the given line of a datafile.
+
+    `content_type` is resolved from the record, but `object_id` is left for the caller to
+    fill in once the record has been saved.
+    """
+    is_model_record = record is not None and not isinstance(record, dict)
+    fields = schema.fields if schema is not None and field is not None else []
+
+    return ParserError(
+        file=datafile,
+        row_number=line_number,
+        column_number=field.startIndex + 1 if field is not None else 0,
+        item_number=fields.index(field) + 1 if field in fields else 0,
+        field_name=field.name if field is not None else '',
+        category=error_category,
+        error_type=ParserErrorCategoryChoices(error_category).label,
+        error_message=error_message,
+        case_number=get_record_value(record, 'CASE_NUMBER'),
+        rpt_month_year=get_record_value(record, 'RPT_MONTH_YEAR'),
+        content_type=ContentType.objects.get_for_model(record) if is_model_record else None,
+    )
+
+
+def make_generate_parser_error(datafile, line_number):
+    """Return a `generate_error` function that builds `ParserError`s for a line of the given datafile."""
+    def generate(schema, error_category, error_message, record=None, field=None):
+        return generate_parser_error(
+            datafile=datafile,
+            line_number=line_number,
+            schema=schema,
+            error_category=error_category,
+            error_message=error_message,
+            record=record,
+            field=field,
+        )
+
+    return generate
+
+
+def get_record_value(record, field_name):
+    """Return the value of a field from a parsed record, whether it's a model or dict."""
+    if record is None:
+        return None
+    if isinstance(record, dict):
+        return record.get(field_name, None)
+    return getattr(record, field_name, None)
+
+
+def parse_number(value):
+    """Convert a number field's value to an int, or None if it isn't numeric."""
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def decode_ascii(value):
+    """Convert a string field's value sliced from an ASCII bytes line to str."""
+    return value.decode('ascii')
+
 
-    return value is None or value in empty_values
+# the converters for each field type, for values sliced from str and from bytes lines
+FIELD_TYPE_CONVERTERS = {
+    str: {
+        'number': parse_number,
+        'string': None,
+    },
+    bytes: {
+        'number': parse_number,
+        'string': decode_ascii,
+    },
+}
 
 
 class Field:
@@ -39,14 +129,27 @@ def parse_value(self, line):
 
         match self.type:
             case 'number':
-                try:
-                    value = int(value)
-                    return value
-                except ValueError:
-                    return None
+                return parse_number(value)
             case 'string':
                 return value
 
+    def compile(self, line_type=str):
+        """Return a tuple of everything needed to extract this field's value from a str or bytes line.
+
+        Returns `None` for field types that cannot be parsed, mirroring `parse_value`.
+        """
+        converters = FIELD_TYPE_CONVERTERS[line_type]
+        if self.type not in converters:
+            return None
+
+        return (
+            self.name,
+            self.startIndex,
+            self.endIndex,
+            get_empty_values(self.endIndex-self.startIndex, line_type),
+            converters[self.type],
+        )
+
 
 class RowSchema:
     """Maps the schema for data lines."""
@@ -65,11 +168,40 @@ def __init__(
         self.fields = fields
         self.quiet_preparser_errors = quiet_preparser_errors
 
+    @property
+    def fields(self):
+        """Return the schema's fields."""
+        return self._fields
+
+    @fields.setter
+    def fields(self, fields):
+        """Set the schema's fields, discarding the compiled extractors."""
+        self._fields = fields
+        self._extractors = {}
+
+    def get_extractor(self, line_type=str, exclude=frozenset()):
+        """Return the fields compiled into extraction tuples for str or bytes lines, compiling them on first use.
+
+        Slice offsets, empty value sentinels and type converters are resolved once per schema
+        rather than once per field per line. Fields named in `exclude` are left out.
+        """
+        extractor = self._extractors.get((line_type, exclude))
+        if extractor is None:
+            compiled = (field.compile(line_type) for field in self._fields if field.name not in exclude)
+            extractor = self._extractors[(line_type, exclude)] = tuple(c for c in compiled if c is not None)
+        return extractor
+
+    @property
+    def extractor(self):
+        """Return the fields compiled into extraction tuples for str lines."""
+        return self.get_extractor(str)
+
     def _add_field(self, name, length, start, end, type):
         """Add a field to the schema."""
         self.fields.append(
             Field(name, type, start, end)
         )
+        self._extractors = {}
 
     def add_fields(self, fields: list):
         """Add multiple fields to the schema."""
@@ -80,12 +212,16 @@ def get_all_fields(self):
         """Get all fields from the schema."""
         return self.fields
 
-    def parse_and_validate(self, line):
-        """Run all validation steps in order, and parse the given line into a record."""
+    def parse_and_validate(self, line, generate_error=make_error_message, common_values=(), extractor=None):
+        """Run all validation steps in order, and parse the given line into a record.
+
+        Errors are built by `generate_error`, which defaults to returning the bare error message.
+        `common_values` and `extractor` are passed on to `parse_line`.
+        """
         errors = []
 
         # run preparsing validators
-        preparsing_is_valid, preparsing_errors = self.run_preparsing_validators(line)
+        preparsing_is_valid, preparsing_errors = self.run_preparsing_validators(line, generate_error)
 
         if not preparsing_is_valid:
             if self.quiet_preparser_errors:
@@ -93,20 +229,130 @@ def parse_and_validate(self, line):
             return None, False, preparsing_errors
 
         # parse line to model
-        record = self.parse_line(line)
+        record = self.parse_line(line, common_values, extractor)
 
         # run field validators
-        fields_are_valid, field_errors = self.run_field_validators(record)
+        fields_are_valid, field_errors = self.run_field_validators(record, generate_error)
 
         # run postparsing validators
-        postparsing_is_valid, postparsing_errors = self.run_postparsing_validators(record)
+        postparsing_is_valid, postparsing_errors = self.run_postparsing_validators(record, generate_error)
 
         is_valid = fields_are_valid and postparsing_is_valid
         errors = field_errors + postparsing_errors
 
         return record, is_valid, errors
 
-    def run_preparsing_validators(self, line):
+    def parse_and_validate_batch(self, lines, generate_errors, common_values=None, exclude=frozenset()):
+        """Parse and validate a batch of lines, running each validator over a column of values at once.
+
+        `generate_errors` holds the `generate_error` function for each line, and `common_values` the
+        values already parsed from each line, if any, whose fields are named in `exclude`. Lines of a
+        batch may be a mix of str and bytes. Returns the same (record, is_valid, errors) for each line
+        as `parse_and_validate` would.
+        """
+        results = [None] * len(lines)
+        records = []
+        record_positions = []
+
+        # run preparsing validators
+        preparsing_results = self.run_preparsing_validators_batch(lines, generate_errors)
+
+        for i, (preparsing_is_valid, preparsing_errors) in enumerate(preparsing_results):
+            if not preparsing_is_valid:
+                results[i] = (None, True, []) if self.quiet_preparser_errors else (None, False, preparsing_errors)
+                continue
+
+            # parse line to model
+            line = lines[i]
+            records.append(self.parse_line(
+                line, common_values[i] if common_values else (), self.get_extractor(type(line), exclude)
+            ))
+            record_positions.append(i)
+
+        record_generate_errors = [generate_errors[i] for i in record_positions]
+
+        # run field validators
+        field_results = self.run_field_validators_batch(records, record_generate_errors)
+
+        # run postparsing validators
+        postparsing_results = self.run_postparsing_validators_batch(records, record_generate_errors)
+
+        for i, record, (fields_are_valid, field_errors), (postparsing_is_valid, postparsing_errors) in zip(
+            record_positions, records, field_results, postparsing_results
+        ):
+            results[i] = (record, fields_are_valid and postparsing_is_valid, field_errors + postparsing_errors)
+
+        return results
+
+    def run_preparsing_validators_batch(self, lines, generate_errors):
+        """Run each `preparsing_validator` over a column of un-parsed lines, returning (is_valid, errors) per line."""
+        results = [[True, []] for _ in lines]
+
+        for validator in self.preparsing_validators:
+            for i, validator_error in validate_column(validator, lines):
+                results[i][0] = False
+                if validator_error:
+                    results[i][1].append(generate_errors[i](
+                        schema=self,
+                        error_category=ParserErrorCategoryChoices.PRE_CHECK,
+                        error_message=validator_error,
+                    ))
+
+        return results
+
+    def run_field_validators_batch(self, instances, generate_errors):
+        """Run the validators for each field over the column of its values, returning (is_valid, errors) per record.
+
+        Fields without validators are skipped entirely, and emptiness is checked once per value rather than
+        once per validator.
+        """
+        results = [[True, []] for _ in instances]
+
+        for field in self.fields:
+            if not field.validators or not field.required:
+                continue
+
+            length = field.endIndex - field.startIndex
+            column = [get_record_value(instance, field.name) for instance in instances]
+            present = [i for i, value in enumerate(column) if not value_is_empty(value, length)]
+            missing = [i for i, value in enumerate(column) if value_is_empty(value, length)]
+            values = [column[i] for i in present]
+
+            for validator in field.validators:
+                failures = [(present[j], error) for j, error in validate_column(validator, values)]
+                failures += [(i, f"{field.name} is required but a value was not provided.") for i in missing]
+
+                for i, validator_error in failures:
+                    results[i][0] = False
+                    if validator_error:
+                        results[i][1].append(generate_errors[i](
+                            schema=self,
+                            error_category=ParserErrorCategoryChoices.FIELD_VALUE,
+                            error_message=validator_error,
+                            record=instances[i],
+                            field=field,
+                        ))
+
+        return results
+
+    def run_postparsing_validators_batch(self, instances, generate_errors):
+        """Run each `postparsing_validator` over a column of parsed records, returning (is_valid, errors) per record."""
+        results = [[True, []] for _ in instances]
+
+        for validator in self.postparsing_validators:
+            for i, validator_error in validate_column(validator, instances):
+                results[i][0] = False
+                if validator_error:
+                    results[i][1].append(generate_errors[i](
+                        schema=self,
+                        error_category=ParserErrorCategoryChoices.VALUE_CONSISTENCY,
+                        error_message=validator_error,
+                        record=instances[i],
+                    ))
+
+        return results
+
+    def run_preparsing_validators(self, line, generate_error=make_error_message):
         """Run each of the `preparsing_validator` functions in the schema against the un-parsed line."""
         is_valid = True
         errors = []
@@ -115,26 +361,49 @@ def run_preparsing_validators(self, line):
             validator_is_valid, validator_error = validator(line)
             is_valid = False if not validator_is_valid else is_valid
             if validator_error:
-                errors.append(validator_error)
+                errors.append(generate_error(
+                    schema=self,
+                    error_category=ParserErrorCategoryChoices.PRE_CHECK,
+                    error_message=validator_error,
+                ))
 
         return is_valid, errors
 
-    def parse_line(self, line):
-        """Create a model for the line based on the schema."""
+    def parse_line(self, line, common_values=(), extractor=None):
+        """Create a model for the line based on the schema.
+
+        Lines may be str, or ASCII bytes whose field slices are converted directly without decoding the line.
+        `common_values` are (name, value) pairs already parsed from the line, in which case `extractor`
+        is the schema's extractor without their fields.
+        """
         record = self.model()
+        is_dict = isinstance(record, dict)
 
-        for field in self.fields:
-            value = field.parse_value(line)
+        for name, value in common_values:
+            if is_dict:
+                record[name] = value
+            else:
+                setattr(record, name, value)
 
-            if value is not None:
-                if isinstance(record, dict):
-                    record[field.name] = value
-                else:
-                    setattr(record, field.name, value)
+        for name, start, end, empty_values, convert in extractor or self.get_extractor(type(line)):
+            value = line[start:end]
+
+            if value in empty_values:
+                continue
+
+            if convert is not None:
+                value = convert(value)
+                if value is None:
+                    continue
+
+            if is_dict:
+                record[name] = value
+            else:
+                setattr(record, name, value)
 
         return record
 
-    def run_field_validators(self, instance):
+    def run_field_validators(self, instance, generate_error=make_error_message):
         """Run all validators for each field in the parsed model."""
         is_valid = True
         errors = []
@@ -151,14 +420,26 @@ def run_field_validators(self, instance):
                     validator_is_valid, validator_error = validator(value)
                     is_valid = False if not validator_is_valid else is_valid
                     if validator_error:
-                        errors.append(validator_error)
+                        errors.append(generate_error(
+                            schema=self,
+                            error_category=ParserErrorCategoryChoices.FIELD_VALUE,
+                            error_message=validator_error,
+                            record=instance,
+                            field=field,
+                        ))
                 elif field.required:
                     is_valid = False
-                    errors.append(f"{field.name} is required but a value was not provided.")
+                    errors.append(generate_error(
+                        schema=self,
+                        error_category=ParserErrorCategoryChoices.FIELD_VALUE,
+                        error_message=f"{field.name} is required but a value was not provided.",
+                        record=instance,
+                        field=field,
+                    ))
 
         return is_valid, errors
 
-    def run_postparsing_validators(self, instance):
+    def run_postparsing_validators(self, instance, generate_error=make_error_message):
         """Run each of the `postparsing_validator` functions against the parsed model."""
         is_valid = True
         errors = []
@@ -167,24 +448,108 @@ def run_postparsing_validators(self, instance):
             validator_is_valid, validator_error = validator(instance)
             is_valid = False if not validator_is_valid else is_valid
             if validator_error:
-                errors.append(validator_error)
+                errors.append(generate_error(
+                    schema=self,
+                    error_category=ParserErrorCategoryChoices.VALUE_CONSISTENCY,
+                    error_message=validator_error,
+                    record=instance,
+                ))
 
         return is_valid, errors
 
 
 class MultiRecordRowSchema:
-    """Maps a line to multiple `RowSchema`s and runs all parsers and validators."""
+    """Maps a line to multiple `RowSchema`s and runs all parsers and validators.
+
+    The fields every schema shares, such as the record type, reporting month and case number at the
+    start of the line, are parsed once per line rather than once per schema. A schema with quiet
+    preparser errors whose only preparsing validator is a `notEmpty` check covers an optional slot of
+    the line, and is skipped with a single check when its slot is blank. Only the records of the
+    schemas that weren't skipped are returned for each line.
+    """
 
     def __init__(self, schemas):
-        # self.common_fields = None
         self.schemas = schemas
-
-    def parse_and_validate(self, line):
+        self.common_fields = self.get_common_fields(schemas)
+        self.common_names = frozenset(field.name for field in self.common_fields)
+        self.common_schema = RowSchema(fields=self.common_fields)
+        self.optional_slots = [self.get_optional_slot(schema) for schema in schemas]
+
+    @staticmethod
+    def get_common_fields(schemas):
+        """Return the fields found at the same position with the same type in every schema."""
+        if len(schemas) < 2:
+            return []
+
+        def field_key(field):
+            return (field.name, field.type, field.startIndex, field.endIndex)
+
+        shared = set.intersection(*({field_key(field) for field in schema.fields} for schema in schemas))
+        return [field for field in schemas[0].fields if field_key(field) in shared]
+
+    @staticmethod
+    def get_optional_slot(schema):
+        """Return the (start, end) of the slot of a schema that is skipped when blank, or None."""
+        if not schema.quiet_preparser_errors or len(schema.preparsing_validators) != 1:
+            return None
+        return getattr(schema.preparsing_validators[0], 'blank_slot', None)
+
+    def get_schemas(self, line):
+        """Return the schemas whose slots of the line aren't blank, with their extractors."""
+        line_type = type(line)
+        return [
+            (schema, schema.get_extractor(line_type, self.common_names))
+            for schema, slot in zip(self.schemas, self.optional_slots)
+            if slot is None or not line[slot[0]:slot[1]].isspace()
+        ]
+
+    def get_common_values(self, line):
+        """Return the (name, value) pairs of the line's non-empty common fields."""
+        values = []
+        for name, start, end, empty_values, convert in self.common_schema.get_extractor(type(line)):
+            value = line[start:end]
+            if value in empty_values:
+                continue
+            if convert is not None:
+                value = convert(value)
+                if value is None:
+                    continue
+            values.append((name, value))
+        return values
+
+    def parse_and_validate(self, line, generate_error=make_error_message):
         """Run `parse_and_validate` for each schema provided and bubble up errors."""
+        common_values = self.get_common_values(line)
         records = []
 
-        for schema in self.schemas:
-            r = schema.parse_and_validate(line)
-            records.append(r)
+        for schema, extractor in self.get_schemas(line):
+            r = schema.parse_and_validate(line, generate_error, common_values, extractor)
+            if r != (None, True, []):
+                records.append(r)
 
         return records
+
+    def parse_and_validate_batch(self, lines, generate_errors):
+        """Run `parse_and_validate_batch` for each schema provided, returning the records found on each line."""
+        if not lines:
+            return []
+
+        common_values = [self.get_common_values(line) for line in lines]
+        results = [[] for _ in lines]
+
+        for schema, slot in zip(self.schemas, self.optional_slots):
+            positions = [
+                i for i, line in enumerate(lines) if slot is None or not line[slot[0]:slot[1]].isspace()
+            ]
+            schema_results = schema.parse_and_validate_batch(
+                [lines[i] for i in positions],
+                [generate_errors[i] for i in positions],
+                [common_values[i] for i in positions],
+                self.common_names,
+            )
+
+            for i, r in zip(positions, schema_results):
+                if r != (None, True, []):
+                    results[i].append(r)
+
+        return results
@@ -3,9 +3,44 @@
 
 # higher order validator func
 
-def make_validator(validator_func, error_func):
-    """Return a function accepting a value input and returning (bool, string) to represent validation state."""
-    return lambda value: (True, None) if validator_func(value) else (False, error_func(value))
+def make_validator(validator_func, error_func, failures_func=None):
+    """Return a function accepting a value input and returning (bool, string) to represent validation state.
+
+    The function can also validate a whole column of values with `validate_column`. `failures_func` returns
+    the positions of the failing values in a column, defaulting to checking each value with `validator_func`.
+    """
+    def validator(value):
+        return (True, None) if validator_func(value) else (False, error_func(value))
+
+    validator.error_func = error_func
+    validator.find_failures = failures_func or (
+        lambda values: [i for i, value in enumerate(values) if not validator_func(value)]
+    )
+    return validator
+
+
+def validate_column(validator, values):
+    """Return the position and error message of each value in a column that fails the validator.
+
+    Error messages are only generated for failing values, decoding them first if they are raw bytes lines.
+    Validators not built by `make_validator` are run against each value in turn, decoded to str.
+    """
+    find_failures = getattr(validator, 'find_failures', None)
+    if find_failures is None:
+        results = (validator(as_text(value)) for value in values)
+        return [(i, error) for i, (is_valid, error) in enumerate(results) if not is_valid]
+
+    return [(i, validator.error_func(as_text(values[i]))) for i in find_failures(values)]
+
+
+def as_text(value):
+    """Return a raw bytes line decoded to str, and any other value unchanged."""
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def as_type_of(substring, value):
+    """Return a str substring encoded to bytes if it is to be compared with a bytes value."""
+    return substring.encode() if isinstance(value, bytes) else substring
 
 
 # generic validators
@@ -14,15 +49,22 @@ def matches(option):
     """Validate that value is equal to option."""
     return make_validator(
         lambda value: value == option,
-        lambda value: f'{value} does not match {option}.'
+        lambda value: f'{value} does not match {option}.',
+        lambda values: [i for i, value in enumerate(values) if value != option]
     )
 
 
 def oneOf(options=[]):
     """Validate that value exists in the provided options array."""
+    try:
+        lookup = frozenset(options)
+    except TypeError:
+        lookup = options
+
     return make_validator(
         lambda value: value in options,
-        lambda value: f'{value} is not in {options}.'
+        lambda value: f'{value} is not in {options}.',
+        lambda values: [i for i, value in enumerate(values) if value not in lookup]
     )
 
 
@@ -30,7 +72,8 @@ def between(min, max):
     """Validate value, when casted to int, is greater than min and less than max."""
     return make_validator(
         lambda value: int(value) > min and int(value) < max,
-        lambda value: f'{value} is not between {min} and {max}.'
+        lambda value: f'{value} is not between {min} and {max}.',
+        lambda values: [i for i, value in enumerate(values) if not min < int(value) < max]
     )
 
 
@@ -38,14 +81,15 @@ def hasLength(length):
     """Validate that value (string or array) has a length matching length param."""
     return make_validator(
         lambda value: len(value) == length,
-        lambda value: f'Value length {len(value)} does not match {length}.'
+        lambda value: f'Value length {len(value)} does not match {length}.',
+        lambda values: [i for i, value in enumerate(values) if len(value) != length]
     )
 
 
 def contains(substring):
     """Validate that string value contains the given substring param."""
     return make_validator(
-        lambda value: value.find(substring) != -1,
+        lambda value: value.find(as_type_of(substring, value)) != -1,
         lambda value: f'{value} does not contain {substring}.'
     )
 
@@ -53,41 +97,18 @@ def contains(substring):
 def startsWith(substring):
     """Validate that string value starts with the given substring param."""
     return make_validator(
-        lambda value: value.startswith(substring),
-        lambda value: f'{value} does not start with {substring}.'
+        lambda value: value.startswith(as_type_of(substring, value)),
+        lambda value: f'{value} does not start with {substring}.',
+        lambda values: [i for i, value in enumerate(values) if not value.startswith(as_type_of(substring, value))]
     )
 
 
 def notEmpty(start=0, end=None):
     """Validate that string value isn't only blanks."""
-    return make_validator(
+    validator = make_validator(
         lambda value: not value[start:end if end else len(value)].isspace(),
         lambda value: f'{value} contains blanks between positions {start} and {end if end else len(value)}.'
     )
-
-
-# custom validators
-
-def validate_single_header_trailer(file):
-    """Validate that a raw datafile has one trailer and one footer."""
-    headers = 0
-    trailers = 0
-
-    for rawline in file:
-        line = rawline.decode()
-
-        if line.startswith('HEADER'):
-            headers += 1
-        elif line.startswith('TRAILER'):
-            trailers += 1
-
-        if headers > 1:
-            return (False, 'Multiple headers found.')
-
-        if trailers > 1:
-            return (False, 'Multiple trailers found.')
-
-    if headers == 0:
-        return (False, 'No headers found.')
-
-    return (True, None)
+    # lets a `MultiRecordRowSchema` skip a record whose slot of the line is blank without running the validator
+    validator.blank_slot = (start, end)
+    return validator
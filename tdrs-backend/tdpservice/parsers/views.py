@@ -1,16 +1,36 @@
 """Views for the parsers app."""
 from tdpservice.users.permissions import IsApprovedPermission
+from django.http import FileResponse, StreamingHttpResponse
+from rest_framework.decorators import action
 from rest_framework.viewsets import ModelViewSet
-from rest_framework.response import Response
 from .serializers import ParsingErrorSerializer
 from .models import ParserError
+import csv
 import logging
-import base64
-from io import BytesIO
+import tempfile
 import xlsxwriter
 
 logger = logging.getLogger()
 
+REPORT_COLUMNS = [
+    'case_number',
+    'rpt_month_year',
+    'error_type',
+    'error_message',
+    'item_number',
+    'field_name',
+    'row_number',
+    'column_number',
+]
+
+
+class Echo:
+    """File-like object whose `write` returns the value written, so a csv writer can feed a streaming response."""
+
+    def write(self, value):
+        """Return the value to be written."""
+        return value
+
 
 class ParsingErrorViewSet(ModelViewSet):
     """Data file views."""
@@ -19,15 +39,9 @@ class ParsingErrorViewSet(ModelViewSet):
     serializer_class = ParsingErrorSerializer
     permission_classes = [IsApprovedPermission]
 
-    def list(self, request, *args, **kwargs):
-        """Override list to return xls file."""
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(self._get_xls_serialized_file(serializer.data))
-
     def get_queryset(self):
         """Override get_queryset to filter by request url."""
-        queryset = ParserError.objects.all()
+        queryset = ParserError.objects.all().order_by('row_number', 'id')
         id = self.request.query_params.get('id', None)
         if id is not None:
             queryset = queryset.filter(id=id)
@@ -36,36 +50,46 @@ def get_queryset(self):
             queryset = queryset.filter(file=file)
         return queryset
 
-    def _get_xls_serialized_file(self, data):
-        """Return xls file created from the error."""
-        row, col = 0, 0
-        output = BytesIO()
-        workbook = xlsxwriter.Workbook(output)
-        worksheet = workbook.add_worksheet()
+    @action(methods=["get"], detail=False)
+    def export(self, request):
+        """Export the filtered errors as an xlsx report, or as csv with `?export_format=csv`."""
+        rows = self.filter_queryset(self.get_queryset()).values_list(*REPORT_COLUMNS)
+
+        if request.query_params.get('export_format') == 'csv':
+            return self._get_csv_response(rows.iterator())
 
-        report_columns = ['case_number',
-                          'rpt_month_year',
-                          'error_type',
-                          'error_message',
-                          'item_number',
-                          'field_name',
-                          'row_number',
-                          'column_number']
+        return self._get_xlsx_response(rows.iterator())
+
+    def _get_csv_response(self, rows):
+        """Stream the error rows as csv, without holding the report in memory."""
+        writer = csv.writer(Echo())
+
+        def generate():
+            yield writer.writerow(REPORT_COLUMNS)
+            for row in rows:
+                yield writer.writerow(row)
+
+        response = StreamingHttpResponse(generate(), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="parsing_errors.csv"'
+        return response
+
+    def _get_xlsx_response(self, rows):
+        """Write the error rows to a temporary xlsx file one row at a time, and stream it back."""
+        output = tempfile.TemporaryFile()
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+        worksheet = workbook.add_worksheet()
 
         # write beta banner
-        worksheet.write(row, col,
+        worksheet.write(0, 0,
                         "Error reporting in TDP is still in development." +
                         "We'll be in touch when it's ready to use!" +
                         "For now please refer to the reports you receive via email")
-        row, col = 2, 0
-        # write csv header
-        [worksheet.write(row, col, key) for col, key in enumerate(report_columns)]
-
-        for i in data:
-            row += 1
-            col = 0
-            for key in report_columns:
-                worksheet.write(row, col, i[key])  # writes value by looking up data by key
-                col += 1
+        # write header, rows must be written in order in constant_memory mode
+        worksheet.write_row(2, 0, REPORT_COLUMNS)
+
+        for row_number, row in enumerate(rows, start=3):
+            worksheet.write_row(row_number, 0, row)
+
         workbook.close()
-        return {"data": data, "xls_report": base64.b64encode(output.getvalue()).decode("utf-8")}
+        output.seek(0)
+        return FileResponse(output, as_attachment=True, filename='parsing_errors.xlsx')
@@ -0,0 +1,238 @@
+"""Buffered persistence of parsed records and parser errors."""
+
+import functools
+import io
+import logging
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections, router, transaction
+from django_elasticsearch_dsl.apps import DEDConfig
+from django_elasticsearch_dsl.registries import registry
+from tdpservice.data_files.models import DataFile
+from tdpservice.search_indexes.models.ssp import SSP_M1, SSP_M2, SSP_M3
+from tdpservice.search_indexes.models.tanf import TANF_T1, TANF_T2, TANF_T3
+from .models import ParserError
+from .summary import ErrorSummary
+
+logger = logging.getLogger(__name__)
+
+# the models that parsed records are saved as, each tagged with the datafile it was parsed from
+RECORD_MODELS = (TANF_T1, TANF_T2, TANF_T3, SSP_M1, SSP_M2, SSP_M3)
+
+
+def index_records(model, records):
+    """Index bulk created records, as `bulk_create` does not send the signals elasticsearch listens for.
+
+    They're indexed once the transaction saving them commits, so records that are rolled back never are.
+    """
+    if not DEDConfig.autosync_enabled():
+        return
+
+    for document in registry.get_documents([model]):
+        if not document.django.ignore_signals:
+            transaction.on_commit(functools.partial(document().update, records))
+
+
+def unindex_records(model, datafile_ids):
+    """Remove the indexed records parsed from any of the datafiles."""
+    if not DEDConfig.autosync_enabled():
+        return
+
+    for document in registry.get_documents([model]):
+        if not document.django.ignore_signals:
+            document.search().filter('terms', datafile=datafile_ids).delete()
+
+
+def delete_records(datafile_ids):
+    """Delete the records parsed from any of the datafiles, returning the number deleted.
+
+    Records are deleted by their indexed `datafile` foreign key without being loaded first, so this
+    doesn't scan or cascade through the record tables. Parser errors stay with the datafile they were
+    found in, no longer referring to the records they were found on.
+    """
+    num_deleted = 0
+    with transaction.atomic():
+        for model in RECORD_MODELS:
+            records = model.objects.filter(datafile_id__in=datafile_ids)
+            ParserError.objects.filter(
+                content_type=ContentType.objects.get_for_model(model),
+                object_id__in=records.values('pk'),
+            ).update(content_type=None, object_id=None)
+
+            # `records.delete()` would load every record to send its delete signals and to cascade through
+            # its `error` GenericRelation. Skipping both is safe here: no table has a foreign key to a
+            # record, the errors are kept on purpose (they're reported with the datafile, not the record)
+            # and unlinked above, and the one signal receiver, elasticsearch's, is replaced by
+            # `unindex_records` below. Django has no public API for a delete without the collector, so
+            # this leans on the same private `_raw_delete` its own collector uses for fast deletes.
+            num_deleted += records._raw_delete(records.db)
+            unindex_records(model, datafile_ids)
+
+    return num_deleted
+
+
+def delete_superseded_records(datafile):
+    """Delete the records parsed from earlier versions of the datafile, returning the number deleted."""
+    superseded_ids = list(DataFile.objects.filter(
+        stt=datafile.stt_id,
+        year=datafile.year,
+        quarter=datafile.quarter,
+        section=datafile.section,
+        version__lt=datafile.version,
+    ).values_list('id', flat=True))
+
+    if not superseded_ids:
+        return 0
+
+    num_deleted = delete_records(superseded_ids)
+    logger.info(f"Deleted {num_deleted} records superseded by DataFile {datafile.id}.")
+    return num_deleted
+
+
+class BulkRecordWriter:
+    """Accumulates parsed records per model and persists them with `bulk_create`."""
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or settings.PARSER_BULK_CREATE_BATCH_SIZE
+        self.unsaved_records = {}
+        self.num_unsaved = 0
+        self.num_created = 0
+
+    def add(self, record):
+        """Buffer a parsed record, flushing the buffer once `batch_size` records are held."""
+        self.unsaved_records.setdefault(type(record), []).append(record)
+        self.num_unsaved += 1
+
+        if self.num_unsaved >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Insert all buffered records in a single transaction and empty the buffer."""
+        if not self.num_unsaved:
+            return
+
+        with transaction.atomic():
+            for model, records in self.unsaved_records.items():
+                created = self.create_records(model, records)
+                index_records(model, created)
+                self.num_created += len(created)
+
+        logger.debug(f"Bulk created {self.num_unsaved} records.")
+        self.unsaved_records = {}
+        self.num_unsaved = 0
+
+    def create_records(self, model, records):
+        """Insert the buffered records of one model, returning them with their primary keys set."""
+        return model.objects.bulk_create(records, batch_size=self.batch_size)
+
+
+COPY_TEXT_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def copy_text(value):
+    """Format a database value as a column of postgres' COPY text format."""
+    if value is None:
+        return '\\N'
+    return str(value).translate(COPY_TEXT_ESCAPES)
+
+
+class CopyRecordWriter(BulkRecordWriter):
+    """A `BulkRecordWriter` that loads records with postgres' `COPY FROM STDIN` instead of `INSERT`s.
+
+    Each record's column values are written straight into a tab separated buffer, skipping the SQL
+    compilation `bulk_create` does per record. Primary keys are allocated from the table's sequence
+    first, so errors still refer to the records they were found on.
+    """
+
+    def create_records(self, model, records):
+        """Copy the buffered records of one model into its table, returning them with their primary keys set."""
+        connection = connections[router.db_for_write(model)]
+        opts = model._meta
+        fields = opts.concrete_fields
+        table = connection.ops.quote_name(opts.db_table)
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+                [opts.db_table, opts.pk.column, len(records)],
+            )
+            for record, (pk,) in zip(records, cursor.fetchall()):
+                record.pk = pk
+
+            buffer = io.StringIO()
+            for record in records:
+                buffer.write('\t'.join(
+                    copy_text(field.get_db_prep_save(getattr(record, field.attname), connection))
+                    for field in fields
+                ))
+                buffer.write('\n')
+            buffer.seek(0)
+
+            cursor.copy_expert(f'COPY {table} ({columns}) FROM STDIN', buffer)
+
+        for record in records:
+            record._state.adding = False
+            record._state.db = connection.alias
+
+        return records
+
+
+RECORD_WRITERS = {
+    'orm': BulkRecordWriter,
+    'copy': CopyRecordWriter,
+}
+
+
+def get_record_writer():
+    """Return a new record writer of the kind configured by `PARSER_RECORD_WRITER`."""
+    return RECORD_WRITERS[settings.PARSER_RECORD_WRITER]()
+
+
+class ParserErrorWriter:
+    """Accumulates `ParserError`s and persists them with `bulk_create`.
+
+    Errors found on a parsed record can only refer to it once it has been saved, so the record writer
+    is always flushed first and each error's `object_id` filled in from its record. Every error added
+    is also counted in `summary`.
+    """
+
+    def __init__(self, record_writer=None, batch_size=None, summary=None):
+        self.record_writer = record_writer
+        self.batch_size = batch_size or settings.PARSER_BULK_CREATE_BATCH_SIZE
+        self.summary = ErrorSummary() if summary is None else summary
+        self.unsaved_errors = []
+        self.num_created = 0
+
+    def add(self, error, record=None, record_type=''):
+        """Buffer a parser error found on `record`, flushing the buffer once `batch_size` errors are held."""
+        self.unsaved_errors.append((error, record))
+        self.summary.add(error, record_type)
+
+        if len(self.unsaved_errors) >= self.batch_size:
+            self.flush()
+
+    def add_all(self, errors, record=None, record_type=''):
+        """Buffer each of the parser errors found on `record`, a record of `record_type`."""
+        for error in errors:
+            self.add(error, record, record_type)
+
+    def flush(self):
+        """Insert all buffered errors, after the records they refer to, and empty the buffer."""
+        if not self.unsaved_errors:
+            return
+
+        if self.record_writer is not None:
+            self.record_writer.flush()
+
+        errors = []
+        for error, record in self.unsaved_errors:
+            if error.content_type_id is not None:
+                error.object_id = getattr(record, 'pk', None)
+            errors.append(error)
+
+        ParserError.objects.bulk_create(errors, batch_size=self.batch_size)
+        self.num_created += len(errors)
+
+        logger.debug(f"Bulk created {len(errors)} parser errors.")
+        self.unsaved_errors = []
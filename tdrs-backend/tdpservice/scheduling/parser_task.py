@@ -1,14 +1,36 @@
 """Celery hook for parsing tasks."""
 from __future__ import absolute_import
-from celery import shared_task
+from celery import chord, shared_task
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, transaction
 import logging
 from tdpservice.data_files.models import DataFile
-from tdpservice.parsers.parse import parse_datafile
+from tdpservice.parsers.budget import ErrorBudgetExceeded, SharedErrorCount, clear_shared_errors
+from tdpservice.parsers.cache import reuse_prior_parse
+from tdpservice.parsers.models import ParseCheckpoint, ParseChunk, ParserError
+from tdpservice.parsers.parse import (
+    check_saved_cases,
+    parse_datafile_chunk,
+    parse_datafile_resumable,
+    plan_datafile_chunks,
+    reject_datafile,
+)
+from tdpservice.parsers.progress import finish_progress, start_progress
+from tdpservice.parsers.summary import ErrorSummary, summarize
+from tdpservice.parsers.writers import delete_records, delete_superseded_records
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task
+# parsing resumes from the datafile's checkpoint, so it's safe to redeliver the task if its worker is lost
+# part way through, or retry it when the database connection drops
+@shared_task(
+    acks_late=True,
+    reject_on_worker_lost=True,
+    autoretry_for=(InterfaceError, OperationalError),
+    retry_backoff=True,
+    max_retries=5,
+)
 def parse(data_file_id):
     """Send data file for processing."""
     # passing the data file FileField across redis was rendering non-serializable failures, doing the below lookup
@@ -17,5 +39,178 @@ def parse(data_file_id):
     data_file = DataFile.objects.get(id=data_file_id)
 
     logger.info(f"DataFile parsing started for file {data_file.filename}")
-    errors = parse_datafile(data_file)
-    logger.info(f"DataFile parsing finished with {len(errors)} errors: {errors}")
+
+    num_errors = reuse_prior_parse(data_file) if settings.PARSER_REUSE_PRIOR_PARSES else None
+    if num_errors is not None:
+        delete_superseded_records(data_file)
+        logger.info(f"DataFile parsing finished with {describe_errors(data_file.id)}, reused from an identical file.")
+        return
+
+    if settings.PARSER_CHUNK_LINES and data_file.file.size > settings.PARSER_PARALLEL_MIN_FILE_SIZE:
+        parse_in_chunks(data_file)
+        return
+
+    parse_datafile_resumable(data_file)
+    if ParseCheckpoint.objects.filter(file=data_file, status=ParseCheckpoint.Status.REJECTED).exists():
+        logger.info(f"DataFile parsing rejected the file after {describe_errors(data_file.id)}.")
+        return
+
+    delete_superseded_records(data_file)
+    logger.info(f"DataFile parsing finished with {describe_errors(data_file.id)}.")
+
+
+def describe_errors(data_file_id):
+    """Return a compact description of the errors found in a data file, from its checkpoint's error summary."""
+    checkpoint = ParseCheckpoint.objects.get(file_id=data_file_id)
+    return ErrorSummary().merge(checkpoint.error_summary).describe()
+
+
+def parse_in_chunks(data_file):
+    """Validate the data file's structure, then fan its body out to `parse_chunk` tasks.
+
+    The chunks are dispatched while the file's checkpoint is locked, and the checkpoint marks them
+    dispatched in the same transaction. A redelivered `parse` task doesn't dispatch them a second time,
+    while one redelivered because its worker was lost before the transaction committed dispatches them
+    again, which is safe as each chunk is only parsed once.
+    """
+    structure, chunks = plan_datafile_chunks(data_file, settings.PARSER_CHUNK_LINES)
+
+    with transaction.atomic():
+        checkpoint, created = ParseCheckpoint.objects.select_for_update().get_or_create(file=data_file)
+        if not created and (checkpoint.status != ParseCheckpoint.Status.PARSING or checkpoint.chunks_dispatched):
+            logger.info(f"DataFile {data_file.id} has already been split into chunks for parsing.")
+            return
+
+        if created:
+            structure_errors = structure.get_errors()
+            errors = ParserError.objects.bulk_create(structure_errors or structure.get_trailer_errors())
+            error_summary = summarize(structure_errors) if structure_errors else summarize(errors, 'TRAILER')
+            checkpoint.advance(0, 1, 0, len(errors), error_summary)
+            start_progress(data_file, sum(chunk[2] for chunk in chunks), data_file.file.size, len(errors))
+            clear_shared_errors(data_file.id)
+
+            if structure_errors or not chunks:
+                checkpoint.status = ParseCheckpoint.Status.COMPLETE
+                checkpoint.save()
+                finish_progress(data_file.id, len(errors))
+                logger.info(f"DataFile parsing finished with {describe_errors(data_file.id)}.")
+                return
+
+        chord(
+            parse_chunk.s(data_file.id, structure.program_type, structure.section, *chunk) for chunk in chunks
+        )(count_chunk_errors.s(data_file.id, checkpoint.num_errors).on_error(fail_parse.s(data_file.id)))
+        checkpoint.chunks_dispatched = True
+        checkpoint.save()
+
+    logger.info(f"DataFile {data_file.id} split into {len(chunks)} chunks for parsing.")
+
+
+# each chunk is committed along with its `ParseChunk`, so it's safe to redeliver the task if its worker is
+# lost, or retry it when the database connection drops, without saving the chunk's records twice
+@shared_task(
+    acks_late=True,
+    reject_on_worker_lost=True,
+    autoretry_for=(InterfaceError, OperationalError),
+    retry_backoff=True,
+    max_retries=5,
+)
+def parse_chunk(data_file_id, program_type, section, offset, first_line_number, num_lines, num_bytes=None):
+    """Parse one chunk of a data file's body, returning a summary of the errors saved.
+
+    Only the chunk's bytes are downloaded from storage. The errors of all of the file's chunks count
+    towards its error budget, and the summary is flagged as rejected if they exceeded it. A chunk that
+    has already been committed isn't parsed again, and the summary saved with it is returned instead.
+    """
+    data_file = DataFile.objects.get(id=data_file_id)
+    error_summary = ErrorSummary()
+
+    with transaction.atomic():
+        chunk, created = ParseChunk.objects.get_or_create(file=data_file, first_line_number=first_line_number)
+        if not created:
+            logger.info(f"DataFile {data_file_id} chunk from line {first_line_number} has already been parsed.")
+            return chunk.error_summary
+
+        try:
+            parse_datafile_chunk(
+                data_file,
+                program_type,
+                section,
+                offset,
+                first_line_number,
+                num_lines,
+                num_bytes,
+                error_summary=error_summary,
+                shared_errors=SharedErrorCount(data_file_id, first_line_number),
+            )
+        except ErrorBudgetExceeded:
+            chunk.error_summary = {**error_summary.as_dict(), 'rejected': True}
+        else:
+            chunk.error_summary = error_summary.as_dict()
+        chunk.save()
+
+    return chunk.error_summary
+
+
+@shared_task
+def count_chunk_errors(chunk_error_summaries, data_file_id, num_errors):
+    """Total and summarize the errors saved for every chunk of a data file once they have all been parsed.
+
+    The file is rejected if any of its chunks exceeded their error budget, deleting its records in the
+    same transaction. Otherwise the cases of all of its records are checked, which no one chunk could do.
+    A redelivered callback finds the file already finished and leaves it as it is.
+    """
+    rejected = any(chunk_error_summary.get('rejected') for chunk_error_summary in chunk_error_summaries)
+
+    with transaction.atomic():
+        checkpoint = ParseCheckpoint.objects.select_for_update().get(file_id=data_file_id)
+        if checkpoint.status != ParseCheckpoint.Status.PARSING:
+            logger.info(f"DataFile {data_file_id} parsing has already finished as {checkpoint.status}.")
+            return checkpoint.num_errors
+
+        error_summary = ErrorSummary().merge(checkpoint.error_summary)
+        for chunk_error_summary in chunk_error_summaries:
+            error_summary.merge(chunk_error_summary)
+            num_errors += chunk_error_summary['num_errors']
+
+        if not rejected:
+            num_errors += check_saved_cases(checkpoint.file, error_summary)
+
+        checkpoint.num_errors = num_errors
+        checkpoint.error_summary = error_summary.as_dict()
+        if rejected:
+            reject_datafile(checkpoint.file, checkpoint)
+        else:
+            checkpoint.status = ParseCheckpoint.Status.COMPLETE
+            checkpoint.save()
+
+    if rejected:
+        finish_progress(data_file_id, num_errors, 'rejected')
+        logger.info(f"DataFile {data_file_id} parsing rejected the file after {error_summary.describe()}.")
+        return num_errors
+
+    finish_progress(data_file_id, num_errors)
+    delete_superseded_records(checkpoint.file)
+    logger.info(f"DataFile {data_file_id} parsing finished with {error_summary.describe()}.")
+    return num_errors
+
+
+@shared_task
+def fail_parse(request, exc, traceback, data_file_id):
+    """Mark a data file as failed when any of its chunks, or the count of their errors, failed with an exception.
+
+    The records already saved from the file are deleted, so that it isn't left with some of them, along with
+    its chunks, so that none of the failed parse is reused if the file is parsed again.
+    """
+    logger.error(f"DataFile {data_file_id} parsing failed: {exc!r}")
+
+    with transaction.atomic():
+        checkpoint = ParseCheckpoint.objects.select_for_update().get(file_id=data_file_id)
+        if checkpoint.status != ParseCheckpoint.Status.PARSING:
+            return
+
+        checkpoint.status = ParseCheckpoint.Status.FAILED
+        checkpoint.save()
+        ParseChunk.objects.filter(file_id=data_file_id).delete()
+        delete_records([data_file_id])
+
+    finish_progress(data_file_id, checkpoint.num_errors, 'failed')
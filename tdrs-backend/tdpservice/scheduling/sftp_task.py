@@ -58,12 +58,15 @@ def create_dir(directory_name, sftp_server):
         upper_directory_name = today_date.strftime('%Y%m%d')
         lower_directory_name = today_date.strftime(str(data_file.year) + '-' + str(data_file.quarter))
 
-        # Paramiko need local file
-        paramiko_local_file = data_file.file.read()
+        # Paramiko need local file, copied by chunks and only hashed if it wasn't hashed when it was uploaded
+        file_hash = None if data_file.file_shasum else hashlib.sha256()
         with open(destination, 'wb') as f1:
-            f1.write(paramiko_local_file)
+            for chunk in data_file.file.chunks():
+                f1.write(chunk)
+                if file_hash is not None:
+                    file_hash.update(chunk)
             file_transfer_record.file_size = f1.tell()
-            file_transfer_record.file_shasum = hashlib.sha256(paramiko_local_file).hexdigest()
+            file_transfer_record.file_shasum = data_file.file_shasum or file_hash.hexdigest()
             f1.close()
 
         # Paramiko SSH connection requires private key as file
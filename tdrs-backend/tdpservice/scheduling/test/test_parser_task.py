@@ -0,0 +1,171 @@
+"""Tests for the parser celery tasks."""
+
+import pytest
+from tdpservice.parsers import parse
+from tdpservice.parsers.models import ParseCheckpoint, ParseChunk, ParserError
+from tdpservice.parsers.parse import plan_datafile_chunks
+from tdpservice.search_indexes.models.tanf import TANF_T1
+from tdpservice.parsers.test.test_parse import create_test_datafile
+from tdpservice.scheduling import parser_task
+
+
+@pytest.mark.django_db
+def test_count_chunk_errors(data_file_instance):
+    """Test that the errors saved for each chunk are totalled and summarized with the file level errors."""
+    ParseCheckpoint.objects.create(file=data_file_instance, num_errors=1)
+    chunk_error_summaries = [
+        {'num_errors': 2, 'buckets': [
+            {'record_type': 'T1', 'field_name': 'CASE_NUMBER', 'error_type': 'Field value', 'count': 2, 'samples': []},
+        ]},
+        {'num_errors': 0, 'buckets': []},
+        {'num_errors': 5, 'buckets': [
+            {'record_type': 'T1', 'field_name': 'CASE_NUMBER', 'error_type': 'Field value', 'count': 5, 'samples': []},
+        ]},
+    ]
+
+    assert parser_task.count_chunk_errors(chunk_error_summaries, data_file_instance.id, 1) == 8
+
+    checkpoint = ParseCheckpoint.objects.get(file=data_file_instance)
+    assert checkpoint.num_errors == 8
+    assert checkpoint.error_summary['num_errors'] == 7
+    assert checkpoint.error_summary['buckets'][0]['count'] == 7
+
+
+@pytest.mark.django_db
+def test_parse_in_chunks_only_fans_out_once(stt_user, stt, settings, mocker):
+    """Test that a redelivered parse doesn't split the file into chunks a second time."""
+    settings.PARSER_CHUNK_LINES = 2
+    datafile = create_test_datafile('small_tanf_section1.txt', stt_user, stt)
+    chord = mocker.patch('tdpservice.scheduling.parser_task.chord')
+
+    parser_task.parse_in_chunks(datafile)
+    parser_task.parse_in_chunks(datafile)
+
+    assert chord.call_count == 1
+    assert ParseCheckpoint.objects.get(file=datafile).status == ParseCheckpoint.Status.PARSING
+
+    parser_task.count_chunk_errors([{'num_errors': 0}, {'num_errors': 1}], datafile.id, 0)
+    checkpoint = ParseCheckpoint.objects.get(file=datafile)
+    assert checkpoint.status == ParseCheckpoint.Status.COMPLETE
+    assert checkpoint.num_errors == 1
+
+
+@pytest.mark.django_db
+def test_parse_in_chunks_redispatches_undispatched_chunks(stt_user, stt, settings, mocker):
+    """Test that a parse redelivered after its worker was lost before dispatching the chunks dispatches them."""
+    settings.PARSER_CHUNK_LINES = 2
+    datafile = create_test_datafile('small_tanf_section1.txt', stt_user, stt)
+    chord = mocker.patch('tdpservice.scheduling.parser_task.chord')
+    chord.return_value.side_effect = ConnectionError('worker lost')
+
+    with pytest.raises(ConnectionError):
+        parser_task.parse_in_chunks(datafile)
+    assert not ParseCheckpoint.objects.filter(file=datafile).exists()
+
+    chord.return_value.side_effect = None
+    parser_task.parse_in_chunks(datafile)
+    parser_task.parse_in_chunks(datafile)
+
+    assert chord.return_value.call_count == 2
+    checkpoint = ParseCheckpoint.objects.get(file=datafile)
+    assert checkpoint.chunks_dispatched
+    assert checkpoint.num_errors == ParserError.objects.filter(file=datafile).count()
+
+
+@pytest.mark.django_db
+def test_parse_replaces_superseded_records(stt_user, stt):
+    """Test that parsing a new version of a file deletes the records parsed from its earlier versions."""
+    stt.filenames = {'Active Case Data': 'ADS.E2J.FTP1.TS06'}
+    stt.save()
+    first = create_test_datafile('small_tanf_section1.txt', stt_user, stt)
+    parser_task.parse(first.id)
+    assert TANF_T1.objects.filter(datafile=first).exists()
+
+    second = create_test_datafile('small_tanf_section1.txt', stt_user, stt)
+    parser_task.parse(second.id)
+
+    assert not TANF_T1.objects.filter(datafile=first).exists()
+    assert TANF_T1.objects.filter(datafile=second).count() == TANF_T1.objects.count()
+
+
+@pytest.mark.django_db
+def test_count_chunk_errors_rejects_file_over_budget(data_file_instance):
+    """Test that a file is rejected if any of its chunks exceeded their error budget."""
+    ParseCheckpoint.objects.create(file=data_file_instance)
+
+    parser_task.count_chunk_errors(
+        [{'num_errors': 0}, {'num_errors': 30, 'rejected': True}], data_file_instance.id, 0
+    )
+
+    checkpoint = ParseCheckpoint.objects.get(file=data_file_instance)
+    assert checkpoint.status == ParseCheckpoint.Status.REJECTED
+    assert checkpoint.num_errors == 30
+
+
+@pytest.mark.django_db
+def test_count_chunk_errors_rejects_in_one_transaction(data_file_instance, mocker):
+    """Test that a rejected file isn't left complete with its records when deleting them fails."""
+    ParseCheckpoint.objects.create(file=data_file_instance)
+    mocker.patch.object(parse, 'delete_records', side_effect=ConnectionError('database lost'))
+
+    with pytest.raises(ConnectionError):
+        parser_task.count_chunk_errors([{'num_errors': 30, 'rejected': True}], data_file_instance.id, 0)
+
+    checkpoint = ParseCheckpoint.objects.get(file=data_file_instance)
+    assert checkpoint.status == ParseCheckpoint.Status.PARSING
+    assert checkpoint.num_errors == 0
+
+
+@pytest.mark.django_db
+def test_count_chunk_errors_redelivered(data_file_instance):
+    """Test that a redelivered callback doesn't count the chunks' errors a second time."""
+    ParseCheckpoint.objects.create(file=data_file_instance, num_errors=1)
+    chunk_error_summaries = [{'num_errors': 2}, {'num_errors': 3}]
+
+    assert parser_task.count_chunk_errors(chunk_error_summaries, data_file_instance.id, 1) == 6
+    assert parser_task.count_chunk_errors(chunk_error_summaries, data_file_instance.id, 1) == 6
+
+    checkpoint = ParseCheckpoint.objects.get(file=data_file_instance)
+    assert checkpoint.status == ParseCheckpoint.Status.COMPLETE
+    assert checkpoint.num_errors == 6
+
+
+@pytest.mark.django_db
+def test_parse_chunk_rerun_is_not_saved_twice(stt_user, stt, settings):
+    """Test that a redelivered chunk returns the summary it was committed with instead of saving its records again."""
+    settings.PARSER_CHUNK_LINES = 2
+    datafile = create_test_datafile('small_tanf_section1.txt', stt_user, stt)
+    structure, chunks = plan_datafile_chunks(datafile, settings.PARSER_CHUNK_LINES)
+    ParseCheckpoint.objects.create(file=datafile)
+
+    error_summary = parser_task.parse_chunk(datafile.id, structure.program_type, structure.section, *chunks[0])
+    num_records = TANF_T1.objects.filter(datafile=datafile).count()
+    num_errors = ParserError.objects.filter(file=datafile).count()
+    assert num_records > 0
+
+    assert parser_task.parse_chunk(datafile.id, structure.program_type, structure.section, *chunks[0]) == error_summary
+    assert TANF_T1.objects.filter(datafile=datafile).count() == num_records
+    assert ParserError.objects.filter(file=datafile).count() == num_errors
+    assert ParseChunk.objects.filter(file=datafile).count() == 1
+
+
+@pytest.mark.django_db
+def test_failed_chunk_fails_parse(stt_user, stt, settings, mocker):
+    """Test that a chunk failing with an exception marks the file failed and deletes its records."""
+    settings.PARSER_CHUNK_LINES = 2
+    datafile = create_test_datafile('small_tanf_section1.txt', stt_user, stt)
+    chord = mocker.patch('tdpservice.scheduling.parser_task.chord')
+    parser_task.parse_in_chunks(datafile)
+
+    callback = chord.return_value.call_args.args[0]
+    assert callback.options['link_error'] == [parser_task.fail_parse.s(datafile.id)]
+
+    structure, chunks = plan_datafile_chunks(datafile, settings.PARSER_CHUNK_LINES)
+    parser_task.parse_chunk(datafile.id, structure.program_type, structure.section, *chunks[0])
+    assert TANF_T1.objects.filter(datafile=datafile).exists()
+
+    parser_task.fail_parse(None, ValueError('chunk failed'), None, datafile.id)
+
+    assert ParseCheckpoint.objects.get(file=datafile).status == ParseCheckpoint.Status.FAILED
+    assert not TANF_T1.objects.filter(datafile=datafile).exists()
+    assert not ParseChunk.objects.filter(file=datafile).exists()
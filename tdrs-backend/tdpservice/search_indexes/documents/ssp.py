@@ -1,6 +1,6 @@
 """Elasticsearch document mappings for SSP submission models."""
 
-from django_elasticsearch_dsl import Document
+from django_elasticsearch_dsl import Document, fields
 from django_elasticsearch_dsl.registries import registry
 from ..models.ssp import SSP_M1, SSP_M2, SSP_M3
 
@@ -9,6 +9,8 @@
 class SSP_M1DataSubmissionDocument(Document):
     """Elastic search model mapping for a parsed SSP M1 data file."""
 
+    datafile = fields.IntegerField(attr='datafile_id')
+
     class Index:
         """ElasticSearch index generation settings."""
 
@@ -73,6 +75,8 @@ class Django:
 class SSP_M2DataSubmissionDocument(Document):
     """Elastic search model mapping for a parsed SSP M2 data file."""
 
+    datafile = fields.IntegerField(attr='datafile_id')
+
     class Index:
         """ElasticSearch index generation settings."""
 
@@ -161,6 +165,8 @@ class Django:
 class SSP_M3DataSubmissionDocument(Document):
     """Elastic search model mapping for a parsed SSP M3 data file."""
 
+    datafile = fields.IntegerField(attr='datafile_id')
+
     class Index:
         """ElasticSearch index generation settings."""
 
@@ -1,6 +1,6 @@
 """Elasticsearch document mappings for TANF submission models."""
 
-from django_elasticsearch_dsl import Document
+from django_elasticsearch_dsl import Document, fields
 from django_elasticsearch_dsl.registries import registry
 from ..models.tanf import TANF_T1, TANF_T2, TANF_T3, TANF_T4, TANF_T5, TANF_T6, TANF_T7
 
@@ -9,6 +9,8 @@
 class TANF_T1DataSubmissionDocument(Document):
     """Elastic search model mapping for a parsed TANF T1 data file."""
 
+    datafile = fields.IntegerField(attr='datafile_id')
+
     class Index:
         """ElasticSearch index generation settings."""
 
@@ -75,6 +77,8 @@ class Django:
 class TANF_T2DataSubmissionDocument(Document):
     """Elastic search model mapping for a parsed TANF T2 data file."""
 
+    datafile = fields.IntegerField(attr='datafile_id')
+
     class Index:
         """ElasticSearch index generation settings."""
 
@@ -166,6 +170,8 @@ class Django:
 class TANF_T3DataSubmissionDocument(Document):
     """Elastic search model mapping for a parsed TANF T3 data file."""
 
+    datafile = fields.IntegerField(attr='datafile_id')
+
     class Index:
         """ElasticSearch index generation settings."""
 
@@ -0,0 +1,45 @@
+# Generated by Django 3.2.15 on 2026-10-17 18:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_files', '0012_datafile_s3_versioning_id'),
+        ('search_indexes', '0008_auto_20230522_1850'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ssp_m1',
+            name='datafile',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='data_files.datafile'),
+        ),
+        migrations.AddField(
+            model_name='ssp_m2',
+            name='datafile',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='data_files.datafile'),
+        ),
+        migrations.AddField(
+            model_name='ssp_m3',
+            name='datafile',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='data_files.datafile'),
+        ),
+        migrations.AddField(
+            model_name='tanf_t1',
+            name='datafile',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='data_files.datafile'),
+        ),
+        migrations.AddField(
+            model_name='tanf_t2',
+            name='datafile',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='data_files.datafile'),
+        ),
+        migrations.AddField(
+            model_name='tanf_t3',
+            name='datafile',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='data_files.datafile'),
+        ),
+    ]
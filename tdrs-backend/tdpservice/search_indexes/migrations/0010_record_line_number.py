@@ -0,0 +1,43 @@
+# Generated by Django 3.2.15 on 2026-10-17 19:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_indexes', '0009_auto_20261017_1833'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ssp_m1',
+            name='line_number',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ssp_m2',
+            name='line_number',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ssp_m3',
+            name='line_number',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tanf_t1',
+            name='line_number',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tanf_t2',
+            name='line_number',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tanf_t3',
+            name='line_number',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -12,6 +12,14 @@ class SSP_M1(models.Model):
     Mapped to an elastic search index.
     """
 
+    datafile = models.ForeignKey(
+        'data_files.DataFile',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    # the line of the datafile the record was parsed from, used to report errors across its case
+    line_number = models.PositiveIntegerField(null=True, blank=True)
     error = GenericRelation(ParserError)
     RecordType = models.CharField(max_length=156, null=True, blank=False)
     RPT_MONTH_YEAR = models.IntegerField(null=True, blank=False)
@@ -73,6 +81,14 @@ class SSP_M2(models.Model):
     Mapped to an elastic search index.
     """
 
+    datafile = models.ForeignKey(
+        'data_files.DataFile',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    # the line of the datafile the record was parsed from, used to report errors across its case
+    line_number = models.PositiveIntegerField(null=True, blank=True)
     error = GenericRelation(ParserError)
     RecordType = models.CharField(max_length=156, null=True, blank=False)
     RPT_MONTH_YEAR = models.IntegerField(null=True, blank=False)
@@ -154,6 +170,14 @@ class SSP_M3(models.Model):
     Mapped to an elastic search index.
     """
 
+    datafile = models.ForeignKey(
+        'data_files.DataFile',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    # the line of the datafile the record was parsed from, used to report errors across its case
+    line_number = models.PositiveIntegerField(null=True, blank=True)
     error = GenericRelation(ParserError)
     RecordType = models.CharField(max_length=156, null=True, blank=False)
     RPT_MONTH_YEAR = models.IntegerField(null=True, blank=False)
@@ -15,6 +15,14 @@ class TANF_T1(models.Model):
     # def __is_valid__():
     # TODO: might need a correlating validator to check across fields
 
+    datafile = models.ForeignKey(
+        'data_files.DataFile',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    # the line of the datafile the record was parsed from, used to report errors across its case
+    line_number = models.PositiveIntegerField(null=True, blank=True)
     error = GenericRelation(ParserError)
     RecordType = models.CharField(max_length=156, null=False, blank=False)
     RPT_MONTH_YEAR = models.IntegerField(null=False, blank=False)
@@ -75,6 +83,14 @@ class TANF_T2(models.Model):
     Mapped to an elastic search index.
     """
 
+    datafile = models.ForeignKey(
+        'data_files.DataFile',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    # the line of the datafile the record was parsed from, used to report errors across its case
+    line_number = models.PositiveIntegerField(null=True, blank=True)
     RecordType = models.CharField(max_length=156, null=True, blank=False)
     RPT_MONTH_YEAR = models.IntegerField(null=True, blank=False)
     CASE_NUMBER = models.CharField(max_length=11, null=True, blank=False)
@@ -154,6 +170,14 @@ class TANF_T3(models.Model):
     Mapped to an elastic search index.
     """
 
+    datafile = models.ForeignKey(
+        'data_files.DataFile',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    # the line of the datafile the record was parsed from, used to report errors across its case
+    line_number = models.PositiveIntegerField(null=True, blank=True)
     RecordType = models.CharField(max_length=156, null=True, blank=False)
     RPT_MONTH_YEAR = models.IntegerField(null=True, blank=False)
     CASE_NUMBER = models.CharField(max_length=11, null=True, blank=False)
@@ -455,6 +455,41 @@ class Common(Configuration):
         }
     }
 
+    # -------- PARSER CONFIG
+    # The number of parsed records held in memory before they are bulk inserted
+    PARSER_BULK_CREATE_BATCH_SIZE = int(os.getenv('PARSER_BULK_CREATE_BATCH_SIZE', 10000))
+    # How parsed records are inserted: 'orm' uses bulk_create, 'copy' loads them with postgres' COPY FROM STDIN
+    PARSER_RECORD_WRITER = os.getenv('PARSER_RECORD_WRITER', 'orm')
+    # Datafiles larger than this many bytes are split into chunks parsed by parallel celery tasks
+    PARSER_PARALLEL_MIN_FILE_SIZE = int(os.getenv('PARSER_PARALLEL_MIN_FILE_SIZE', 10 * 1024 * 1024))
+    # The number of lines in each chunk of a datafile parsed in parallel, 0 disables parallel parsing
+    PARSER_CHUNK_LINES = int(os.getenv('PARSER_CHUNK_LINES', 50000))
+    # The number of lines parsed in each transaction before a datafile's parse checkpoint is advanced
+    PARSER_CHECKPOINT_LINES = int(os.getenv('PARSER_CHECKPOINT_LINES', 10000))
+    # The number of body lines validated together, a column of values at a time, 1 validates line by line
+    PARSER_VALIDATION_BATCH_LINES = int(os.getenv('PARSER_VALIDATION_BATCH_LINES', 1000))
+    # Whether a datafile byte-identical to an earlier parsed one reuses its records and errors instead of being parsed
+    PARSER_REUSE_PRIOR_PARSES = bool(strtobool(os.getenv('PARSER_REUSE_PRIOR_PARSES', 'yes')))
+    # The number of errors of each record type, field and error type kept as samples in a datafile's error summary
+    PARSER_ERROR_SUMMARY_SAMPLES = int(os.getenv('PARSER_ERROR_SUMMARY_SAMPLES', 10))
+    # Parsing a datafile stops, rejecting it, once it has more errors than this, 0 for no limit
+    PARSER_ERROR_BUDGET_MAX_ERRORS = int(os.getenv('PARSER_ERROR_BUDGET_MAX_ERRORS', 0))
+    # Or once it averages more errors per line than this over a window of lines, 0 for no limit
+    PARSER_ERROR_BUDGET_MAX_RATE = float(os.getenv('PARSER_ERROR_BUDGET_MAX_RATE', 0))
+    PARSER_ERROR_BUDGET_WINDOW_LINES = int(os.getenv('PARSER_ERROR_BUDGET_WINDOW_LINES', 5000))
+    # The number of case keys held in memory to check that every record's case has a T1/M1 record, before
+    # they are moved to a sqlite database on disk
+    PARSER_CASE_INDEX_MAX_KEYS = int(os.getenv('PARSER_CASE_INDEX_MAX_KEYS', 1000000))
+    # Where datafiles are downloaded to for parsing, the system's temporary directory if unset
+    PARSER_SPOOL_DIR = os.getenv('PARSER_SPOOL_DIR', None)
+    # The part size and number of parallel requests of the multipart download of a datafile for parsing
+    PARSER_SPOOL_MULTIPART_CHUNK_SIZE = int(os.getenv('PARSER_SPOOL_MULTIPART_CHUNK_SIZE', 8 * 1024 * 1024))
+    PARSER_SPOOL_MAX_CONCURRENCY = int(os.getenv('PARSER_SPOOL_MAX_CONCURRENCY', 4))
+    # The number of lines parsed between each update of a datafile's parse progress in redis
+    PARSER_PROGRESS_LINES = int(os.getenv('PARSER_PROGRESS_LINES', 5000))
+    # The number of seconds a datafile's parse progress is kept in redis after its last update
+    PARSER_PROGRESS_TTL = int(os.getenv('PARSER_PROGRESS_TTL', 24 * 60 * 60))
+
     # Elastic
     ELASTICSEARCH_DSL = {
         'default': {
@@ -1,5 +1,6 @@
 """Tests for storage backends available for use within tdpservice."""
 import pytest
+from django.core.files.base import ContentFile
 
 from tdpservice.backends import DataFilesS3Storage, StaticFilesS3Storage
 
@@ -43,3 +44,20 @@ def test_datafiles_and_staticfiles_storages_have_distinct_credentials(
     """Test that the credentials used differ between backends."""
     assert datafiles_backend.access_key != staticfiles_backend.access_key
     assert datafiles_backend.secret_key != staticfiles_backend.secret_key
+
+
+def test_datafiles_storage_records_version(datafiles_backend):
+    """Test that the version of a saved file is recorded on its content."""
+    content = ContentFile(b'HEADER\nTRAILER\n')
+    name = datafiles_backend.save('test/versioned.txt', content)
+
+    assert content.s3_version_id is not None
+    assert content.s3_version_id == datafiles_backend.get_object(name).version_id
+    assert datafiles_backend.open(name).read() == b'HEADER\nTRAILER\n'
+
+    # a file saved again over the same name is given a new version
+    first_version_id = content.s3_version_id
+    content = ContentFile(b'HEADER\nTRAILER\n')
+    datafiles_backend.save(name, content)
+    assert content.s3_version_id not in (None, first_version_id)
+    assert content.s3_version_id == datafiles_backend.get_object(name).version_id
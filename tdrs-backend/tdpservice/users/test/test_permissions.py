@@ -111,6 +111,12 @@ def test_ofa_system_admin_permissions(ofa_system_admin):
         'parsers.add_parsererror',
         'parsers.change_parsererror',
         'parsers.view_parsererror',
+        'parsers.add_parsecheckpoint',
+        'parsers.change_parsecheckpoint',
+        'parsers.view_parsecheckpoint',
+        'parsers.add_parsechunk',
+        'parsers.change_parsechunk',
+        'parsers.view_parsechunk',
         'search_indexes.add_ssp_m1',
         'search_indexes.view_ssp_m1',
         'search_indexes.change_ssp_m1',
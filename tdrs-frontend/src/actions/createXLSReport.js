@@ -1,11 +1,10 @@
 /* 
-Get a list of parse errors for a given file id from the backend using the
-`/parsing/parse_errors/{id}` endpoint.
+Download the xlsx report of parse errors for a given file, as returned by the
+`/parsing/parsing_errors/export/?file={id}` endpoint.
 */
-export const getParseErrors = (data_json, filename) => {
+export const getParseErrors = (xls_report, filename) => {
   try {
-    const blob = b64toBlob(data_json.xls_report, 'blob')
-    const blobUrl = URL.createObjectURL(blob)
+    const blobUrl = URL.createObjectURL(new Blob([xls_report]))
     const link = document.createElement('a')
     link.href = blobUrl
     link.download = `${filename}.xlsx`
@@ -18,22 +17,3 @@ export const getParseErrors = (data_json, filename) => {
     return Error(error)
   }
 }
-
-const b64toBlob = (b64Data, contentType = '', sliceSize = 512) => {
-  const byteCharacters = atob(b64Data)
-  const byteArrays = []
-
-  for (let offset = 0; offset < byteCharacters.length; offset += sliceSize) {
-    const slice = byteCharacters.slice(offset, offset + sliceSize)
-
-    const byteNumbers = new Array(slice.length)
-    for (let i = 0; i < slice.length; i++) {
-      byteNumbers[i] = slice.charCodeAt(i)
-    }
-
-    const byteArray = new Uint8Array(byteNumbers)
-    byteArrays.push(byteArray)
-  }
-  const blob = new Blob(byteArrays, { type: contentType })
-  return blob
-}
@@ -1,23 +1,12 @@
 import { getParseErrors } from './createXLSReport'
 
 it('should create an action to create an XLS report', () => {
-  const data_json = {
-    data: {},
-    xls_report: 'aGVsbG8=',
-  }
-  // atob is not available in jest
+  const xls_report = 'hello'
+  // URL.createObjectURL is not available in jest
   const expectedReturn = Error(
     'TypeError: URL.createObjectURL is not a function'
   )
-  expect(getParseErrors(data_json)).toEqual(expectedReturn)
-})
-
-it('should create an action to create an XLS report and throwError', () => {
-  const data_json = { data: {} }
-  const expectedReturn = Error(
-    'InvalidCharacterError: The string to be decoded contains invalid characters.'
-  )
-  expect(getParseErrors(data_json)).toEqual(expectedReturn)
+  expect(getParseErrors(xls_report)).toEqual(expectedReturn)
 })
 
 it('should create an action to create an XLS report and throwError', () => {
@@ -29,10 +18,7 @@ it('should create an action to create an XLS report and throwError', () => {
     remove: jest.fn(),
   }
   jest.spyOn(document, 'createElement').mockImplementation(() => link)
-  const data_json = {
-    data: {},
-    xls_report: 'aGVsbG8=',
-  }
+  const xls_report = 'hello'
   const expectedFileName = 'filename'
   const expectedReturn = {
     click: link.click,
@@ -40,16 +26,16 @@ it('should create an action to create an XLS report and throwError', () => {
     href: 'myURL',
     remove: link.remove,
   }
-  expect(getParseErrors(data_json, expectedFileName).download).toEqual(
+  expect(getParseErrors(xls_report, expectedFileName).download).toEqual(
     expectedReturn.download
   )
-  expect(getParseErrors(data_json, expectedFileName).href).toEqual(
+  expect(getParseErrors(xls_report, expectedFileName).href).toEqual(
     expectedReturn.href
   )
-  expect(getParseErrors(data_json, expectedFileName).click).toEqual(
+  expect(getParseErrors(xls_report, expectedFileName).click).toEqual(
     expectedReturn.click
   )
-  expect(getParseErrors(data_json, expectedFileName).remove).toEqual(
+  expect(getParseErrors(xls_report, expectedFileName).remove).toEqual(
     expectedReturn.remove
   )
 })
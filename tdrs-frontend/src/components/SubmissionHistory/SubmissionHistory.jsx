@@ -20,9 +20,9 @@ const SubmissionHistoryRow = ({ file }) => {
   const returned_errors = async () => {
     try {
       const promise = axios.get(
-        `${process.env.REACT_APP_BACKEND_URL}/parsing/parsing_errors/?file=${file.id}`,
+        `${process.env.REACT_APP_BACKEND_URL}/parsing/parsing_errors/export/?file=${file.id}`,
         {
-          responseType: 'json',
+          responseType: 'blob',
         }
       )
       const dataPromise = await promise.then((response) => response.data)